@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+Benchmarks do Sistema SIGx de Automatização de Jornadas
+Executa com um banco SQLite temporário, sem depender do servidor
+"""
+
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sigx_backend'))
+
+from flask import Flask
+from src.config_banco import configurar_banco
+from src.models import db, aplicar_migracoes, inicializar_dados_padrao, PosicaoRastreador, Veiculo
+
+
+def criar_app_benchmark():
+    """Cria uma aplicação com banco SQLite temporário"""
+    caminho = os.path.join(tempfile.mkdtemp(prefix='sigx_bench_'), 'bench.db')
+    app = Flask('sigx_benchmark')
+    configurar_banco(app, f"sqlite:///{caminho}")
+    with app.app_context():
+        db.create_all()
+        aplicar_migracoes()
+        inicializar_dados_padrao()
+    return app
+
+
+def gerar_posicoes(quantidade, inicio=datetime(2025, 6, 1), intervalo_segundos=30):
+    """Gera posições sintéticas no formato de importação"""
+    posicoes = []
+    for i in range(quantidade):
+        posicoes.append({
+            'data_hora': (inicio + timedelta(seconds=i * intervalo_segundos)).isoformat(),
+            'latitude': -20.3911 + (i % 1000) * 0.0001,
+            'longitude': -45.5418 + (i % 1000) * 0.0001,
+            'velocidade': 0 if (i // 50) % 2 else 60,
+            'endereco': 'MG - TIMÓTEO - Próx. Avenida Waldomiro Duarte',
+            'ponto_referencia': 'Aperam Inox America Do Sul S.a',
+            'km_aproximado': 0,
+            'tempo_parado': 0,
+            'tipo_mensagem': 'Posição Normal',
+            'modo_emergencia': False,
+            'bateria': 29
+        })
+    return posicoes
+
+
+def _importar_legado(veiculo_id, posicoes_data):
+    """Importação original: uma consulta de duplicata e um objeto ORM por posição"""
+    importadas = 0
+    duplicadas = 0
+    for posicao_data in posicoes_data:
+        data_hora = datetime.fromisoformat(posicao_data['data_hora'])
+        if PosicaoRastreador.query.filter_by(veiculo_id=veiculo_id, data_hora=data_hora).first():
+            duplicadas += 1
+            continue
+        db.session.add(PosicaoRastreador(
+            veiculo_id=veiculo_id,
+            data_hora=data_hora,
+            latitude=posicao_data.get('latitude'),
+            longitude=posicao_data.get('longitude'),
+            velocidade=posicao_data.get('velocidade', 0),
+            endereco=posicao_data.get('endereco'),
+            ponto_referencia=posicao_data.get('ponto_referencia'),
+            km_aproximado=posicao_data.get('km_aproximado'),
+            tempo_parado=posicao_data.get('tempo_parado', 0),
+            tipo_mensagem=posicao_data.get('tipo_mensagem'),
+            modo_emergencia=posicao_data.get('modo_emergencia', False),
+            bateria=posicao_data.get('bateria')
+        ))
+        importadas += 1
+    db.session.commit()
+    return {'posicoes_importadas': importadas, 'posicoes_duplicadas': duplicadas}
+
+
+def _medir_importacao(nome, funcao, posicoes):
+    """Importa as posições em um banco novo e retorna pontos por segundo"""
+    app = criar_app_benchmark()
+    with app.app_context():
+        veiculo = Veiculo.query.first()
+
+        inicio = time.perf_counter()
+        contadores = funcao(veiculo.id, posicoes)
+        db.session.commit()
+        duracao = time.perf_counter() - inicio
+
+        # Reimportação: todas as posições devem ser detectadas como duplicadas
+        inicio = time.perf_counter()
+        repeticao = funcao(veiculo.id, posicoes)
+        db.session.commit()
+        duracao_repeticao = time.perf_counter() - inicio
+
+    pontos_por_segundo = len(posicoes) / duracao
+    print(f"   {nome:<10} {pontos_por_segundo:>12,.0f} pontos/s "
+          f"(importadas: {contadores['posicoes_importadas']}, "
+          f"reimportação: {len(posicoes) / duracao_repeticao:,.0f} pontos/s, "
+          f"duplicadas: {repeticao['posicoes_duplicadas']})")
+    return pontos_por_segundo
+
+
+def benchmark_importacao(quantidade=20000):
+    """Compara a importação legada com a importação em lote"""
+    from src.ingestao_posicoes import importar_posicoes_em_lote
+
+    print(f"📥 Importação de {quantidade:,} posições de um veículo")
+    posicoes = gerar_posicoes(quantidade)
+
+    antes = _medir_importacao('legado', _importar_legado, posicoes)
+    depois = _medir_importacao('lote', importar_posicoes_em_lote, posicoes)
+
+    print(f"   Ganho: {depois / antes:.1f}x")
+    return True
+
+
+def benchmark_hidratacao_coordenadas(quantidade=100000):
+    """Compara o custo de carregar coordenadas gravadas como Numeric, REAL e micrograus"""
+    from sqlalchemy import Column, Integer, MetaData, Numeric, Float, Table, create_engine, select
+    from src.models.tipos import CoordenadaMicrograus
+
+    print(f"🧭 Hidratação de {quantidade:,} linhas com latitude/longitude")
+    formatos = [
+        ('numeric', Numeric(10, 8), Numeric(11, 8)),
+        ('real', Float(), Float()),
+        ('micrograus', CoordenadaMicrograus(), CoordenadaMicrograus())
+    ]
+    linhas = [
+        {'id': i, 'latitude': -20.3911 + (i % 1000) * 0.0001, 'longitude': -45.5418 + (i % 1000) * 0.0001}
+        for i in range(quantidade)
+    ]
+
+    tempos = {}
+    for nome, tipo_latitude, tipo_longitude in formatos:
+        engine = create_engine('sqlite://')
+        metadata = MetaData()
+        tabela = Table('coordenadas', metadata, Column('id', Integer, primary_key=True),
+                       Column('latitude', tipo_latitude), Column('longitude', tipo_longitude))
+        metadata.create_all(engine)
+
+        with engine.begin() as conexao:
+            conexao.execute(tabela.insert(), linhas)
+
+            inicio = time.perf_counter()
+            # Mesmo trabalho do to_dict/calcular_distancia: carregar e usar como float
+            soma = sum(float(latitude) + float(longitude)
+                       for latitude, longitude in conexao.execute(select(tabela.c.latitude, tabela.c.longitude)))
+            tempos[nome] = time.perf_counter() - inicio
+
+        print(f"   {nome:<10} {quantidade / tempos[nome]:>12,.0f} linhas/s (soma de controle: {soma:,.2f})")
+
+    print(f"   Ganho real: {tempos['numeric'] / tempos['real']:.1f}x, "
+          f"micrograus: {tempos['numeric'] / tempos['micrograus']:.1f}x")
+    return True
+
+
+def _tamanho_banco(app):
+    """Tamanho do arquivo SQLite após VACUUM, em bytes"""
+    with app.app_context():
+        db.session.remove()
+        with db.engine.connect() as conexao:
+            conexao.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+            conexao.exec_driver_sql('VACUUM')
+        return os.path.getsize(db.engine.url.database)
+
+
+def benchmark_dicionario_textos(quantidade=20000):
+    """Compara o tamanho do banco com endereços em texto por linha e no dicionário de textos"""
+    from src.ingestao_posicoes import ImportadorPosicoes, converter_data_hora
+
+    print(f"🗜️  Armazenamento de endereços de {quantidade:,} posições")
+    posicoes = gerar_posicoes(quantidade)
+
+    # Layout anterior: texto completo em cada linha
+    app_texto = criar_app_benchmark()
+    with app_texto.app_context():
+        veiculo = Veiculo.query.first()
+        db.session.execute(PosicaoRastreador.__table__.insert(), [
+            {**posicao, 'veiculo_id': veiculo.id, 'data_hora': converter_data_hora(posicao['data_hora'])}
+            for posicao in posicoes
+        ])
+        db.session.commit()
+    tamanho_texto = _tamanho_banco(app_texto)
+
+    app_dicionario = criar_app_benchmark()
+    with app_dicionario.app_context():
+        veiculo = Veiculo.query.first()
+        ImportadorPosicoes(veiculo.id).importar(posicoes)
+        db.session.commit()
+    tamanho_dicionario = _tamanho_banco(app_dicionario)
+
+    print(f"   texto      {tamanho_texto / 1024:>10,.0f} KiB")
+    print(f"   dicionário {tamanho_dicionario / 1024:>10,.0f} KiB")
+    print(f"   Redução: {(1 - tamanho_dicionario / tamanho_texto) * 100:.0f}%")
+    return True
+
+
+def gerar_posicoes_jornada(dias, inicio=datetime(2025, 6, 1), intervalo_segundos=30):
+    """Gera dias com 8 horas de viagem e o restante parado na garagem, com variação de GPS de alguns metros"""
+    import random
+    aleatorio = random.Random(42)
+    posicoes = []
+    for i in range(dias * 24 * 3600 // intervalo_segundos):
+        data_hora = inicio + timedelta(seconds=i * intervalo_segundos)
+        em_viagem = 8 <= data_hora.hour < 16
+        if em_viagem:
+            latitude = -20.3911 + (i % 960) * 0.0003
+            longitude = -45.5418 + (i % 960) * 0.0003
+        else:
+            latitude = -20.3911 + aleatorio.uniform(-0.00005, 0.00005)
+            longitude = -45.5418 + aleatorio.uniform(-0.00005, 0.00005)
+        posicoes.append({
+            'data_hora': data_hora.isoformat(),
+            'latitude': round(latitude, 6),
+            'longitude': round(longitude, 6),
+            'velocidade': 60 if em_viagem else 0,
+            'endereco': 'MG - BR-381' if em_viagem else 'MG - TIMÓTEO - Próx. Avenida Waldomiro Duarte',
+            'ponto_referencia': 'Rodovia BR-381' if em_viagem else 'Garagem Timóteo',
+            'tipo_mensagem': 'Posição Normal',
+            'bateria': 29
+        })
+    return posicoes
+
+
+def benchmark_compactacao_paradas(dias=7):
+    """Compara linhas gravadas e tempo de classificação sem e com compactação de paradas"""
+    from src.ingestao_posicoes import ImportadorPosicoes
+    from src.classificador_eventos import classificar_eventos_automaticamente
+
+    posicoes = gerar_posicoes_jornada(dias)
+    print(f"🅿️  Compactação de paradas: {len(posicoes):,} posições em {dias} dias (16 h/dia parado)")
+
+    resultados = {}
+    for compactar in (False, True):
+        app = criar_app_benchmark()
+        with app.app_context():
+            veiculo_id = Veiculo.query.first().id
+            inicio = time.perf_counter()
+            ImportadorPosicoes(veiculo_id, compactar).importar(posicoes)
+            db.session.commit()
+            duracao_importacao = time.perf_counter() - inicio
+
+            linhas = PosicaoRastreador.query.count()
+            db.session.remove()
+
+            inicio = time.perf_counter()
+            eventos = classificar_eventos_automaticamente(veiculo_id)
+            duracao_classificacao = time.perf_counter() - inicio
+        resultados[compactar] = (linhas, duracao_classificacao)
+
+        nome = 'compactado' if compactar else 'sem'
+        print(f"   {nome:<10} {linhas:>8,} linhas, {_tamanho_banco(app) / 1024:>8,.0f} KiB, "
+              f"importação {duracao_importacao:.2f}s, classificação {duracao_classificacao:.2f}s "
+              f"({len(eventos)} eventos)")
+
+    print(f"   Linhas: {resultados[False][0] / resultados[True][0]:.1f}x menos, "
+          f"classificação {resultados[False][1] / resultados[True][1]:.1f}x mais rápida")
+    return True
+
+
+def benchmark_deteccao_paradas(dias=7):
+    """Paradas com ruído de velocidade do GPS: detecção por velocidade x por agrupamento (grade)"""
+    import random
+    from src.ingestao_posicoes import ImportadorPosicoes
+    from src.classificador_eventos import ClassificadorEventos
+
+    # 5% dos pontos parados com velocidade entre 6 e 15 km/h (ruído do GPS)
+    aleatorio = random.Random(7)
+    posicoes = gerar_posicoes_jornada(dias)
+    for posicao in posicoes:
+        if posicao['velocidade'] == 0 and aleatorio.random() < 0.05:
+            posicao['velocidade'] = aleatorio.randint(6, 15)
+    print(f"📍 Detecção de paradas: {len(posicoes):,} posições em {dias} dias, 5% dos pontos parados com ruído")
+
+    resultados = {}
+    for deteccao in ('velocidade', 'agrupamento'):
+        app = criar_app_benchmark()
+        with app.app_context():
+            veiculo_id = Veiculo.query.first().id
+            ImportadorPosicoes(veiculo_id).importar(posicoes)
+            db.session.commit()
+            db.session.remove()
+
+            inicio = time.perf_counter()
+            eventos = ClassificadorEventos(deteccao=deteccao).processar_veiculo(veiculo_id, finalizar=True)
+            duracao = time.perf_counter() - inicio
+        resultados[deteccao] = (len(eventos), duracao)
+        print(f"   {deteccao:<12} {duracao:>8.2f}s ({len(eventos)} eventos)")
+
+    print(f"   Eventos: {resultados['velocidade'][0]} -> {resultados['agrupamento'][0]}, "
+          f"classificação {resultados['velocidade'][1] / resultados['agrupamento'][1]:.1f}x mais rápida")
+    return True
+
+
+def benchmark_classificacao(dias=2):
+    """Compara a gravação de eventos com um commit por evento e em lote na mesma transação"""
+    from src.ingestao_posicoes import ImportadorPosicoes
+    from src.classificador_eventos import ClassificadorEventos
+    from src.models import EventoJornada
+
+    class ClassificadorLegado(ClassificadorEventos):
+        """Gravação original: add + commit e to_dict (com carregamento das relações) por evento"""
+        def _gravar_eventos(self, registros, veiculo):
+            eventos = []
+            for registro in registros:
+                evento = EventoJornada(**registro)
+                db.session.add(evento)
+                db.session.commit()
+                eventos.append(evento.to_dict())
+            return eventos
+
+    posicoes = gerar_posicoes(dias * 2880)
+    print(f"🏷️  Classificação de {len(posicoes):,} posições")
+
+    tempos = {}
+    for nome, classe in (('legado', ClassificadorLegado), ('lote', ClassificadorEventos)):
+        app = criar_app_benchmark()
+        with app.app_context():
+            veiculo_id = Veiculo.query.first().id
+            ImportadorPosicoes(veiculo_id).importar(posicoes)
+            db.session.commit()
+            db.session.remove()
+
+            inicio = time.perf_counter()
+            eventos = classe().processar_veiculo(veiculo_id)
+            tempos[nome] = time.perf_counter() - inicio
+        print(f"   {nome:<10} {tempos[nome]:>8.2f}s ({len(eventos)} eventos)")
+
+    print(f"   Ganho: {tempos['legado'] / tempos['lote']:.1f}x")
+    return True
+
+
+def benchmark_classificacao_frota(veiculos=8, dias=2):
+    """Compara a classificação da frota em um processo e no pool com um processo por núcleo"""
+    from src.ingestao_posicoes import ImportadorPosicoes
+    from src.classificacao_frota import classificar_frota
+
+    processos = os.cpu_count() or 1
+    print(f"🚚 Classificação da frota: {veiculos} veículos x {dias * 2880:,} posições ({processos} núcleo(s))")
+
+    tempos = {}
+    for quantidade in sorted({1, processos}):
+        app = criar_app_benchmark()
+        with app.app_context():
+            motorista_id = Veiculo.query.first().motorista_id
+            for i in range(veiculos - 1):
+                db.session.add(Veiculo(placa=f'BEN{i:04d}', identificador=f'B-{i}', motorista_id=motorista_id))
+            db.session.commit()
+            for veiculo in Veiculo.query.all():
+                ImportadorPosicoes(veiculo.id).importar(gerar_posicoes(dias * 2880))
+            db.session.commit()
+
+            resultado = classificar_frota(quantidade, finalizar=True)
+            tempos[quantidade] = resultado['duracao_segundos']
+        print(f"   {resultado['processos']} processo(s) {tempos[quantidade]:>8.2f}s "
+              f"({resultado['eventos_classificados']} eventos, {resultado['falhas']} falhas)")
+
+    if processos > 1:
+        print(f"   Ganho: {tempos[1] / tempos[processos]:.1f}x")
+    return True
+
+
+def benchmark_segmentacao(quantidade=1000000):
+    """Compara a segmentação em parada/movimento objeto a objeto e vetorizada (NumPy)"""
+    from src import segmentacao
+    from src.classificador_eventos import ClassificadorEventos
+
+    if segmentacao.np is None:
+        print("📐 Segmentação: NumPy não instalado, benchmark ignorado")
+        return True
+
+    print(f"📐 Segmentação de {quantidade:,} posições")
+    app = criar_app_benchmark()
+    with app.app_context():
+        veiculo_id = Veiculo.query.first().id
+        inicio = datetime(2025, 6, 1)
+        linhas = []
+        for i in range(quantidade):
+            # Blocos de 50 posições alternando movimento e parada (mesmo padrão de gerar_posicoes)
+            linhas.append({
+                'veiculo_id': veiculo_id,
+                'data_hora': inicio + timedelta(seconds=i * 30),
+                'latitude': -20.3911 + (i % 1000) * 0.0001,
+                'longitude': -45.5418 + (i % 1000) * 0.0001,
+                'velocidade': 0 if (i // 50) % 2 else 60,
+                'processado': False
+            })
+            if len(linhas) == 50000:
+                db.session.execute(PosicaoRastreador.__table__.insert(), linhas)
+                linhas = []
+        if linhas:
+            db.session.execute(PosicaoRastreador.__table__.insert(), linhas)
+        db.session.commit()
+
+        filtros = [PosicaoRastreador.veiculo_id == veiculo_id, PosicaoRastreador.processado == False]
+        classificador = ClassificadorEventos('python')
+        motores = (
+            ('python', lambda: classificador._segmentar_posicoes(filtros)),
+            ('numpy', lambda: segmentacao.segmentar_posicoes(filtros))
+        )
+
+        tempos = {}
+        for nome, segmentar in motores:
+            db.session.remove()
+            inicio_medicao = time.perf_counter()
+            _, periodos = segmentar()
+            tempos[nome] = time.perf_counter() - inicio_medicao
+            distancia_km = sum(periodo['distancia_m'] for periodo in periodos) / 1000
+            print(f"   {nome:<10} {tempos[nome]:>8.2f}s ({len(periodos):,} períodos, {distancia_km:,.1f} km)")
+            del periodos
+
+    print(f"   Ganho: {tempos['python'] / tempos['numpy']:.1f}x")
+    return True
+
+
+def benchmark_geocercas(quantidade=50000, consultas=20000):
+    """Localiza pontos entre dezenas de milhares de geocercas: grade espacial x varredura de todas"""
+    import random
+    from sqlalchemy import insert
+    from src.geocercas import normalizar_geocerca, indice_geocercas
+    from src.models import Geocerca
+
+    print(f"🗺️  Geocercas: {quantidade:,} geocercas, {consultas:,} consultas")
+    app = criar_app_benchmark()
+    aleatorio = random.Random(42)
+    categorias = ('posto_combustivel', 'carga_descarga', 'oficina_manutencao')
+    with app.app_context():
+        # Círculos de 50 a 500 m e quadrados de ~300 m espalhados em 5° x 5° (região Sudeste)
+        geocercas = []
+        for i in range(quantidade):
+            latitude = -23.0 + aleatorio.random() * 5
+            longitude = -48.0 + aleatorio.random() * 5
+            dados = {'nome': f'Geocerca {i}', 'categoria': categorias[i % 3]}
+            if i % 5:
+                dados.update(latitude=latitude, longitude=longitude, raio_m=aleatorio.uniform(50, 500))
+            else:
+                dados['vertices'] = [[latitude, longitude], [latitude + 0.003, longitude],
+                                     [latitude + 0.003, longitude + 0.003], [latitude, longitude + 0.003]]
+            geocercas.append(normalizar_geocerca(dados))
+
+        inicio_medicao = time.perf_counter()
+        for inicio in range(0, len(geocercas), 1000):
+            db.session.execute(insert(Geocerca), geocercas[inicio:inicio + 1000])
+        db.session.commit()
+        print(f"   Importação: {time.perf_counter() - inicio_medicao:.2f}s")
+
+        inicio_medicao = time.perf_counter()
+        indice = indice_geocercas.obter()
+        print(f"   Montagem do índice: {time.perf_counter() - inicio_medicao:.2f}s")
+
+        # Metade dos pontos perto do centro de uma geocerca, metade ao acaso
+        pontos = []
+        for i in range(consultas):
+            if i % 2:
+                pontos.append((-23.0 + aleatorio.random() * 5, -48.0 + aleatorio.random() * 5))
+            else:
+                geocerca = aleatorio.choice(indice.geocercas)
+                pontos.append(((geocerca.latitude_minima + geocerca.latitude_maxima) / 2,
+                               (geocerca.longitude_minima + geocerca.longitude_maxima) / 2))
+
+        amostra = pontos[:max(consultas // 100, 1)]
+        inicio_medicao = time.perf_counter()
+        varredura = [[g.id for g in indice.geocercas if g.contem(latitude, longitude)] for latitude, longitude in amostra]
+        tempo_varredura = (time.perf_counter() - inicio_medicao) / len(amostra)
+
+        inicio_medicao = time.perf_counter()
+        encontradas = [indice.localizar(latitude, longitude) for latitude, longitude in pontos]
+        tempo_indice = (time.perf_counter() - inicio_medicao) / len(pontos)
+
+        iguais = all(sorted(ids) == sorted(g.id for g in resultado) for ids, resultado in zip(varredura, encontradas))
+        dentro = sum(1 for resultado in encontradas if resultado)
+        print(f"   Varredura:  {tempo_varredura * 1e6:>10,.1f} µs por ponto")
+        print(f"   Grade:      {tempo_indice * 1e6:>10,.1f} µs por ponto ({dentro:,} pontos em geocercas)")
+        print(f"   Ganho: {tempo_varredura / tempo_indice:,.0f}x, resultados iguais: {'sim' if iguais else 'NÃO'}")
+
+    return iguais
+
+
+def run_all_benchmarks():
+    """Executa todos os benchmarks"""
+    print("🚀 Iniciando benchmarks do Sistema SIGx")
+    print("=" * 50)
+
+    benchmarks = [
+        benchmark_importacao,
+        benchmark_hidratacao_coordenadas,
+        benchmark_dicionario_textos,
+        benchmark_compactacao_paradas,
+        benchmark_deteccao_paradas,
+        benchmark_classificacao,
+        benchmark_classificacao_frota,
+        benchmark_segmentacao,
+        benchmark_geocercas
+    ]
+
+    for benchmark in benchmarks:
+        benchmark()
+        print()
+
+    print("=" * 50)
+    print("📊 Benchmarks concluídos")
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
@@ -0,0 +1,360 @@
+"""
+Módulo de Arquivamento de Posições
+Move posições processadas antigas para partições mensais (arquivos SQLite anexados
+ou tabela particionada no PostgreSQL) e as consulta junto com a tabela principal
+"""
+
+import glob
+import heapq
+import os
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models import db, PosicaoRastreador, Veiculo
+from src.models.posicao_rastreador import AcessoresPosicao
+from src.models.migracoes import (
+    COLUNAS_COORDENADAS, adicionar_colunas_ausentes, converter_coordenadas_tabela, definir_metadado, obter_metadado
+)
+
+# Idade mínima, em dias, das posições processadas que saem da tabela principal
+DIAS_ARQUIVO_PADRAO = int(os.environ.get('SIGX_ARQUIVO_DIAS', 180))
+
+# PostgreSQL: tabela particionada por data_hora, com uma partição por mês
+TABELA_ARQUIVO_POSTGRESQL = 'posicoes_arquivo'
+
+# SQLite: um arquivo por mês, anexado à conexão com este nome enquanto é usado
+ESQUEMA_ANEXO = 'arquivo_mes'
+
+# Sufixo _AAAA_MM dos arquivos (SQLite) e das partições (PostgreSQL)
+PADRAO_PARTICAO = re.compile(r'_(\d{4})_(\d{2})(?:\.db)?$')
+
+
+def inicio_mes(data):
+    return datetime(data.year, data.month, 1)
+
+
+def proximo_mes(data):
+    return datetime(data.year + data.month // 12, data.month % 12 + 1, 1)
+
+
+# Coluna -> atributo do modelo (ex.: coluna 'endereco' -> atributo 'endereco_texto')
+ATRIBUTOS_POSICAO = {
+    coluna.key: atributo.key
+    for atributo in PosicaoRastreador.__mapper__.column_attrs
+    for coluna in atributo.columns
+}
+
+
+class PosicaoArquivada(AcessoresPosicao):
+    """Posição lida de uma partição do arquivo: somente leitura, com os acessores da posição ativa"""
+
+    __slots__ = tuple(ATRIBUTOS_POSICAO.values())
+
+    def __init__(self, linha):
+        for chave, valor in linha._mapping.items():
+            setattr(self, ATRIBUTOS_POSICAO[chave], valor)
+
+    def to_dict(self):
+        dados = super().to_dict()
+        dados['arquivada'] = True
+        return dados
+
+    def __repr__(self):
+        return f'<PosicaoArquivada {self.veiculo_id} - {self.data_hora}>'
+
+
+def _tabela_arquivo(nome, schema=None, **opcoes):
+    """Tabela do arquivo com as mesmas colunas da tabela principal"""
+    colunas = [db.Column(coluna.name, coluna.type, key=coluna.key) for coluna in PosicaoRastreador.__table__.columns]
+    return db.Table(
+        nome, db.MetaData(), *colunas,
+        db.Index(f'uq_{nome}_veiculo_data_hora', 'veiculo_id', 'data_hora', unique=True),
+        schema=schema, **opcoes
+    )
+
+
+def _postgresql(conexao):
+    return conexao.dialect.name == 'postgresql'
+
+
+def diretorio_arquivo():
+    """Diretório dos arquivos mensais do SQLite (ao lado do banco principal)"""
+    if os.environ.get('SIGX_ARQUIVO_DIRETORIO'):
+        return os.environ['SIGX_ARQUIVO_DIRETORIO']
+
+    banco = db.engine.url.database
+    if not banco or banco == ':memory:':
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(banco)), 'arquivo')
+
+
+def _caminho_particao(mes):
+    return os.path.join(diretorio_arquivo(), f'posicoes_{mes.year:04d}_{mes.month:02d}.db')
+
+
+def meses_arquivados():
+    """Lista ordenada dos meses que já possuem partição"""
+    if db.engine.dialect.name == 'postgresql':
+        nomes = db.session.execute(db.text(
+            "SELECT filha.relname FROM pg_inherits "
+            "JOIN pg_class filha ON filha.oid = pg_inherits.inhrelid "
+            "JOIN pg_class mae ON mae.oid = pg_inherits.inhparent "
+            "WHERE mae.relname = :tabela"
+        ), {'tabela': TABELA_ARQUIVO_POSTGRESQL}).scalars()
+    else:
+        diretorio = diretorio_arquivo()
+        if not diretorio:
+            return []
+        nomes = (os.path.basename(caminho) for caminho in glob.glob(os.path.join(diretorio, 'posicoes_*.db')))
+
+    meses = []
+    for nome in nomes:
+        encontrado = PADRAO_PARTICAO.search(nome)
+        if encontrado:
+            meses.append(datetime(int(encontrado.group(1)), int(encontrado.group(2)), 1))
+    return sorted(meses)
+
+
+def data_corte_arquivo():
+    """Data antes da qual pode haver posições arquivadas (None se nunca houve arquivamento)"""
+    valor = obter_metadado(db.session, 'arquivo_data_corte')
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def consultar_arquivo(data_inicio, processado=None):
+    """Indica se uma consulta a partir de data_inicio alcança o arquivo"""
+    # Só posições processadas são arquivadas
+    if processado is False:
+        return False
+    corte = data_corte_arquivo()
+    return corte is not None and (data_inicio is None or data_inicio < corte)
+
+
+@contextmanager
+def _particao_sqlite(conexao, mes):
+    """Anexa o arquivo do mês à conexão, criando-o se necessário, e o desanexa ao final"""
+    os.makedirs(diretorio_arquivo(), exist_ok=True)
+    conexao.exec_driver_sql(f"ATTACH DATABASE ? AS {ESQUEMA_ANEXO}", (_caminho_particao(mes),))
+    try:
+        tabela = _tabela_arquivo('posicoes_rastreador', schema=ESQUEMA_ANEXO)
+        tabela.create(conexao, checkfirst=True)
+        adicionar_colunas_ausentes(conexao, tabela)
+        conexao.commit()
+        yield tabela
+    finally:
+        conexao.rollback()
+        conexao.exec_driver_sql(f"DETACH DATABASE {ESQUEMA_ANEXO}")
+        conexao.commit()
+
+
+def _tabela_postgresql():
+    return _tabela_arquivo(TABELA_ARQUIVO_POSTGRESQL, postgresql_partition_by='RANGE (data_hora)')
+
+
+def _preparar_tabela_postgresql(conexao, meses):
+    """Cria a tabela particionada do PostgreSQL e as partições dos meses informados"""
+    tabela = _tabela_postgresql()
+    tabela.create(conexao, checkfirst=True)
+    adicionar_colunas_ausentes(conexao, tabela)
+
+    for mes in meses:
+        conexao.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {TABELA_ARQUIVO_POSTGRESQL}_{mes.year:04d}_{mes.month:02d} "
+            f"PARTITION OF {TABELA_ARQUIVO_POSTGRESQL} "
+            f"FOR VALUES FROM ('{mes.isoformat(' ')}') TO ('{proximo_mes(mes).isoformat(' ')}')"
+        )
+    conexao.commit()
+    return tabela
+
+
+def _filtro_mes(veiculo_id, mes, corte):
+    """Posições processadas do veículo no mês, anteriores ao corte"""
+    principal = PosicaoRastreador.__table__
+    return (
+        principal.c.veiculo_id == veiculo_id,
+        principal.c.processado == True,
+        principal.c.data_hora >= mes,
+        principal.c.data_hora < min(proximo_mes(mes), corte)
+    )
+
+
+def _mover_mes(conexao, destino, veiculo_id, mes, corte):
+    """Copia as posições processadas do veículo no mês para o arquivo e as remove da tabela principal"""
+    principal = PosicaoRastreador.__table__
+    filtro = _filtro_mes(veiculo_id, mes, corte)
+    colunas = list(destino.columns)
+    insercao = (postgresql.insert if _postgresql(conexao) else sqlite.insert)(destino)
+
+    # Conflito: a posição já foi copiada por uma execução interrompida antes da remoção
+    conexao.execute(insercao.from_select(
+        colunas, select(*[principal.c[coluna.key] for coluna in colunas]).where(*filtro)
+    ).on_conflict_do_nothing())
+    return conexao.execute(principal.delete().where(*filtro)).rowcount
+
+
+def arquivar_posicoes(dias=None):
+    """
+    Move as posições processadas com mais de `dias` dias para as partições mensais.
+    Cada mês é confirmado em uma transação; uma execução interrompida pode ser repetida.
+    """
+    dias = DIAS_ARQUIVO_PADRAO if dias is None else dias
+    if dias < 1:
+        raise ValueError("A idade mínima para arquivamento é de 1 dia")
+    if db.engine.dialect.name != 'postgresql' and not diretorio_arquivo():
+        raise ValueError("Arquivamento requer um banco em arquivo ou SIGX_ARQUIVO_DIRETORIO")
+
+    corte = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=dias)
+    principal = PosicaoRastreador.__table__
+
+    # Posição mais antiga a arquivar por veículo (usa o índice veiculo_id, processado, data_hora)
+    inicio_por_veiculo = {}
+    for (veiculo_id,) in db.session.execute(select(Veiculo.id)):
+        mais_antiga = db.session.execute(
+            select(func.min(principal.c.data_hora)).where(
+                principal.c.veiculo_id == veiculo_id,
+                principal.c.processado == True,
+                principal.c.data_hora < corte
+            )
+        ).scalar()
+        if mais_antiga:
+            inicio_por_veiculo[veiculo_id] = inicio_mes(mais_antiga)
+
+    # A data de corte é registrada antes da movimentação: as consultas passam a olhar o arquivo
+    corte_anterior = data_corte_arquivo()
+    if corte_anterior is None or corte > corte_anterior:
+        definir_metadado(db.session, 'arquivo_data_corte', corte.isoformat())
+    db.session.commit()
+
+    resultado = {'data_corte': corte.isoformat(), 'posicoes_arquivadas': 0, 'particoes': []}
+    if not inicio_por_veiculo:
+        return resultado
+
+    # Veículos com posições a arquivar em cada mês; meses vazios não ganham partição
+    veiculos_por_mes = {}
+    mes = min(inicio_por_veiculo.values())
+    while mes < corte:
+        veiculos = [
+            veiculo_id for veiculo_id, inicio in inicio_por_veiculo.items()
+            if inicio <= mes and db.session.execute(
+                select(principal.c.id).where(*_filtro_mes(veiculo_id, mes, corte)).limit(1)
+            ).first()
+        ]
+        if veiculos:
+            veiculos_por_mes[mes] = veiculos
+        mes = proximo_mes(mes)
+    db.session.commit()
+
+    with db.engine.connect() as conexao:
+        if _postgresql(conexao):
+            tabela = _preparar_tabela_postgresql(conexao, veiculos_por_mes)
+
+        for mes, veiculos in veiculos_por_mes.items():
+            if _postgresql(conexao):
+                movidas = sum(_mover_mes(conexao, tabela, veiculo_id, mes, corte) for veiculo_id in veiculos)
+                conexao.commit()
+            else:
+                with _particao_sqlite(conexao, mes) as tabela_mes:
+                    movidas = sum(_mover_mes(conexao, tabela_mes, veiculo_id, mes, corte) for veiculo_id in veiculos)
+                    conexao.commit()
+
+            if movidas:
+                resultado['posicoes_arquivadas'] += movidas
+                resultado['particoes'].append(mes.strftime('%Y-%m'))
+
+    return resultado
+
+
+def _consultar_particao(conexao, tabela, veiculo_id, data_inicio, data_fim, decrescente, limite):
+    consulta = select(tabela).where(tabela.c.veiculo_id == veiculo_id)
+    if data_inicio:
+        consulta = consulta.where(tabela.c.data_hora >= data_inicio)
+    if data_fim:
+        consulta = consulta.where(tabela.c.data_hora <= data_fim)
+    consulta = consulta.order_by(tabela.c.data_hora.desc() if decrescente else tabela.c.data_hora)
+    if limite:
+        consulta = consulta.limit(limite)
+    return [PosicaoArquivada(linha) for linha in conexao.execute(consulta)]
+
+
+def posicoes_arquivadas(veiculo_id, data_inicio=None, data_fim=None, decrescente=False, limite=None):
+    """Posições arquivadas de um veículo no intervalo, ordenadas por data_hora"""
+    meses = [
+        mes for mes in meses_arquivados()
+        if (data_inicio is None or proximo_mes(mes) > data_inicio) and (data_fim is None or mes <= data_fim)
+    ]
+    if not meses:
+        return []
+    if decrescente:
+        meses.reverse()
+
+    with db.engine.connect() as conexao:
+        if _postgresql(conexao):
+            # A tabela particionada descarta sozinha as partições fora do intervalo
+            return _consultar_particao(conexao, _tabela_postgresql(), veiculo_id,
+                                       data_inicio, data_fim, decrescente, limite)
+
+        # As partições são meses disjuntos: percorrê-las em ordem mantém o resultado ordenado
+        posicoes = []
+        for mes in meses:
+            with _particao_sqlite(conexao, mes) as tabela:
+                posicoes.extend(_consultar_particao(
+                    conexao, tabela, veiculo_id, data_inicio, data_fim, decrescente,
+                    limite - len(posicoes) if limite else None
+                ))
+            if limite and len(posicoes) >= limite:
+                break
+
+    return posicoes
+
+
+def horarios_arquivados(veiculo_id, inicio, fim):
+    """
+    Horários já arquivados do veículo no intervalo (detecção de duplicatas na importação):
+    conjunto de horários e lista de intervalos (início, fim) das linhas compactadas
+    """
+    if not consultar_arquivo(inicio):
+        return set(), []
+    arquivadas = posicoes_arquivadas(veiculo_id, inicio, fim)
+    return (
+        {posicao.data_hora for posicao in arquivadas},
+        [(posicao.data_hora, posicao.data_hora_fim) for posicao in arquivadas if posicao.compactada]
+    )
+
+
+def mesclar_posicoes(ativas, arquivadas, decrescente=False):
+    """Une posições ativas e arquivadas ordenadas por data_hora; em horários repetidos vale a ativa"""
+    posicoes = []
+    for posicao in heapq.merge(ativas, arquivadas, key=lambda p: p.data_hora, reverse=decrescente):
+        if posicoes and posicoes[-1].data_hora == posicao.data_hora:
+            continue
+        posicoes.append(posicao)
+    return posicoes
+
+
+def converter_coordenadas_arquivo(formato_anterior):
+    """Converte as coordenadas já arquivadas quando SIGX_FORMATO_COORDENADAS muda"""
+    colunas = COLUNAS_COORDENADAS['posicoes_rastreador']
+    with db.engine.connect() as conexao:
+        if _postgresql(conexao):
+            # Alterar a tabela particionada altera todas as partições
+            converter_coordenadas_tabela(conexao, TABELA_ARQUIVO_POSTGRESQL, colunas, formato_anterior)
+            conexao.commit()
+            return
+
+        for mes in meses_arquivados():
+            with _particao_sqlite(conexao, mes) as tabela:
+                converter_coordenadas_tabela(conexao, tabela.name, colunas, formato_anterior, schema=ESQUEMA_ANEXO)
+                conexao.commit()
+
+
+def resumo_arquivo():
+    """Situação do arquivo para a API"""
+    corte = data_corte_arquivo()
+    return {
+        'data_corte': corte.isoformat() if corte else None,
+        'dias_padrao': DIAS_ARQUIVO_PADRAO,
+        'particoes': [mes.strftime('%Y-%m') for mes in meses_arquivados()],
+        'armazenamento': 'postgresql' if db.engine.dialect.name == 'postgresql' else diretorio_arquivo()
+    }
@@ -0,0 +1,144 @@
+"""
+Módulo de Classificação da Frota
+Classifica todos os veículos com posições pendentes em paralelo, em um pool de processos.
+Cada processo tem sua própria conexão e sessão e classifica um veículo por vez.
+
+Uso pela linha de comando (a partir de sigx_backend/):
+    python -m src.classificacao_frota --processos 4 --finalizar
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from flask import Flask
+from sqlalchemy import exists, func, select
+from src.models import db, PeriodoAberto, PosicaoRastreador, Veiculo
+from src.classificador_eventos import classificar_eventos_automaticamente
+from src.config_banco import configurar_banco
+
+# Processos do pool (padrão: um por núcleo)
+PROCESSOS_PADRAO = int(os.environ.get('SIGX_CLASSIFICACAO_PROCESSOS', 0)) or os.cpu_count() or 1
+
+
+def veiculos_pendentes(finalizar=False):
+    """
+    Veículos com posições não processadas e a quantidade de cada um, da maior para a menor.
+    Com finalizar=True, inclui os veículos que só têm período aberto.
+    """
+    pendentes = select(func.count()).where(
+        PosicaoRastreador.veiculo_id == Veiculo.id,
+        PosicaoRastreador.processado == False
+    ).scalar_subquery()
+    condicao = exists().where(PosicaoRastreador.veiculo_id == Veiculo.id, PosicaoRastreador.processado == False)
+    if finalizar:
+        condicao = condicao | exists().where(PeriodoAberto.veiculo_id == Veiculo.id)
+
+    veiculos = db.session.execute(select(Veiculo.id, pendentes).where(condicao)).all()
+    # Os veículos com mais posições começam primeiro, para equilibrar os processos
+    return sorted(((veiculo_id, quantidade) for veiculo_id, quantidade in veiculos), key=lambda item: -item[1])
+
+
+def _inicializar_processo(url_banco):
+    """Cada processo do pool abre seu próprio engine e mantém um contexto de aplicação"""
+    app = Flask('sigx_classificacao_frota')
+    configurar_banco(app, url_banco)
+    app.app_context().push()
+
+
+def _classificar_veiculo(veiculo_id, data_inicio, data_fim, finalizar):
+    """Classifica um veículo e retorna os eventos gerados, a duração e o erro, se houver"""
+    inicio = time.perf_counter()
+    resultado = {'veiculo_id': veiculo_id}
+    try:
+        resultado['eventos_classificados'] = len(
+            classificar_eventos_automaticamente(veiculo_id, data_inicio, data_fim, finalizar)
+        )
+    except Exception as e:
+        db.session.rollback()
+        resultado['erro'] = str(e)
+    resultado['duracao_segundos'] = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+
+def _banco_em_memoria():
+    banco = db.engine.url.database
+    return db.engine.dialect.name == 'sqlite' and (not banco or banco == ':memory:')
+
+
+def classificar_frota(processos=None, data_inicio=None, data_fim=None, finalizar=False):
+    """
+    Classifica os veículos com posições pendentes em um pool de processos (spawn).
+    Com um processo, um único veículo ou banco SQLite em memória, classifica no processo atual.
+    """
+    processos = max(1, processos or PROCESSOS_PADRAO)
+    inicio = time.perf_counter()
+
+    pendentes = veiculos_pendentes(finalizar)
+    db.session.commit()
+    quantidade_por_veiculo = dict(pendentes)
+    processos = min(processos, len(pendentes)) or 1
+
+    resultados = []
+    if processos == 1 or _banco_em_memoria():
+        processos = 1
+        for veiculo_id, _ in pendentes:
+            resultados.append(_classificar_veiculo(veiculo_id, data_inicio, data_fim, finalizar))
+    else:
+        url_banco = db.engine.url.render_as_string(hide_password=False)
+        with ProcessPoolExecutor(
+            max_workers=processos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_inicializar_processo,
+            initargs=(url_banco,)
+        ) as executor:
+            futuros = {
+                executor.submit(_classificar_veiculo, veiculo_id, data_inicio, data_fim, finalizar): veiculo_id
+                for veiculo_id, _ in pendentes
+            }
+            for futuro in as_completed(futuros):
+                try:
+                    resultados.append(futuro.result())
+                except Exception as e:
+                    # Falha do processo (não da classificação): o veículo é reportado como erro
+                    resultados.append({'veiculo_id': futuros[futuro], 'erro': str(e)})
+
+    for resultado in resultados:
+        resultado['posicoes_pendentes'] = quantidade_por_veiculo.get(resultado['veiculo_id'], 0)
+    resultados.sort(key=lambda resultado: resultado['veiculo_id'])
+
+    return {
+        'processos': processos,
+        'veiculos_processados': len(resultados),
+        'eventos_classificados': sum(resultado.get('eventos_classificados', 0) for resultado in resultados),
+        'falhas': sum(1 for resultado in resultados if 'erro' in resultado),
+        'duracao_segundos': round(time.perf_counter() - inicio, 3),
+        'veiculos': resultados
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Classifica todos os veículos com posições pendentes')
+    parser.add_argument('--processos', type=int, default=None, help='processos do pool (padrão: núcleos)')
+    parser.add_argument('--finalizar', action='store_true', help='classifica também o período aberto de cada veículo')
+    parser.add_argument('--data-inicio', help='ISO 8601, ex.: 2025-06-21T00:00:00')
+    parser.add_argument('--data-fim', help='ISO 8601, ex.: 2025-06-21T23:59:59')
+    argumentos = parser.parse_args()
+
+    app = Flask('sigx_classificacao_frota')
+    configurar_banco(app)
+    with app.app_context():
+        resultado = classificar_frota(
+            argumentos.processos,
+            datetime.fromisoformat(argumentos.data_inicio) if argumentos.data_inicio else None,
+            datetime.fromisoformat(argumentos.data_fim) if argumentos.data_fim else None,
+            argumentos.finalizar
+        )
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,40 +4,68 @@ Sistema inteligente para identificar e classificar eventos de jornada automatica
 """
 
 from datetime import datetime, timedelta
-from src.models import db, PosicaoRastreador, EventoJornada, TipoEvento, Veiculo, Motorista
+from sqlalchemy import insert, update
+from src.models import db, PosicaoRastreador, PeriodoAberto, EventoJornada, Veiculo, Motorista
+from src.models.texto_posicao import dicionario_textos
+from src.models.tipo_evento import registro_tipos_evento
+from src import segmentacao
+from src.identificacao_locais import categorias_local
+from src.regras_classificacao import tabela_decisao
+from src.geocercas import indice_geocercas
+from src.arquivo_posicoes import consultar_arquivo, mesclar_posicoes, posicoes_arquivadas
+from src.resumo_posicoes import registrar_processadas
+from src.trechos_posicoes import trecho_gravado
 import re
 
 class ClassificadorEventos:
     """Classe principal para classificação automática de eventos"""
     
-    def __init__(self):
+    # Ids por cláusula IN ao marcar posições como processadas
+    TAMANHO_LOTE_IDS = 500
+    
+    def __init__(self, motor=None, deteccao=None):
+        # Motor de segmentação: 'numpy' (vetorizado) ou 'python' (objeto a objeto)
+        self.motor = motor or segmentacao.MOTOR_SEGMENTACAO
+        # Detecção de paradas: 'velocidade' ou 'agrupamento' (ruído de velocidade perto da parada)
+        self.deteccao = deteccao or segmentacao.DETECCAO_PARADAS
         self.tipos_evento = {}
+        # Textos e tipo de local por local distinto (par ponto de referência/endereço)
+        self._locais = {}
         self._carregar_tipos_evento()
+        # Regras de classificação de paradas, compiladas uma vez por processo
+        self.tabela_regras = tabela_decisao.obter()
+        # Geocercas ativas, em grade espacial compartilhada pelo processo
+        self.indice_geocercas = indice_geocercas.obter()
     
     def _carregar_tipos_evento(self):
-        """Carrega os tipos de evento do banco de dados"""
-        tipos = TipoEvento.query.filter_by(ativo=True).all()
-        for tipo in tipos:
-            self.tipos_evento[tipo.nome] = tipo
+        """Carrega os tipos de evento ativos do registro em memória (sem consulta após a primeira carga)"""
+        self.tipos_evento = registro_tipos_evento.ativos()
     
-    def processar_veiculo(self, veiculo_id, data_inicio=None, data_fim=None):
+    def processar_veiculo(self, veiculo_id, data_inicio=None, data_fim=None, finalizar=False):
         """
-        Processa todas as posições de um veículo e identifica eventos automaticamente
+        Processa as posições não processadas de um veículo e identifica eventos automaticamente.
+        O último período fica aberto (PeriodoAberto) e é continuado pela próxima execução;
+        com finalizar=True, ele também é classificado.
         """
-        # Buscar posições não processadas
-        query = PosicaoRastreador.query.filter_by(
-            veiculo_id=veiculo_id,
-            processado=False
-        ).order_by(PosicaoRastreador.data_hora)
-        
+        filtros = [PosicaoRastreador.veiculo_id == veiculo_id, PosicaoRastreador.processado == False]
         if data_inicio:
-            query = query.filter(PosicaoRastreador.data_hora >= data_inicio)
+            filtros.append(PosicaoRastreador.data_hora >= data_inicio)
         if data_fim:
-            query = query.filter(PosicaoRastreador.data_hora <= data_fim)
+            filtros.append(PosicaoRastreador.data_hora <= data_fim)
         
-        posicoes = query.all()
+        estado = db.session.get(PeriodoAberto, veiculo_id)
+        periodo_estado = self._periodo_do_estado(estado) if estado else None
+        data_fim_estado = estado.data_fim if estado else None
         
-        if not posicoes:
+        # Identificar períodos de parada e movimento, continuando o período aberto.
+        # Posições anteriores ao fim do período aberto chegaram fora de ordem:
+        # são marcadas como processadas sem entrar na classificação
+        if self.motor == 'numpy':
+            ids_posicoes, periodos = segmentacao.segmentar_posicoes(filtros, periodo_estado, data_fim_estado, self.deteccao)
+        else:
+            ids_posicoes, periodos = self._segmentar_posicoes(filtros, periodo_estado, data_fim_estado)
+        
+        if not ids_posicoes and not (finalizar and estado):
             return []
         
         # Buscar informações do veículo e motorista
@@ -45,55 +73,111 @@ class ClassificadorEventos:
         if not veiculo or not veiculo.motorista_id:
             raise ValueError("Veículo não encontrado ou sem motorista associado")
         
-        # Identificar períodos de parada e movimento
-        periodos = self._identificar_periodos(posicoes)
-        
-        # Classificar cada período
-        eventos_identificados = []
-        for periodo in periodos:
-            evento = self._classificar_periodo(periodo, veiculo.id, veiculo.motorista_id)
-            if evento:
-                eventos_identificados.append(evento)
-        
-        # Marcar posições como processadas
-        for posicao in posicoes:
-            posicao.processado = True
+        # O último período pode continuar na próxima importação
+        periodo_aberto = None
+        if periodos and not finalizar:
+            periodo_aberto = periodos.pop()
+        
+        # Classificar os períodos (os eventos são gravados juntos ao final)
+        registros = self._classificar_periodos(periodos, veiculo.id, veiculo.motorista_id)
+        
+        eventos_identificados = self._gravar_eventos(registros, veiculo)
+        self._salvar_periodo_aberto(veiculo_id, estado, periodo_aberto)
+        
+        # Marcar posições como processadas (UPDATE por lotes de ids, sem flush objeto a objeto)
+        for inicio in range(0, len(ids_posicoes), self.TAMANHO_LOTE_IDS):
+            lote = ids_posicoes[inicio:inicio + self.TAMANHO_LOTE_IDS]
+            db.session.execute(
+                update(PosicaoRastreador)
+                .where(PosicaoRastreador.id.in_(lote))
+                .values(processado=True),
+                execution_options={'synchronize_session': False}
+            )
+            registrar_processadas(veiculo_id, lote)
         
+        # Eventos, período aberto e posições processadas na mesma transação
         db.session.commit()
         
         return eventos_identificados
     
-    def _identificar_periodos(self, posicoes):
-        """Identifica períodos de parada e movimento"""
-        periodos = []
+    def simular_classificacao(self, veiculo_id, data_inicio, data_fim, janela=timedelta(days=1)):
+        """
+        Executa a classificação sobre [data_inicio, data_fim] sem gravar nada: lê todas as posições
+        do intervalo (processadas ou não, inclusive as arquivadas) por janelas de tempo e gera os
+        registros dos eventos em ordem. Só uma janela de posições fica em memória por vez; o último
+        período de cada janela continua na seguinte, e o do fim do intervalo também é classificado.
+        """
+        veiculo = db.session.get(Veiculo, veiculo_id)
+        if not veiculo or not veiculo.motorista_id:
+            raise ValueError("Veículo não encontrado ou sem motorista associado")
+        
         periodo_atual = None
+        inicio = data_inicio
+        # data_fim inclusiva, como em processar_veiculo (as janelas são semiabertas)
+        limite = data_fim + timedelta(microseconds=1)
+        while inicio < limite:
+            fim = min(inicio + janela, limite)
+            periodos = self._segmentar_janela(veiculo_id, inicio, fim, periodo_atual)
+            periodo_atual = periodos.pop() if periodos else None
+            yield from self._classificar_periodos(periodos, veiculo.id, veiculo.motorista_id)
+            inicio = fim
         
-        for i, posicao in enumerate(posicoes):
+        if periodo_atual:
+            yield from self._classificar_periodos([periodo_atual], veiculo.id, veiculo.motorista_id)
+    
+    def _segmentar_janela(self, veiculo_id, inicio, fim, periodo_atual):
+        """Períodos das posições em [inicio, fim), continuando periodo_atual"""
+        filtros = [
+            PosicaoRastreador.veiculo_id == veiculo_id,
+            PosicaoRastreador.data_hora >= inicio,
+            PosicaoRastreador.data_hora < fim
+        ]
+        if consultar_arquivo(inicio):
+            arquivadas = [
+                posicao for posicao in posicoes_arquivadas(veiculo_id, inicio, fim) if posicao.data_hora < fim
+            ]
+            if arquivadas:
+                ativas = PosicaoRastreador.query.filter(*filtros).order_by(PosicaoRastreador.data_hora).all()
+                return self._identificar_periodos(mesclar_posicoes(ativas, arquivadas), periodo_atual)
+        
+        if self.motor == 'numpy':
+            return segmentacao.segmentar_posicoes(filtros, periodo_atual, deteccao=self.deteccao)[1]
+        return self._segmentar_posicoes(filtros, periodo_atual)[1]
+    
+    def _segmentar_posicoes(self, filtros, periodo_atual=None, data_fim_estado=None):
+        """Segmentação objeto a objeto (sem NumPy): retorna (ids lidos, períodos)"""
+        posicoes = PosicaoRastreador.query.filter(*filtros).order_by(PosicaoRastreador.data_hora).all()
+        novas = posicoes
+        if data_fim_estado is not None:
+            novas = [posicao for posicao in posicoes if posicao.data_hora > data_fim_estado]
+        return [posicao.id for posicao in posicoes], self._identificar_periodos(novas, periodo_atual)
+    
+    def _identificar_periodos(self, posicoes, periodo_atual=None):
+        """Identifica períodos de parada e movimento (periodo_atual: período aberto a continuar)"""
+        periodos = []
+        
+        for posicao in posicoes:
             # Determinar se está parado ou em movimento
             em_movimento = posicao.velocidade > 5  # Considera movimento acima de 5 km/h
+            # Agrupamento: velocidade acima do limite perto da parada atual é ruído do GPS
+            ruido = em_movimento and self._continua_parada(periodo_atual, posicao)
+            tipo = 'movimento' if em_movimento and not ruido else 'parada'
             
             if periodo_atual is None:
                 # Primeiro período
-                periodo_atual = {
-                    'tipo': 'movimento' if em_movimento else 'parada',
-                    'inicio': posicao,
-                    'fim': posicao,
-                    'posicoes': [posicao]
-                }
-            elif (em_movimento and periodo_atual['tipo'] == 'movimento') or \
-                 (not em_movimento and periodo_atual['tipo'] == 'parada'):
+                periodo_atual = self._novo_periodo(tipo, posicao)
+            elif tipo == periodo_atual['tipo']:
                 # Continuação do período atual
-                periodo_atual['fim'] = posicao
-                periodo_atual['posicoes'].append(posicao)
+                self._estender_periodo(periodo_atual, posicao)
             else:
                 # Mudança de tipo - finalizar período atual e iniciar novo
                 periodos.append(periodo_atual)
-                periodo_atual = {
-                    'tipo': 'movimento' if em_movimento else 'parada',
-                    'inicio': posicao,
-                    'fim': posicao,
-                    'posicoes': [posicao]
-                }
+                periodo_atual = self._novo_periodo(tipo, posicao)
+            
+            # Os pontos parados (não o ruído) ocupam as células da grade da parada
+            if tipo == 'parada' and not ruido and periodo_atual['grade'] is not None:
+                periodo_atual['grade'].adicionar(posicao.latitude, posicao.longitude)
+                periodo_atual['grade'].adicionar(posicao.latitude_final, posicao.longitude_final)
         
         # Adicionar último período
         if periodo_atual:
@@ -101,91 +185,149 @@ class ClassificadorEventos:
         
         return periodos
     
-    def _classificar_periodo(self, periodo, veiculo_id, motorista_id):
-        """Classifica um período específico"""
-        duracao_minutos = self._calcular_duracao_minutos(periodo['inicio'].data_hora, periodo['fim'].data_hora)
-        
-        # Períodos muito curtos (menos de 5 minutos) são ignorados
-        if duracao_minutos < 5:
-            return None
-        
-        if periodo['tipo'] == 'parada':
-            return self._classificar_parada(periodo, veiculo_id, motorista_id, duracao_minutos)
-        else:
-            return self._classificar_movimento(periodo, veiculo_id, motorista_id, duracao_minutos)
+    def _continua_parada(self, periodo, posicao):
+        """Posição perto da parada atual (grade dos pontos parados) e dentro do intervalo desde o último ponto"""
+        return (
+            periodo is not None and periodo['tipo'] == 'parada' and periodo['grade'] is not None
+            and (posicao.data_hora - periodo['fim'].data_hora_final).total_seconds() <= segmentacao.INTERVALO_PARADA_S
+            and periodo['grade'].perto(posicao.latitude, posicao.longitude)
+        )
+    
+    def _novo_periodo(self, tipo, posicao):
+        periodo = {
+            'tipo': tipo,
+            'inicio': posicao,
+            'fim': posicao,
+            'distancia_m': posicao.distancia_interna_m or 0,
+            'pontos': posicao.pontos,
+            'soma_latitude': 0.0,
+            'soma_longitude': 0.0,
+            'pontos_coordenadas': 0,
+            'grade': segmentacao.GradeParada() if tipo == 'parada' and self.deteccao == 'agrupamento' else None
+        }
+        self._acumular_centro(periodo, posicao)
+        return periodo
     
-    def _classificar_parada(self, periodo, veiculo_id, motorista_id, duracao_minutos):
-        """Classifica uma parada"""
-        hora_inicio = periodo['inicio'].data_hora.hour
-        ponto_referencia = periodo['inicio'].ponto_referencia or ''
-        endereco = periodo['inicio'].endereco or ''
-        
-        # 1. Interjornada (11+ horas)
-        if duracao_minutos >= 660:  # 11 horas
-            tipo_evento = self.tipos_evento.get('Interjornada')
-            return self._criar_evento(
-                veiculo_id, motorista_id, tipo_evento.id, periodo, duracao_minutos,
-                observacoes="Interjornada identificada automaticamente"
+    def _estender_periodo(self, periodo, posicao):
+        """Acrescenta a posição ao período, acumulando a distância desde o último ponto"""
+        anterior = periodo['fim']
+        # Trecho gravado na importação, quando parte do último ponto do período
+        trecho = trecho_gravado(posicao, anterior.data_hora_final)
+        if trecho is not None:
+            periodo['distancia_m'] += trecho[0]
+        elif posicao.latitude and posicao.longitude and anterior.latitude_final and anterior.longitude_final:
+            periodo['distancia_m'] += PosicaoRastreador.calcular_distancia(
+                anterior.latitude_final, anterior.longitude_final,
+                posicao.latitude, posicao.longitude
             )
+        # Distância entre os pontos absorvidos por uma posição compactada
+        periodo['distancia_m'] += posicao.distancia_interna_m or 0
+        periodo['fim'] = posicao
+        periodo['pontos'] += posicao.pontos
+        self._acumular_centro(periodo, posicao)
+    
+    def _acumular_centro(self, periodo, posicao):
+        """Soma as coordenadas da posição, com peso pelos pontos (compactadas: ponto médio entre o primeiro e o último)"""
+        if posicao.latitude and posicao.longitude and posicao.latitude_final and posicao.longitude_final:
+            periodo['soma_latitude'] += (posicao.latitude + posicao.latitude_final) / 2 * posicao.pontos
+            periodo['soma_longitude'] += (posicao.longitude + posicao.longitude_final) / 2 * posicao.pontos
+            periodo['pontos_coordenadas'] += posicao.pontos
+    
+    def _centro_periodo(self, periodo):
+        """Centro (média das coordenadas) do período, ou None sem coordenadas"""
+        if not periodo['pontos_coordenadas']:
+            return None
+        return (periodo['soma_latitude'] / periodo['pontos_coordenadas'],
+                periodo['soma_longitude'] / periodo['pontos_coordenadas'])
+    
+    def _periodo_do_estado(self, estado):
+        return {
+            'tipo': estado.tipo,
+            'inicio': estado.ponto_inicio(),
+            'fim': estado.ponto_fim(),
+            'distancia_m': estado.distancia_m or 0,
+            'pontos': estado.quantidade_pontos or 0,
+            'soma_latitude': estado.soma_latitude or 0.0,
+            'soma_longitude': estado.soma_longitude or 0.0,
+            'pontos_coordenadas': estado.pontos_coordenadas or 0,
+            'grade': (segmentacao.GradeParada.carregar(estado.celulas_parada)
+                      if estado.tipo == 'parada' and self.deteccao == 'agrupamento' else None)
+        }
+    
+    def _salvar_periodo_aberto(self, veiculo_id, estado, periodo):
+        """Grava (ou remove, sem período aberto) o estado do veículo para a próxima execução"""
+        if periodo is None:
+            if estado is not None:
+                db.session.delete(estado)
+            return
+        
+        if estado is None:
+            estado = PeriodoAberto(veiculo_id=veiculo_id)
+            db.session.add(estado)
+        
+        inicio, fim = periodo['inicio'], periodo['fim']
+        estado.tipo = periodo['tipo']
+        estado.data_inicio = inicio.data_hora
+        estado.latitude_inicio = inicio.latitude
+        estado.longitude_inicio = inicio.longitude
+        estado.endereco_inicio_id, estado.ponto_referencia_inicio_id = self._ids_textos(inicio)
+        estado.data_fim = fim.data_hora_final
+        estado.latitude_fim = fim.latitude_final
+        estado.longitude_fim = fim.longitude_final
+        estado.endereco_fim_id, estado.ponto_referencia_fim_id = self._ids_textos(fim)
+        estado.distancia_m = periodo['distancia_m']
+        estado.quantidade_pontos = periodo['pontos']
+        estado.soma_latitude = periodo['soma_latitude']
+        estado.soma_longitude = periodo['soma_longitude']
+        estado.pontos_coordenadas = periodo['pontos_coordenadas']
+        estado.celulas_parada = periodo['grade'].serializar() if periodo.get('grade') else None
+    
+    def _ids_textos(self, posicao):
+        """Ids de endereço e ponto de referência no dicionário de textos (posições antigas guardam o texto)"""
+        if posicao.endereco_texto is None and posicao.ponto_referencia_texto is None:
+            return posicao.endereco_id, posicao.ponto_referencia_id
         
-        # 2. Abastecimento (baseado no local)
-        if self._e_posto_combustivel(ponto_referencia, endereco) and 10 <= duracao_minutos <= 45:
-            tipo_evento = self.tipos_evento.get('Abastecimento')
-            return self._criar_evento(
-                veiculo_id, motorista_id, tipo_evento.id, periodo, duracao_minutos,
-                observacoes=f"Abastecimento em {ponto_referencia or endereco}"
-            )
+        ids = dicionario_textos.internar([posicao.endereco, posicao.ponto_referencia])
+        return ids.get(posicao.endereco), ids.get(posicao.ponto_referencia)
+    
+    def _classificar_periodos(self, periodos, veiculo_id, motorista_id):
+        """Classifica os períodos em ordem; as paradas são avaliadas em lote pela tabela de regras"""
+        classificaveis = []
+        for periodo in periodos:
+            # data_hora_final: último ponto de uma posição compactada (paradas)
+            duracao_minutos = self._calcular_duracao_minutos(periodo['inicio'].data_hora, periodo['fim'].data_hora_final)
+            # Períodos muito curtos (menos de 5 minutos) são ignorados
+            if duracao_minutos >= 5:
+                classificaveis.append((periodo, duracao_minutos))
+        
+        paradas = [(periodo, duracao) for periodo, duracao in classificaveis if periodo['tipo'] == 'parada']
+        locais = [self._local_parada(periodo) for periodo, _ in paradas]
+        regras = self.tabela_regras.avaliar([
+            (duracao, periodo['inicio'].data_hora.hour, local['categorias'])
+            for (periodo, duracao), local in zip(paradas, locais)
+        ])
+        eventos_paradas = {
+            id(periodo): self._classificar_parada(periodo, veiculo_id, motorista_id, duracao, local, regra)
+            for (periodo, duracao), local, regra in zip(paradas, locais, regras)
+        }
         
-        # 3. Carga/Descarga (baseado no local e horário)
-        if self._e_local_carga_descarga(ponto_referencia, endereco) and 30 <= duracao_minutos <= 300:
-            if hora_inicio < 12:
-                tipo_evento = self.tipos_evento.get('Carga')
-                observacoes = f"Carga em {ponto_referencia or endereco}"
+        registros = []
+        for periodo, duracao in classificaveis:
+            if periodo['tipo'] == 'parada':
+                registro = eventos_paradas[id(periodo)]
             else:
-                tipo_evento = self.tipos_evento.get('Descarga')
-                observacoes = f"Descarga em {ponto_referencia or endereco}"
-            
-            return self._criar_evento(
-                veiculo_id, motorista_id, tipo_evento.id, periodo, duracao_minutos,
-                observacoes=observacoes
-            )
-        
-        # 4. Refeições (baseado no horário e duração)
-        if 30 <= duracao_minutos <= 120:
-            if 11 <= hora_inicio <= 14:  # Horário de almoço
-                tipo_evento = self.tipos_evento.get('Almoço')
-                return self._criar_evento(
-                    veiculo_id, motorista_id, tipo_evento.id, periodo, duracao_minutos,
-                    observacoes="Almoço identificado por horário"
-                )
-            elif 18 <= hora_inicio <= 21:  # Horário de jantar
-                tipo_evento = self.tipos_evento.get('Almoço')
-                return self._criar_evento(
-                    veiculo_id, motorista_id, tipo_evento.id, periodo, duracao_minutos,
-                    observacoes="Jantar identificado por horário"
-                )
-        
-        # 5. Lanche/Café
-        if 15 <= duracao_minutos <= 45:
-            tipo_evento = self.tipos_evento.get('Café/Lanche')
-            return self._criar_evento(
-                veiculo_id, motorista_id, tipo_evento.id, periodo, duracao_minutos,
-                observacoes="Lanche/café identificado por duração"
-            )
-        
-        # 6. Manutenção (baseado no local)
-        if self._e_oficina_manutencao(ponto_referencia, endereco) and 60 <= duracao_minutos <= 480:
-            tipo_evento = self.tipos_evento.get('Manutenção')
-            return self._criar_evento(
-                veiculo_id, motorista_id, tipo_evento.id, periodo, duracao_minutos,
-                observacoes=f"Manutenção em {ponto_referencia or endereco}"
-            )
-        
-        # 7. Outros (paradas não categorizadas)
-        tipo_evento = self.tipos_evento.get('Outros')
+                registro = self._classificar_movimento(periodo, veiculo_id, motorista_id, duracao)
+            if registro:
+                registros.append(registro)
+        return registros
+    
+    def _classificar_parada(self, periodo, veiculo_id, motorista_id, duracao_minutos, local, regra):
+        """Evento da parada conforme a regra aplicada (RegraClassificacao); sem regra, não gera evento"""
+        if regra is None:
+            return None
         return self._criar_evento(
-            veiculo_id, motorista_id, tipo_evento.id, periodo, duracao_minutos,
-            observacoes="Parada não categorizada automaticamente"
+            veiculo_id, motorista_id, regra.tipo_evento_id, periodo, duracao_minutos,
+            observacoes=regra.observacoes(local['ponto_referencia'] or local['endereco'])
         )
     
     def _classificar_movimento(self, periodo, veiculo_id, motorista_id, duracao_minutos):
@@ -201,34 +343,41 @@ class ClassificadorEventos:
             observacoes=f"Condução - Distância aproximada: {distancia_km:.1f} km"
         )
     
-    def _e_posto_combustivel(self, ponto_referencia, endereco):
-        """Verifica se o local é um posto de combustível"""
-        texto = f"{ponto_referencia} {endereco}".lower()
-        palavras_posto = [
-            'posto', 'combustivel', 'shell', 'petrobras', 'ipiranga', 'br',
-            'ale', 'texaco', 'esso', 'dom pedro', 'gasolina', 'diesel'
-        ]
-        return any(palavra in texto for palavra in palavras_posto)
-    
-    def _e_local_carga_descarga(self, ponto_referencia, endereco):
-        """Verifica se o local é adequado para carga/descarga"""
-        texto = f"{ponto_referencia} {endereco}".lower()
-        palavras_carga = [
-            'empresa', 'industria', 'fabrica', 'deposito', 'armazem',
-            'terminal', 'porto', 'patio', 'usina', 'mineracao',
-            'siderurgica', 'metalurgica', 'quimica', 'cimento',
-            'aperam', 'csn', 'vale', 'olatrans'
-        ]
-        return any(palavra in texto for palavra in palavras_carga)
+    def _local_parada(self, periodo):
+        """
+        Local da parada: as geocercas que contêm o centro da parada definem as categorias e o nome
+        do local (a menor primeiro); fora de geocercas, vale o tipo de local pelos textos da posição
+        """
+        local = self._caracteristicas_local(periodo['inicio'])
+        centro = self._centro_periodo(periodo) if len(self.indice_geocercas) else None
+        geocercas = self.indice_geocercas.localizar(*centro) if centro else []
+        if not geocercas:
+            return local
+        return {
+            'ponto_referencia': geocercas[0].nome,
+            'endereco': local['endereco'],
+            'categorias': frozenset(geocerca.categoria for geocerca in geocercas)
+        }
     
-    def _e_oficina_manutencao(self, ponto_referencia, endereco):
-        """Verifica se o local é uma oficina de manutenção"""
-        texto = f"{ponto_referencia} {endereco}".lower()
-        palavras_oficina = [
-            'oficina', 'manutencao', 'revisao', 'mecanica', 'borracharia',
-            'eletrica', 'funilaria', 'pintura', 'lavagem', 'servicos'
-        ]
-        return any(palavra in texto for palavra in palavras_oficina)
+    def _caracteristicas_local(self, posicao):
+        """Textos e tipo de local da posição, avaliados uma vez por local distinto"""
+        # Posições do dicionário de textos são identificadas pelos ids; as antigas, pelos textos
+        chave = (
+            posicao.ponto_referencia_id or posicao.ponto_referencia_texto,
+            posicao.endereco_id or posicao.endereco_texto
+        )
+        local = self._locais.get(chave)
+        if local is None:
+            ponto_referencia = posicao.ponto_referencia or ''
+            endereco = posicao.endereco or ''
+            local = {
+                'ponto_referencia': ponto_referencia,
+                'endereco': endereco,
+                # ex.: {'posto_combustivel'}, conforme as palavras-chave de src/identificacao_locais.py
+                'categorias': categorias_local(ponto_referencia, endereco)
+            }
+            self._locais[chave] = local
+        return local
     
     def _calcular_duracao_minutos(self, inicio, fim):
         """Calcula duração em minutos entre duas datas"""
@@ -236,44 +385,83 @@ class ClassificadorEventos:
         return int(delta.total_seconds() / 60)
     
     def _calcular_distancia_periodo(self, periodo):
-        """Calcula distância aproximada percorrida no período"""
-        distancia_total = 0
-        posicoes = periodo['posicoes']
-        
-        for i in range(1, len(posicoes)):
-            if posicoes[i].latitude and posicoes[i].longitude and \
-               posicoes[i-1].latitude and posicoes[i-1].longitude:
-                distancia = PosicaoRastreador.calcular_distancia(
-                    posicoes[i-1].latitude, posicoes[i-1].longitude,
-                    posicoes[i].latitude, posicoes[i].longitude
-                )
-                distancia_total += distancia
-        
-        return distancia_total / 1000  # Converter para km
+        """Distância aproximada percorrida no período, em km (acumulada em _estender_periodo)"""
+        return periodo['distancia_m'] / 1000
     
     def _criar_evento(self, veiculo_id, motorista_id, tipo_evento_id, periodo, duracao_minutos, observacoes=""):
-        """Cria um evento de jornada"""
-        evento = EventoJornada(
-            veiculo_id=veiculo_id,
-            motorista_id=motorista_id,
-            tipo_evento_id=tipo_evento_id,
-            data_inicio=periodo['inicio'].data_hora,
-            data_fim=periodo['fim'].data_hora,
-            duracao_minutos=duracao_minutos,
-            latitude_inicio=periodo['inicio'].latitude,
-            longitude_inicio=periodo['inicio'].longitude,
-            latitude_fim=periodo['fim'].latitude,
-            longitude_fim=periodo['fim'].longitude,
-            endereco_inicio=periodo['inicio'].endereco,
-            endereco_fim=periodo['fim'].endereco,
-            observacoes=observacoes,
-            classificacao_automatica=True
-        )
+        """Monta os valores de um evento de jornada (gravado em lote por _gravar_eventos)"""
+        return {
+            'veiculo_id': veiculo_id,
+            'motorista_id': motorista_id,
+            'tipo_evento_id': tipo_evento_id,
+            'data_inicio': periodo['inicio'].data_hora,
+            'data_fim': periodo['fim'].data_hora_final,
+            'duracao_minutos': duracao_minutos,
+            'latitude_inicio': periodo['inicio'].latitude,
+            'longitude_inicio': periodo['inicio'].longitude,
+            'latitude_fim': periodo['fim'].latitude_final,
+            'longitude_fim': periodo['fim'].longitude_final,
+            'endereco_inicio': periodo['inicio'].endereco,
+            'endereco_fim': periodo['fim'].endereco,
+            'observacoes': observacoes,
+            'classificacao_automatica': True,
+            'aprovado': False,
+            'sincronizado_sigx': False
+        }
+    
+    def _gravar_eventos(self, registros, veiculo):
+        """
+        Insere os eventos em um único INSERT em lote (RETURNING id) e retorna os dicionários no formato
+        de EventoJornada.to_dict, montados com os dados já em memória. Não faz commit.
+        """
+        if not registros:
+            return []
         
-        db.session.add(evento)
-        db.session.commit()
+        criado_em = datetime.utcnow()
+        for registro in registros:
+            registro['created_at'] = criado_em
+        
+        ids = db.session.execute(
+            insert(EventoJornada).returning(EventoJornada.id, sort_by_parameter_order=True),
+            registros
+        ).scalars().all()
         
-        return evento.to_dict()
+        tipos = {tipo.id: tipo.to_dict() for tipo in self.tipos_evento.values()}
+        veiculo_dict = veiculo.to_dict()
+        motorista_dict = veiculo.motorista.to_dict() if veiculo.motorista else None
+        
+        return [
+            self._resultado_evento(evento_id, registro, tipos.get(registro['tipo_evento_id']), veiculo_dict, motorista_dict)
+            for evento_id, registro in zip(ids, registros)
+        ]
+    
+    def _resultado_evento(self, evento_id, registro, tipo_dict, veiculo_dict, motorista_dict):
+        """Mesmas chaves de EventoJornada.to_dict"""
+        return {
+            'id': evento_id,
+            'veiculo_id': registro['veiculo_id'],
+            'motorista_id': registro['motorista_id'],
+            'tipo_evento_id': registro['tipo_evento_id'],
+            'data_inicio': registro['data_inicio'].isoformat(),
+            'data_fim': registro['data_fim'].isoformat() if registro['data_fim'] else None,
+            'duracao_minutos': registro['duracao_minutos'],
+            'latitude_inicio': registro['latitude_inicio'] if registro['latitude_inicio'] else None,
+            'longitude_inicio': registro['longitude_inicio'] if registro['longitude_inicio'] else None,
+            'latitude_fim': registro['latitude_fim'] if registro['latitude_fim'] else None,
+            'longitude_fim': registro['longitude_fim'] if registro['longitude_fim'] else None,
+            'endereco_inicio': registro['endereco_inicio'],
+            'endereco_fim': registro['endereco_fim'],
+            'observacoes': registro['observacoes'],
+            'classificacao_automatica': True,
+            'aprovado': False,
+            'usuario_aprovacao': None,
+            'data_aprovacao': None,
+            'sincronizado_sigx': False,
+            'created_at': registro['created_at'].isoformat(),
+            'tipo_evento': tipo_dict,
+            'veiculo': veiculo_dict,
+            'motorista': motorista_dict
+        }
 
 
 class AnalisadorPadroes:
@@ -298,7 +486,8 @@ class AnalisadorPadroes:
         }
         
         for evento in eventos:
-            tipo_nome = evento.tipo_evento.nome if evento.tipo_evento else 'Desconhecido'
+            tipo_evento = registro_tipos_evento.por_id(evento.tipo_evento_id)
+            tipo_nome = tipo_evento.nome if tipo_evento else 'Desconhecido'
             
             # Analisar horários de refeição
             if tipo_nome == 'Almoço':
@@ -347,16 +536,16 @@ class AnalisadorPadroes:
         
         sugestoes = []
         for evento in eventos_pendentes:
+            tipo_evento = registro_tipos_evento.por_id(evento.tipo_evento_id)
             sugestao = {
                 'evento_id': evento.id,
-                'tipo_atual': evento.tipo_evento.nome if evento.tipo_evento else 'N/A',
+                'tipo_atual': tipo_evento.nome if tipo_evento else 'N/A',
                 'sugestoes': [],
                 'confianca': 'baixa'
             }
             
             # Analisar se duração está fora do padrão
             if evento.duracao_minutos:
-                tipo_evento = evento.tipo_evento
                 if tipo_evento and tipo_evento.duracao_minima and evento.duracao_minutos < tipo_evento.duracao_minima:
                     sugestao['sugestoes'].append(f"Duração muito curta para {tipo_evento.nome}")
                 elif tipo_evento and tipo_evento.duracao_maxima and evento.duracao_minutos > tipo_evento.duracao_maxima:
@@ -364,7 +553,7 @@ class AnalisadorPadroes:
             
             # Analisar horário vs tipo de evento
             hora = evento.data_inicio.hour
-            if evento.tipo_evento and evento.tipo_evento.nome == 'Almoço':
+            if tipo_evento and tipo_evento.nome == 'Almoço':
                 if not (11 <= hora <= 14 or 18 <= hora <= 21):
                     sugestao['sugestoes'].append("Horário atípico para refeição")
             
@@ -375,8 +564,8 @@ class AnalisadorPadroes:
 
 
 # Função utilitária para uso nas rotas
-def classificar_eventos_automaticamente(veiculo_id, data_inicio=None, data_fim=None):
+def classificar_eventos_automaticamente(veiculo_id, data_inicio=None, data_fim=None, finalizar=False, motor=None, deteccao=None):
     """Função principal para classificação automática"""
-    classificador = ClassificadorEventos()
-    return classificador.processar_veiculo(veiculo_id, data_inicio, data_fim)
+    classificador = ClassificadorEventos(motor, deteccao)
+    return classificador.processar_veiculo(veiculo_id, data_inicio, data_fim, finalizar)
 
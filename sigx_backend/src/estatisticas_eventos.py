@@ -0,0 +1,114 @@
+"""
+Módulo de Estatísticas de Eventos
+Contagens dos eventos de jornada calculadas no banco (GROUP BY com somas condicionais), sem carregar
+os eventos: o resumo sai de uma consulta agrupada por tipo, e as quebras por motorista, veículo,
+dia e tipo, de uma consulta agrupada pelas dimensões pedidas.
+"""
+
+from datetime import date
+from sqlalchemy import select, func, case
+from src.models import db, EventoJornada
+from src.models.tipo_evento import registro_tipos_evento
+
+# Dimensão -> (chave na resposta, expressão de agrupamento)
+DIMENSOES = {
+    'motorista': ('motorista_id', EventoJornada.motorista_id),
+    'veiculo': ('veiculo_id', EventoJornada.veiculo_id),
+    'dia': ('dia', func.date(EventoJornada.data_inicio)),
+    'tipo': ('tipo_evento_id', EventoJornada.tipo_evento_id),
+}
+
+
+def _contar(condicao):
+    return func.coalesce(func.sum(case((condicao, 1), else_=0)), 0)
+
+
+MEDIDAS = (
+    func.count().label('total_eventos'),
+    _contar(EventoJornada.aprovado == True).label('eventos_aprovados'),
+    _contar(EventoJornada.classificacao_automatica == True).label('eventos_automaticos'),
+    _contar(EventoJornada.sincronizado_sigx == True).label('eventos_sincronizados'),
+    func.coalesce(func.sum(EventoJornada.duracao_minutos), 0).label('duracao_minutos'),
+)
+CHAVES_MEDIDAS = tuple(medida.name for medida in MEDIDAS)
+
+
+def _filtros(veiculo_id=None, motorista_id=None, data_inicio=None, data_fim=None):
+    filtros = []
+    if veiculo_id:
+        filtros.append(EventoJornada.veiculo_id == veiculo_id)
+    if motorista_id:
+        filtros.append(EventoJornada.motorista_id == motorista_id)
+    if data_inicio:
+        filtros.append(EventoJornada.data_inicio >= data_inicio)
+    if data_fim:
+        filtros.append(EventoJornada.data_inicio <= data_fim)
+    return filtros
+
+
+def _nome_tipo(tipo_evento_id):
+    tipo = registro_tipos_evento.por_id(tipo_evento_id)
+    return tipo.nome if tipo else 'Desconhecido'
+
+
+def _percentual(parte, total):
+    return round((parte / total) * 100, 2) if total > 0 else 0
+
+
+def resumo_eventos(contagens):
+    """Resumo no formato de /api/eventos/estatisticas a partir das somas das medidas"""
+    total = contagens['total_eventos']
+    return {
+        'total_eventos': total,
+        'eventos_aprovados': contagens['eventos_aprovados'],
+        'eventos_pendentes': total - contagens['eventos_aprovados'],
+        'eventos_automaticos': contagens['eventos_automaticos'],
+        'eventos_manuais': total - contagens['eventos_automaticos'],
+        'eventos_sincronizados': contagens['eventos_sincronizados'],
+        'percentual_aprovados': _percentual(contagens['eventos_aprovados'], total),
+        'percentual_automaticos': _percentual(contagens['eventos_automaticos'], total)
+    }
+
+
+def calcular_estatisticas_eventos(veiculo_id=None, motorista_id=None, data_inicio=None, data_fim=None, agrupar=()):
+    """
+    Estatísticas dos eventos filtrados: resumo, contagem por tipo e, com agrupar (lista de
+    'motorista', 'veiculo', 'dia', 'tipo'), as medidas de cada combinação das dimensões
+    """
+    desconhecidas = [dimensao for dimensao in agrupar if dimensao not in DIMENSOES]
+    if desconhecidas:
+        raise ValueError(f"agrupar inválido: {', '.join(desconhecidas)} (use {', '.join(DIMENSOES)})")
+
+    filtros = _filtros(veiculo_id, motorista_id, data_inicio, data_fim)
+
+    # Resumo e contagem por tipo: uma linha por tipo, somadas aqui
+    totais = dict.fromkeys(CHAVES_MEDIDAS, 0)
+    por_tipo = {}
+    for linha in db.session.execute(
+        select(EventoJornada.tipo_evento_id, *MEDIDAS).where(*filtros).group_by(EventoJornada.tipo_evento_id)
+    ):
+        for chave in CHAVES_MEDIDAS:
+            totais[chave] += linha._mapping[chave]
+        nome = _nome_tipo(linha.tipo_evento_id)
+        por_tipo[nome] = por_tipo.get(nome, 0) + linha.total_eventos
+
+    resultado = {
+        'estatisticas': resumo_eventos(totais),
+        'por_tipo': por_tipo
+    }
+
+    if agrupar:
+        dimensoes = [DIMENSOES[dimensao] for dimensao in dict.fromkeys(agrupar)]
+        colunas = [expressao.label(chave) for chave, expressao in dimensoes]
+        consulta = select(*colunas, *MEDIDAS).where(*filtros).group_by(*colunas).order_by(*colunas)
+        grupos = []
+        for linha in db.session.execute(consulta):
+            grupo = dict(linha._mapping)
+            if isinstance(grupo.get('dia'), date):
+                grupo['dia'] = grupo['dia'].isoformat()
+            if 'tipo_evento_id' in grupo:
+                grupo['tipo_evento'] = _nome_tipo(grupo['tipo_evento_id'])
+            grupos.append(grupo)
+        resultado['grupos'] = grupos
+
+    return resultado
@@ -0,0 +1,188 @@
+"""
+Módulo de Fila de Tarefas
+Execução assíncrona de importações e classificações, com estado persistido no banco
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from src.models import db, Tarefa, Veiculo
+from src.classificador_eventos import classificar_eventos_automaticamente
+from src.ingestao_posicoes import CONTADORES_IMPORTACAO, ImportadorPosicoes, converter_data_hora, em_lotes
+from src.arquivo_posicoes import arquivar_posicoes
+from src.classificacao_frota import classificar_frota
+
+
+class FilaTarefas:
+    """Fila local de tarefas executadas por um pool de threads"""
+
+    # Posições confirmadas por commit; o progresso da tarefa é atualizado a cada lote
+    TAMANHO_LOTE = 1000
+
+    def __init__(self):
+        self._app = None
+        self._executor = None
+
+    def iniciar(self, app, max_trabalhadores=None):
+        """Inicia o pool de trabalhadores e retoma as tarefas interrompidas"""
+        if self._executor:
+            return
+
+        if max_trabalhadores is None:
+            max_trabalhadores = int(os.environ.get('SIGX_TAREFAS_TRABALHADORES', 2))
+
+        self._app = app
+        self._executor = ThreadPoolExecutor(max_workers=max_trabalhadores, thread_name_prefix='sigx-tarefa')
+
+        with app.app_context():
+            # Tarefas em execução quando o processo parou voltam para a fila
+            interrompidas = Tarefa.query.filter(Tarefa.estado.in_(['pendente', 'executando'])) \
+                .order_by(Tarefa.created_at).all()
+            for tarefa in interrompidas:
+                tarefa.estado = 'pendente'
+            db.session.commit()
+
+            ids = [tarefa.id for tarefa in interrompidas]
+
+        for tarefa_id in ids:
+            self._executor.submit(self._executar, tarefa_id)
+
+        if ids:
+            print(f"{len(ids)} tarefa(s) retomada(s)")
+
+    def enfileirar(self, tipo, parametros):
+        """Grava a tarefa como pendente e a envia ao pool; retorna a tarefa criada"""
+        if tipo not in EXECUTORES:
+            raise ValueError(f"Tipo de tarefa desconhecido: {tipo}")
+        if not self._executor:
+            raise RuntimeError("Fila de tarefas não iniciada")
+
+        tarefa = Tarefa(tipo=tipo, estado='pendente')
+        tarefa.definir_parametros(parametros)
+        db.session.add(tarefa)
+        db.session.commit()
+
+        self._executor.submit(self._executar, tarefa.id)
+        return tarefa
+
+    def _executar(self, tarefa_id):
+        """Executa uma tarefa no contexto da aplicação"""
+        with self._app.app_context():
+            try:
+                # Reserva atômica: só um trabalhador passa de 'pendente' para 'executando'
+                reservadas = Tarefa.query.filter_by(id=tarefa_id, estado='pendente').update({
+                    'estado': 'executando',
+                    'iniciada_em': datetime.utcnow(),
+                    'tentativas': Tarefa.tentativas + 1
+                })
+                db.session.commit()
+                if not reservadas:
+                    return
+
+                tarefa = Tarefa.query.get(tarefa_id)
+                contadores = EXECUTORES[tarefa.tipo](tarefa)
+
+                tarefa.definir_contadores(contadores)
+                tarefa.estado = 'concluida'
+                tarefa.concluida_em = datetime.utcnow()
+
+                # Os dados de entrada já foram gravados; não precisam ocupar espaço na tarefa
+                parametros = tarefa.obter_parametros()
+                if 'posicoes' in parametros:
+                    parametros['total_posicoes'] = len(parametros.pop('posicoes'))
+                    tarefa.definir_parametros(parametros)
+
+                db.session.commit()
+
+            except Exception as e:
+                db.session.rollback()
+                tarefa = Tarefa.query.get(tarefa_id)
+                if tarefa:
+                    tarefa.estado = 'erro'
+                    tarefa.erro = str(e)
+                    tarefa.concluida_em = datetime.utcnow()
+                    db.session.commit()
+
+            finally:
+                db.session.remove()
+
+
+def _executar_importacao(tarefa):
+    """Importa as posições da tarefa em lotes, atualizando o progresso a cada lote"""
+    parametros = tarefa.obter_parametros()
+
+    veiculo = Veiculo.query.filter_by(placa=parametros.get('veiculo_placa')).first()
+    if not veiculo:
+        raise ValueError(f"Veículo com placa {parametros.get('veiculo_placa')} não encontrado")
+
+    importador = ImportadorPosicoes(veiculo.id, parametros.get('compactar_paradas'))
+    contadores = dict.fromkeys(CONTADORES_IMPORTACAO, 0)
+    contadores['lotes'] = 0
+
+    for lote in em_lotes(parametros.get('posicoes', []), FilaTarefas.TAMANHO_LOTE):
+        resultado = importador.importar(lote)
+        for chave in CONTADORES_IMPORTACAO:
+            contadores[chave] += resultado[chave]
+        contadores['lotes'] += 1
+
+        tarefa.definir_contadores(contadores)
+        db.session.commit()
+
+    if parametros.get('classificar_automaticamente', False) and contadores['posicoes_importadas'] > 0:
+        try:
+            eventos_classificados = classificar_eventos_automaticamente(veiculo.id)
+            contadores['eventos_classificados'] = len(eventos_classificados)
+        except Exception as e:
+            db.session.rollback()
+            contadores['erro_classificacao'] = f"Erro na classificação automática: {str(e)}"
+
+    return contadores
+
+
+def _executar_classificacao(tarefa):
+    """Classifica as posições não processadas de um veículo"""
+    parametros = tarefa.obter_parametros()
+
+    data_inicio = parametros.get('data_inicio')
+    data_fim = parametros.get('data_fim')
+
+    eventos_classificados = classificar_eventos_automaticamente(
+        parametros['veiculo_id'],
+        converter_data_hora(data_inicio) if data_inicio else None,
+        converter_data_hora(data_fim) if data_fim else None,
+        parametros.get('finalizar', False)
+    )
+
+    return {'eventos_classificados': len(eventos_classificados)}
+
+
+def _executar_classificacao_frota(tarefa):
+    """Classifica todos os veículos com posições pendentes no pool de processos"""
+    parametros = tarefa.obter_parametros()
+
+    data_inicio = parametros.get('data_inicio')
+    data_fim = parametros.get('data_fim')
+
+    return classificar_frota(
+        parametros.get('processos'),
+        converter_data_hora(data_inicio) if data_inicio else None,
+        converter_data_hora(data_fim) if data_fim else None,
+        parametros.get('finalizar', False)
+    )
+
+
+def _executar_arquivamento(tarefa):
+    """Arquiva as posições processadas mais antigas que a idade informada"""
+    return arquivar_posicoes(tarefa.obter_parametros().get('dias'))
+
+
+# Executores por tipo de tarefa
+EXECUTORES = {
+    'importacao': _executar_importacao,
+    'classificacao': _executar_classificacao,
+    'classificacao_frota': _executar_classificacao_frota,
+    'arquivamento': _executar_arquivamento
+}
+
+# Instância única da fila
+fila_tarefas = FilaTarefas()
@@ -0,0 +1,243 @@
+"""
+Módulo de Geocercas
+Valida as geocercas (círculos e polígonos com uma categoria de local) e as indexa em uma grade
+espacial em memória: cada geocerca é registrada nas células que o seu retângulo envolvente cobre,
+e a busca de um ponto testa só as geocercas da célula do ponto, em vez de todas as cadastradas.
+O índice é compartilhado pelo processo e refeito quando uma geocerca é alterada.
+"""
+
+import json
+import math
+import os
+import threading
+import weakref
+from sqlalchemy import select
+from src.models import db
+from src.models.geocerca import Geocerca
+from src.models.invalidacao import invalidar_ao_alterar
+from src.models.posicao_rastreador import PosicaoRastreador
+from src.identificacao_locais import categorias_disponiveis
+
+FORMAS_GEOCERCA = ('circulo', 'poligono')
+RAIO_MAXIMO_M = 50000
+METROS_POR_GRAU = 111320
+
+# Lado da célula da grade em graus (0,01° ≈ 1,1 km)
+TAMANHO_CELULA_GRAUS = float(os.environ.get('SIGX_GEOCERCA_CELULA_GRAUS', 0.01))
+# Geocercas que cobririam mais células que isto ficam fora da grade (testadas pelo retângulo envolvente)
+MAXIMO_CELULAS_GEOCERCA = 400
+
+
+def _coordenada(valor, campo, limite):
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"{campo} inválida: {valor}")
+    if not -limite <= valor <= limite or valor == 0:
+        raise ValueError(f"{campo} fora do intervalo: {valor}")
+    return valor
+
+
+def normalizar_geocerca(dados):
+    """
+    Valida os dados de uma geocerca (JSON da API) e retorna os valores das colunas.
+    Polígono: vertices [[latitude, longitude], ...] com ao menos 3 pontos; círculo: latitude, longitude e raio_m.
+    """
+    nome = (dados.get('nome') or '').strip()
+    if not nome:
+        raise ValueError("Campo obrigatório: nome")
+
+    categoria = dados.get('categoria')
+    if categoria not in categorias_disponiveis():
+        raise ValueError(f"categoria inválida: {categoria} (use {', '.join(categorias_disponiveis())})")
+
+    forma = dados.get('forma') or ('poligono' if dados.get('vertices') else 'circulo')
+    if forma not in FORMAS_GEOCERCA:
+        raise ValueError(f"forma inválida: {forma} (use 'circulo' ou 'poligono')")
+
+    valores = {
+        'nome': nome,
+        'categoria': categoria,
+        'forma': forma,
+        'latitude': None,
+        'longitude': None,
+        'raio_m': None,
+        'vertices': None,
+        'ativo': bool(dados.get('ativo', True))
+    }
+
+    if forma == 'circulo':
+        valores['latitude'] = _coordenada(dados.get('latitude'), 'latitude', 90)
+        valores['longitude'] = _coordenada(dados.get('longitude'), 'longitude', 180)
+        try:
+            raio_m = float(dados.get('raio_m'))
+        except (TypeError, ValueError):
+            raise ValueError(f"raio_m inválido: {dados.get('raio_m')}")
+        if not 0 < raio_m <= RAIO_MAXIMO_M:
+            raise ValueError(f"raio_m deve estar entre 0 e {RAIO_MAXIMO_M}")
+        valores['raio_m'] = raio_m
+    else:
+        vertices = dados.get('vertices')
+        if not isinstance(vertices, list) or not all(isinstance(v, (list, tuple)) and len(v) == 2 for v in vertices):
+            raise ValueError("vertices deve ser uma lista de [latitude, longitude]")
+        vertices = [
+            [_coordenada(v[0], 'latitude', 90), _coordenada(v[1], 'longitude', 180)] for v in vertices
+        ]
+        # Anel fechado (último vértice igual ao primeiro, como no GeoJSON)
+        if len(vertices) > 1 and vertices[0] == vertices[-1]:
+            vertices.pop()
+        if len(vertices) < 3:
+            raise ValueError("O polígono precisa de ao menos 3 vértices")
+        valores['vertices'] = json.dumps(vertices)
+
+    return valores
+
+
+def geocercas_geojson(colecao):
+    """
+    Converte uma FeatureCollection GeoJSON no formato da API: Polygon (anel externo) ou Point com
+    properties.raio_m; nome, categoria e ativo vêm de properties. Coordenadas GeoJSON são [longitude, latitude].
+    """
+    geocercas = []
+    for feature in colecao.get('features') or []:
+        propriedades = dict(feature.get('properties') or {})
+        geometria = feature.get('geometry') or {}
+        coordenadas = geometria.get('coordinates') or []
+        if geometria.get('type') == 'Point' and len(coordenadas) >= 2:
+            propriedades.update(forma='circulo', longitude=coordenadas[0], latitude=coordenadas[1])
+        elif geometria.get('type') == 'Polygon' and coordenadas:
+            propriedades.update(forma='poligono', vertices=[
+                [ponto[1], ponto[0]] for ponto in coordenadas[0] if isinstance(ponto, (list, tuple)) and len(ponto) >= 2
+            ])
+        else:
+            # Geometria não suportada: a validação aponta o erro do item
+            propriedades['forma'] = geometria.get('type')
+        geocercas.append(propriedades)
+    return geocercas
+
+
+class GeocercaCompilada:
+    """Geocerca ativa com o retângulo envolvente e a área já calculados"""
+    __slots__ = ('id', 'nome', 'categoria', 'area_m2', 'latitude_minima', 'latitude_maxima',
+                 'longitude_minima', 'longitude_maxima', '_centro', '_raio_m', '_vertices')
+
+    def __init__(self, id, nome, categoria, forma, latitude=None, longitude=None, raio_m=None, vertices=None):
+        self.id = id
+        self.nome = nome
+        self.categoria = categoria
+        if forma == 'circulo':
+            self._centro = (latitude, longitude)
+            self._raio_m = raio_m
+            self._vertices = None
+            delta_latitude = raio_m / METROS_POR_GRAU
+            delta_longitude = raio_m / (METROS_POR_GRAU * max(math.cos(math.radians(latitude)), 0.01))
+            self.latitude_minima, self.latitude_maxima = latitude - delta_latitude, latitude + delta_latitude
+            self.longitude_minima, self.longitude_maxima = longitude - delta_longitude, longitude + delta_longitude
+            self.area_m2 = math.pi * raio_m ** 2
+        else:
+            self._centro = None
+            self._raio_m = None
+            self._vertices = [tuple(vertice) for vertice in vertices]
+            latitudes = [vertice[0] for vertice in self._vertices]
+            longitudes = [vertice[1] for vertice in self._vertices]
+            self.latitude_minima, self.latitude_maxima = min(latitudes), max(latitudes)
+            self.longitude_minima, self.longitude_maxima = min(longitudes), max(longitudes)
+            # Fórmula do laço (shoelace) em graus, convertida para m² na latitude média
+            area_graus = abs(sum(
+                latitudes[i - 1] * longitudes[i] - latitudes[i] * longitudes[i - 1] for i in range(len(latitudes))
+            )) / 2
+            self.area_m2 = area_graus * METROS_POR_GRAU ** 2 * math.cos(math.radians(sum(latitudes) / len(latitudes)))
+
+    @classmethod
+    def do_modelo(cls, geocerca):
+        return cls(geocerca.id, geocerca.nome, geocerca.categoria, geocerca.forma, geocerca.latitude,
+                   geocerca.longitude, geocerca.raio_m, geocerca.lista_vertices())
+
+    def contem(self, latitude, longitude):
+        if not (self.latitude_minima <= latitude <= self.latitude_maxima
+                and self.longitude_minima <= longitude <= self.longitude_maxima):
+            return False
+        if self._centro is not None:
+            return PosicaoRastreador.calcular_distancia(self._centro[0], self._centro[1], latitude, longitude) <= self._raio_m
+
+        # Ponto no polígono (raio para leste cruzando as arestas)
+        dentro = False
+        vertices = self._vertices
+        latitude_anterior, longitude_anterior = vertices[-1]
+        for latitude_vertice, longitude_vertice in vertices:
+            if (latitude_vertice > latitude) != (latitude_anterior > latitude):
+                cruzamento = longitude_vertice + (latitude - latitude_vertice) * (
+                    longitude_anterior - longitude_vertice) / (latitude_anterior - latitude_vertice)
+                if longitude < cruzamento:
+                    dentro = not dentro
+            latitude_anterior, longitude_anterior = latitude_vertice, longitude_vertice
+        return dentro
+
+
+class IndiceGeocercas:
+    """Grade espacial de geocercas: célula (linha, coluna) -> geocercas cujo retângulo a cobre"""
+
+    def __init__(self, geocercas, tamanho_celula=TAMANHO_CELULA_GRAUS):
+        self.tamanho_celula = tamanho_celula
+        self.geocercas = list(geocercas)
+        self._celulas = {}
+        self._grandes = []
+        for geocerca in self.geocercas:
+            linha_minima, coluna_minima = self._celula(geocerca.latitude_minima, geocerca.longitude_minima)
+            linha_maxima, coluna_maxima = self._celula(geocerca.latitude_maxima, geocerca.longitude_maxima)
+            if (linha_maxima - linha_minima + 1) * (coluna_maxima - coluna_minima + 1) > MAXIMO_CELULAS_GEOCERCA:
+                self._grandes.append(geocerca)
+                continue
+            for linha in range(linha_minima, linha_maxima + 1):
+                for coluna in range(coluna_minima, coluna_maxima + 1):
+                    self._celulas.setdefault((linha, coluna), []).append(geocerca)
+
+    def __len__(self):
+        return len(self.geocercas)
+
+    def _celula(self, latitude, longitude):
+        return math.floor(latitude / self.tamanho_celula), math.floor(longitude / self.tamanho_celula)
+
+    def localizar(self, latitude, longitude):
+        """Geocercas que contêm o ponto, da menor para a maior (a mais específica primeiro)"""
+        if not latitude or not longitude:
+            return []
+        candidatas = self._celulas.get(self._celula(latitude, longitude), [])
+        encontradas = [
+            geocerca for geocerca in (candidatas + self._grandes if self._grandes else candidatas)
+            if geocerca.contem(latitude, longitude)
+        ]
+        if len(encontradas) > 1:
+            encontradas.sort(key=lambda geocerca: (geocerca.area_m2, geocerca.id))
+        return encontradas
+
+
+class CacheIndiceGeocercas:
+    """Índice das geocercas ativas, compartilhado pelo processo (um por banco)"""
+
+    def __init__(self):
+        self._indices = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def obter(self):
+        engine = db.engine
+        indice = self._indices.get(engine)
+        if indice is not None:
+            return indice
+
+        geocercas = db.session.execute(select(Geocerca).where(Geocerca.ativo == True)).scalars()
+        indice = IndiceGeocercas(GeocercaCompilada.do_modelo(geocerca) for geocerca in geocercas)
+        with self._lock:
+            self._indices[engine] = indice
+        return indice
+
+    def invalidar(self, engine=None):
+        with self._lock:
+            self._indices.pop(engine or db.engine, None)
+
+
+# Instância única do cache
+indice_geocercas = CacheIndiceGeocercas()
+
+
+invalidar_ao_alterar(Geocerca, indice_geocercas.invalidar)
@@ -0,0 +1,104 @@
+"""
+Módulo de Identificação de Locais
+Identifica o tipo de local de uma parada (posto, carga/descarga, oficina) pelo ponto de
+referência e pelo endereço, com uma única expressão regular pré-compilada para todas as
+palavras-chave (sem acentos, palavras inteiras) e cache por local.
+"""
+
+import json
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+# Palavras-chave por categoria de local; SIGX_PALAVRAS_CHAVE_LOCAL aponta para um JSON
+# no mesmo formato, cujas categorias substituem (ou se somam a) estas
+PALAVRAS_CHAVE_PADRAO = {
+    'posto_combustivel': [
+        'posto', 'combustivel', 'shell', 'petrobras', 'ipiranga', 'br',
+        'ale', 'texaco', 'esso', 'dom pedro', 'gasolina', 'diesel'
+    ],
+    'carga_descarga': [
+        'empresa', 'industria', 'fabrica', 'deposito', 'armazem',
+        'terminal', 'porto', 'patio', 'usina', 'mineracao',
+        'siderurgica', 'metalurgica', 'quimica', 'cimento',
+        'aperam', 'csn', 'vale', 'olatrans'
+    ],
+    'oficina_manutencao': [
+        'oficina', 'manutencao', 'revisao', 'mecanica', 'borracharia',
+        'eletrica', 'funilaria', 'pintura', 'lavagem', 'servicos'
+    ]
+}
+
+ARQUIVO_PALAVRAS_CHAVE = os.environ.get('SIGX_PALAVRAS_CHAVE_LOCAL')
+TAMANHO_CACHE_LOCAIS = int(os.environ.get('SIGX_CACHE_LOCAIS', 4096))
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sem acentos e com espaços simples ('Manutenção  Pesada' -> 'manutencao pesada')"""
+    decomposto = unicodedata.normalize('NFKD', texto.casefold())
+    return ' '.join(''.join(c for c in decomposto if not unicodedata.combining(c)).split())
+
+
+class IdentificadorLocais:
+    """Uma expressão regular com todas as palavras-chave; cada palavra aponta para suas categorias"""
+
+    def __init__(self, palavras_chave):
+        self.categorias = tuple(palavras_chave)
+        self._categorias_por_palavra = {}
+        for categoria, palavras in palavras_chave.items():
+            for palavra in palavras:
+                normalizada = normalizar_texto(palavra)
+                if normalizada:
+                    self._categorias_por_palavra.setdefault(normalizada, set()).add(categoria)
+
+        # Palavras inteiras, com plural opcional: 'br' e 'vale' não casam com "BR-381" e "Valeria",
+        # 'ale' não casa com "Vale". As mais longas primeiro ('dom pedro' antes de 'dom').
+        alternativas = sorted(self._categorias_por_palavra, key=len, reverse=True)
+        self._padrao = re.compile(
+            r'(?<!\w)(' + '|'.join(re.escape(palavra) for palavra in alternativas) + r')s?(?!\w|-\d)'
+        ) if alternativas else None
+
+    def identificar(self, *textos):
+        """Categorias (frozenset) encontradas nos textos, em uma única passada"""
+        if self._padrao is None:
+            return frozenset()
+        texto = normalizar_texto(' '.join(texto for texto in textos if texto))
+        categorias = set()
+        for ocorrencia in self._padrao.finditer(texto):
+            categorias |= self._categorias_por_palavra[ocorrencia.group(1)]
+        return frozenset(categorias)
+
+
+def carregar_palavras_chave(caminho=None):
+    """Palavras-chave padrão, com as categorias do arquivo JSON (SIGX_PALAVRAS_CHAVE_LOCAL) por cima"""
+    palavras_chave = {categoria: list(palavras) for categoria, palavras in PALAVRAS_CHAVE_PADRAO.items()}
+    caminho = caminho or ARQUIVO_PALAVRAS_CHAVE
+    if caminho:
+        with open(caminho, encoding='utf-8') as arquivo:
+            configuradas = json.load(arquivo)
+        if not isinstance(configuradas, dict) or not all(isinstance(p, list) for p in configuradas.values()):
+            raise ValueError(f"{caminho}: esperado um objeto {{categoria: [palavras]}}")
+        palavras_chave.update(configuradas)
+    return palavras_chave
+
+
+_identificador = IdentificadorLocais(carregar_palavras_chave())
+
+
+def configurar_palavras_chave(palavras_chave):
+    """Troca as palavras-chave em uso e limpa o cache de locais"""
+    global _identificador
+    _identificador = IdentificadorLocais(palavras_chave)
+    categorias_local.cache_clear()
+
+
+def categorias_disponiveis():
+    """Categorias de local configuradas (ex.: para validar regras de classificação)"""
+    return _identificador.categorias
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_LOCAIS)
+def categorias_local(ponto_referencia, endereco):
+    """Categorias do local (ex.: {'posto_combustivel'}), em cache por par ponto de referência/endereço"""
+    return _identificador.identificar(ponto_referencia, endereco)
@@ -0,0 +1,428 @@
+"""
+Módulo de Ingestão de Posições
+Importação em lote de posições do rastreador com detecção de duplicatas baseada em conjuntos
+"""
+
+import bisect
+import codecs
+import csv
+import json
+import os
+import threading
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models import db, PosicaoRastreador, Veiculo
+from src.models.texto_posicao import dicionario_textos
+from src.arquivo_posicoes import consultar_arquivo, horarios_arquivados
+from src.resumo_posicoes import acrescentar_posicoes
+from src.trechos_posicoes import preencher_trechos, recalcular_trechos
+
+# Compactação de paradas: pontos parados consecutivos no mesmo local viram uma linha
+COMPACTAR_PARADAS = os.environ.get('SIGX_COMPACTAR_PARADAS', 'false').lower() in ('1', 'true', 'sim', 'yes')
+# Distância máxima, em metros, do primeiro ponto da parada (variação do GPS com o veículo parado)
+RAIO_COMPACTACAO_M = float(os.environ.get('SIGX_RAIO_COMPACTACAO_M', 30))
+CAMPOS_COMPACTACAO = ('data_hora_fim', 'quantidade_pontos', 'latitude_fim', 'longitude_fim', 'distancia_interna_m')
+
+# Contadores devolvidos por ImportadorPosicoes.importar, somados nas importações em vários lotes
+CONTADORES_IMPORTACAO = ('posicoes_importadas', 'posicoes_duplicadas', 'posicoes_invalidas', 'posicoes_compactadas')
+
+
+def converter_data_hora(valor):
+    """Converte a data/hora ISO 8601 do rastreador para datetime sem fuso horário"""
+    data_hora = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    # O banco armazena o horário informado sem fuso, como na importação original
+    return data_hora.replace(tzinfo=None)
+
+
+class ImportadorPosicoes:
+    """Importa posições de um veículo em lote, com uma consulta de duplicatas e uma inserção"""
+
+    def __init__(self, veiculo_id, compactar=None):
+        self.veiculo_id = veiculo_id
+        self.compactar = COMPACTAR_PARADAS if compactar is None else compactar
+
+    def importar(self, posicoes_data):
+        """
+        Importa uma lista de posições e retorna os contadores de importadas e duplicadas.
+        Não faz commit: a transação pertence a quem chama.
+        """
+        registros = []
+        posicoes_invalidas = 0
+        for posicao_data in posicoes_data:
+            try:
+                registros.append(self._montar_registro(posicao_data))
+            except Exception as e:
+                print(f"Erro ao processar posição: {e}")
+                posicoes_invalidas += 1
+                continue
+
+        if not registros:
+            return {'posicoes_importadas': 0, 'posicoes_duplicadas': 0,
+                    'posicoes_invalidas': posicoes_invalidas, 'posicoes_compactadas': 0}
+
+        # Uma única consulta traz os horários já gravados no intervalo do lote
+        existentes, intervalos = self._horarios_existentes(
+            min(registro['data_hora'] for registro in registros),
+            max(registro['data_hora'] for registro in registros)
+        )
+        gravados = sorted(existentes)
+
+        novos = []
+        posicoes_duplicadas = 0
+        for registro in registros:
+            # Horários dentro de uma linha compactada também já estão gravados
+            if registro['data_hora'] in existentes or any(
+                inicio <= registro['data_hora'] <= fim for inicio, fim in intervalos
+            ):
+                posicoes_duplicadas += 1
+                continue
+            existentes.add(registro['data_hora'])
+            novos.append(registro)
+
+        posicoes_importadas = len(novos)
+        posicoes_compactadas = 0
+        # Dias com linha já gravada alterada (parada compactada estendida)
+        dias_alterados = set()
+        # Horários das posições cujo trecho desde a anterior é recalculado após o INSERT
+        recalcular = []
+        if novos and self.compactar:
+            novos, posicoes_compactadas, estendida = self._compactar_paradas(novos, gravados)
+            if estendida is not None:
+                dias_alterados.add(estendida.data_hora.date())
+                # O fim da parada mudou: muda o trecho da posição seguinte
+                recalcular.append(estendida.data_hora)
+
+        if novos:
+            # Endereço e ponto de referência são gravados como ids do dicionário de textos
+            ids_textos = dicionario_textos.internar(
+                [registro['endereco'] for registro in novos] + [registro['ponto_referencia'] for registro in novos]
+            )
+            for registro in novos:
+                registro['endereco_id'] = ids_textos.get(registro.pop('endereco'))
+                registro['ponto_referencia_id'] = ids_textos.get(registro.pop('ponto_referencia'))
+
+            # Lote depois das posições gravadas: trechos calculados antes do INSERT
+            if not preencher_trechos(self.veiculo_id, novos):
+                recalcular.extend(registro['data_hora'] for registro in novos)
+
+            resultado = db.session.execute(self._instrucao_insercao(), novos)
+            if resultado.rowcount != len(novos):
+                # Linhas ignoradas no INSERT (conflito concorrente) ou contagem indisponível
+                dias_alterados.update(registro['data_hora'].date() for registro in novos)
+                recalcular.extend(registro['data_hora'] for registro in novos)
+
+        if recalcular:
+            recalcular_trechos(self.veiculo_id, min(recalcular), max(recalcular))
+
+        # Resumos diários na mesma transação das posições
+        if novos or dias_alterados:
+            acrescentar_posicoes(self.veiculo_id, novos, dias_alterados)
+
+        return {
+            'posicoes_importadas': posicoes_importadas,
+            'posicoes_duplicadas': posicoes_duplicadas,
+            'posicoes_invalidas': posicoes_invalidas,
+            'posicoes_compactadas': posicoes_compactadas
+        }
+
+    def _montar_registro(self, posicao_data):
+        """Monta o dicionário de colunas de uma posição"""
+        return {
+            'veiculo_id': self.veiculo_id,
+            'data_hora': converter_data_hora(posicao_data['data_hora']),
+            'latitude': posicao_data.get('latitude'),
+            'longitude': posicao_data.get('longitude'),
+            'velocidade': posicao_data.get('velocidade', 0),
+            'endereco': posicao_data.get('endereco'),
+            'ponto_referencia': posicao_data.get('ponto_referencia'),
+            'km_aproximado': posicao_data.get('km_aproximado'),
+            'tempo_parado': posicao_data.get('tempo_parado', 0),
+            'tipo_mensagem': posicao_data.get('tipo_mensagem'),
+            'modo_emergencia': posicao_data.get('modo_emergencia', False),
+            'bateria': posicao_data.get('bateria'),
+            'data_hora_fim': None,
+            'quantidade_pontos': None,
+            'latitude_fim': None,
+            'longitude_fim': None,
+            'distancia_interna_m': None,
+            'distancia_anterior_m': None,
+            'segundos_anterior': None
+        }
+
+    def _horarios_existentes(self, inicio, fim):
+        """
+        Horários já gravados para o veículo no intervalo, inclusive no arquivo:
+        conjunto de horários e lista de intervalos (início, fim) das linhas compactadas
+        """
+        consulta = select(PosicaoRastreador.data_hora).where(
+            PosicaoRastreador.veiculo_id == self.veiculo_id,
+            PosicaoRastreador.data_hora >= inicio,
+            PosicaoRastreador.data_hora <= fim
+        )
+        consulta_intervalos = select(PosicaoRastreador.data_hora, PosicaoRastreador.data_hora_fim).where(
+            PosicaoRastreador.veiculo_id == self.veiculo_id,
+            PosicaoRastreador.data_hora_fim >= inicio,
+            PosicaoRastreador.data_hora <= fim
+        )
+        horarios_arquivo, intervalos_arquivo = horarios_arquivados(self.veiculo_id, inicio, fim)
+
+        return (
+            set(db.session.execute(consulta).scalars()) | horarios_arquivo,
+            [tuple(intervalo) for intervalo in db.session.execute(consulta_intervalos)] + intervalos_arquivo
+        )
+
+    # ==================== COMPACTAÇÃO DE PARADAS ====================
+
+    def _compactar_paradas(self, novos, gravados):
+        """
+        Junta pontos parados consecutivos no mesmo local em uma linha (primeiro e último horário,
+        quantidade de pontos, coordenadas do último ponto e distância interna).
+        Retorna as linhas a inserir, a quantidade de pontos absorvidos e a posição já gravada que
+        foi estendida (ou None).
+        """
+        novos.sort(key=lambda registro: registro['data_hora'])
+
+        # A parada pode continuar a última linha já gravada (importações sucessivas)
+        posicao_anterior = self._parada_anterior(novos[0])
+        registro_anterior = self._registro_da_posicao(posicao_anterior) if posicao_anterior else None
+        atual = registro_anterior
+
+        linhas = []
+        absorvidos = 0
+        for registro in novos:
+            if atual is not None and self._continua_parada(atual, registro, gravados):
+                self._absorver(atual, registro)
+                absorvidos += 1
+            else:
+                linhas.append(registro)
+                atual = registro if self._parado(registro) else None
+
+        estendida = None
+        if registro_anterior is not None and registro_anterior['data_hora_fim'] != posicao_anterior.data_hora_fim:
+            for campo in CAMPOS_COMPACTACAO:
+                setattr(posicao_anterior, campo, registro_anterior[campo])
+            estendida = posicao_anterior
+
+        return linhas, absorvidos, estendida
+
+    def _parado(self, registro):
+        return registro['velocidade'] == 0 and registro['latitude'] is not None and registro['longitude'] is not None
+
+    def _continua_parada(self, atual, registro, gravados):
+        """O ponto está parado, no mesmo local e sem posição gravada entre ele e a parada atual"""
+        if not self._parado(registro):
+            return False
+        if registro['endereco'] != atual['endereco'] or registro['ponto_referencia'] != atual['ponto_referencia']:
+            return False
+        if PosicaoRastreador.calcular_distancia(
+            atual['latitude'], atual['longitude'], registro['latitude'], registro['longitude']
+        ) > RAIO_COMPACTACAO_M:
+            return False
+
+        ultimo = atual['data_hora_fim'] or atual['data_hora']
+        indice = bisect.bisect_right(gravados, ultimo)
+        return indice == len(gravados) or gravados[indice] >= registro['data_hora']
+
+    def _absorver(self, atual, registro):
+        """Acrescenta o ponto à parada atual"""
+        if atual['data_hora_fim'] is None:
+            atual.update({
+                'data_hora_fim': atual['data_hora'],
+                'quantidade_pontos': 1,
+                'latitude_fim': atual['latitude'],
+                'longitude_fim': atual['longitude'],
+                'distancia_interna_m': 0.0
+            })
+
+        atual['distancia_interna_m'] += PosicaoRastreador.calcular_distancia(
+            atual['latitude_fim'], atual['longitude_fim'], registro['latitude'], registro['longitude']
+        )
+        atual['data_hora_fim'] = registro['data_hora']
+        atual['latitude_fim'] = registro['latitude']
+        atual['longitude_fim'] = registro['longitude']
+        atual['quantidade_pontos'] += 1
+
+    def _parada_anterior(self, primeiro):
+        """Última posição gravada antes do lote, se for uma parada ainda não classificada"""
+        anterior = PosicaoRastreador.query.filter(
+            PosicaoRastreador.veiculo_id == self.veiculo_id,
+            PosicaoRastreador.data_hora < primeiro['data_hora']
+        ).order_by(PosicaoRastreador.data_hora.desc()).first()
+
+        if anterior is None or anterior.processado or anterior.velocidade != 0 \
+                or anterior.latitude is None or anterior.longitude is None:
+            return None
+        # Posições arquivadas podem ficar entre a anterior e o lote
+        if consultar_arquivo(anterior.data_hora):
+            return None
+        return anterior
+
+    def _registro_da_posicao(self, posicao):
+        registro = {campo: getattr(posicao, campo) for campo in CAMPOS_COMPACTACAO}
+        registro.update({
+            'data_hora': posicao.data_hora,
+            'latitude': posicao.latitude,
+            'longitude': posicao.longitude,
+            'velocidade': posicao.velocidade,
+            'endereco': posicao.endereco,
+            'ponto_referencia': posicao.ponto_referencia
+        })
+        return registro
+
+    def _instrucao_insercao(self):
+        """INSERT que ignora conflitos na chave única (veiculo_id, data_hora)"""
+        tabela = PosicaoRastreador.__table__
+        dialeto = db.session.get_bind().dialect.name
+
+        if dialeto == 'postgresql':
+            return postgresql.insert(tabela).on_conflict_do_nothing(
+                index_elements=['veiculo_id', 'data_hora']
+            )
+        if dialeto == 'sqlite':
+            return sqlite.insert(tabela).on_conflict_do_nothing(
+                index_elements=['veiculo_id', 'data_hora']
+            )
+        return tabela.insert()
+
+
+class ResolvedorPlacas:
+    """Resolve placas em ids de veículo, com cache em memória compartilhado pelo processo"""
+
+    # Limite de placas por cláusula IN
+    TAMANHO_CONSULTA = 500
+
+    def __init__(self):
+        self._cache = {}
+        self._trava = threading.Lock()
+
+    def resolver(self, placas):
+        """Retorna {placa: veiculo_id} para as placas cadastradas, consultando só as que faltam no cache"""
+        placas = set(placas)
+        faltantes = [placa for placa in placas if placa not in self._cache]
+
+        for i in range(0, len(faltantes), self.TAMANHO_CONSULTA):
+            consulta = select(Veiculo.placa, Veiculo.id).where(
+                Veiculo.placa.in_(faltantes[i:i + self.TAMANHO_CONSULTA])
+            )
+            encontrados = dict(db.session.execute(consulta).all())
+            with self._trava:
+                self._cache.update(encontrados)
+
+        # Placas não cadastradas não entram no cache: um cadastro novo é visto na próxima chamada
+        return {placa: self._cache[placa] for placa in placas if placa in self._cache}
+
+    def invalidar(self):
+        """Descarta o cache (ex.: após alteração de placa)"""
+        with self._trava:
+            self._cache.clear()
+
+
+# Instância única do resolvedor de placas
+resolvedor_placas = ResolvedorPlacas()
+
+
+def importar_posicoes_frota_em_lote(posicoes_data, compactar=None):
+    """
+    Importa posições de vários veículos (cada posição com seu veiculo_placa).
+    Resolve todas as placas de uma vez e faz uma inserção em lote por veículo.
+    compactar: junta pontos parados consecutivos (padrão: SIGX_COMPACTAR_PARADAS).
+    Não faz commit: a transação pertence a quem chama.
+    """
+    posicoes_por_placa = {}
+    posicoes_invalidas = 0
+    for posicao_data in posicoes_data:
+        placa = posicao_data.get('veiculo_placa') if isinstance(posicao_data, dict) else None
+        if not placa:
+            posicoes_invalidas += 1
+            continue
+        posicoes_por_placa.setdefault(placa, []).append(posicao_data)
+
+    veiculos_por_placa = resolvedor_placas.resolver(posicoes_por_placa.keys())
+
+    resultado = {
+        'veiculos': {},
+        'placas_nao_encontradas': sorted(set(posicoes_por_placa) - set(veiculos_por_placa)),
+        'posicoes_importadas': 0,
+        'posicoes_duplicadas': 0,
+        'posicoes_invalidas': posicoes_invalidas,
+        'posicoes_compactadas': 0
+    }
+
+    for placa, veiculo_id in veiculos_por_placa.items():
+        contadores = ImportadorPosicoes(veiculo_id, compactar).importar(posicoes_por_placa[placa])
+        resultado['veiculos'][placa] = {'veiculo_id': veiculo_id, **contadores}
+        for chave in CONTADORES_IMPORTACAO:
+            resultado[chave] += contadores[chave]
+
+    return resultado
+
+
+# ==================== LEITURA EM FLUXO ====================
+
+# Conversão dos campos de texto do CSV para os tipos do formato JSON
+CAMPOS_DECIMAIS = ('latitude', 'longitude')
+CAMPOS_INTEIROS = ('velocidade', 'km_aproximado', 'tempo_parado', 'bateria')
+CAMPOS_BOOLEANOS = ('modo_emergencia',)
+
+
+def ler_posicoes_ndjson(fluxo):
+    """Lê posições de um fluxo binário NDJSON (um objeto JSON por linha), sob demanda"""
+    for linha in codecs.iterdecode(fluxo, 'utf-8-sig'):
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            yield json.loads(linha)
+        except ValueError:
+            # Linha malformada: repassada como inválida para a contagem do lote
+            yield {}
+
+
+def ler_posicoes_csv(fluxo, delimitador=','):
+    """Lê posições de um fluxo binário CSV com cabeçalho, sob demanda"""
+    linhas = codecs.iterdecode(fluxo, 'utf-8-sig')
+    for linha in csv.DictReader(linhas, delimiter=delimitador):
+        yield _converter_linha_csv(linha)
+
+
+def _converter_linha_csv(linha):
+    """Converte os valores textuais de uma linha CSV"""
+    posicao = {}
+    for campo, valor in linha.items():
+        if campo is None:
+            continue
+        campo = campo.strip()
+        valor = valor.strip() if isinstance(valor, str) else valor
+        if valor == '' or valor is None:
+            continue
+        try:
+            if campo in CAMPOS_DECIMAIS:
+                valor = float(valor.replace(',', '.'))
+            elif campo in CAMPOS_INTEIROS:
+                valor = int(float(valor.replace(',', '.')))
+            elif campo in CAMPOS_BOOLEANOS:
+                valor = valor.lower() in ('true', '1', 'sim', 's')
+        except ValueError:
+            continue
+        posicao[campo] = valor
+    return posicao
+
+
+def em_lotes(iteravel, tamanho_lote):
+    """Agrupa um iterável em listas de no máximo tamanho_lote itens"""
+    lote = []
+    for item in iteravel:
+        lote.append(item)
+        if len(lote) >= tamanho_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# Função utilitária para uso nas rotas
+def importar_posicoes_em_lote(veiculo_id, posicoes_data, compactar=None):
+    """Função principal para importação em lote"""
+    importador = ImportadorPosicoes(veiculo_id, compactar)
+    return importador.importar(posicoes_data)
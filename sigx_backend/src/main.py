@@ -1,3 +1,4 @@
+import multiprocessing
 import os
 import sys
 # DON'T CHANGE THIS !!!
@@ -5,12 +6,16 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory
 from flask_cors import CORS
-from src.models import db, inicializar_dados_padrao
+from src.models import db, inicializar_dados_padrao, aplicar_migracoes
+from src.config_banco import configurar_banco
 from src.routes.posicoes import posicoes_bp
 from src.routes.eventos import eventos_bp
 from src.routes.veiculos import veiculos_bp
 from src.routes.motoristas import motoristas_bp
 from src.routes.integracoes import integracoes_bp
+from src.routes.tarefas import tarefas_bp
+from src.routes.geocercas import geocercas_bp
+from src.fila_tarefas import fila_tarefas
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'sigx_automation_2025'
@@ -24,16 +29,26 @@ app.register_blueprint(eventos_bp, url_prefix='/api/eventos')
 app.register_blueprint(veiculos_bp, url_prefix='/api/veiculos')
 app.register_blueprint(motoristas_bp, url_prefix='/api/motoristas')
 app.register_blueprint(integracoes_bp, url_prefix='/api/integracoes')
+app.register_blueprint(tarefas_bp, url_prefix='/api/jobs')
+app.register_blueprint(geocercas_bp, url_prefix='/api/geocercas')
 
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+# Configuração do banco de dados (DATABASE_URL ou SQLite em src/database/app.db)
+configurar_banco(app)
+
+# Os processos do pool da classificação da frota (spawn) reimportam este módulo:
+# apenas o processo principal prepara o banco e inicia a fila
+processo_principal = multiprocessing.parent_process() is None
 
 # Criar tabelas e dados padrão
-with app.app_context():
-    db.create_all()
-    inicializar_dados_padrao()
+if processo_principal:
+    with app.app_context():
+        db.create_all()
+        aplicar_migracoes()
+        inicializar_dados_padrao()
+
+# Iniciar a fila de tarefas assíncronas (no modo debug, apenas no processo filho do recarregador)
+if processo_principal and (__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+    fila_tarefas.iniciar(app)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -62,7 +77,9 @@ def status():
             'eventos': 'Gestão e classificação de eventos de jornada',
             'veiculos': 'Cadastro e gestão de veículos',
             'motoristas': 'Cadastro e gestão de motoristas',
-            'integracoes': 'Integração com sistemas externos (abastecimento, checklist, manutenção)'
+            'integracoes': 'Integração com sistemas externos (abastecimento, checklist, manutenção)',
+            'jobs': 'Tarefas assíncronas de importação e classificação',
+            'geocercas': 'Cadastro de geocercas (clientes, postos, oficinas, garagens) usadas na classificação de paradas'
         }
     }
 
@@ -74,21 +91,31 @@ def documentacao():
         'descricao': 'API para automatização de lançamentos de jornada de trabalho',
         'endpoints': {
             'posicoes': {
-                'POST /api/posicoes/importar': 'Importa posições do rastreador',
-                'GET /api/posicoes/veiculo/{id}': 'Lista posições de um veículo',
-                'POST /api/posicoes/classificar/{id}': 'Classifica posições automaticamente',
-                'GET /api/posicoes/estatisticas/{id}': 'Estatísticas de posições',
+                'POST /api/posicoes/importar': 'Importa posições do rastreador (assincrono: true retorna uma tarefa)',
+                'POST /api/posicoes/importar-frota': 'Importa posições de vários veículos em uma requisição',
+                'POST /api/posicoes/importar-stream': 'Importa posições em fluxo (NDJSON ou CSV) com commit por lote',
+                'GET /api/posicoes/veiculo/{id}': 'Lista posições de um veículo (inclui o arquivo quando o período alcança; limite, cursor, exportar)',
+                'POST /api/posicoes/classificar/{id}': 'Classifica posições automaticamente (assincrono: true retorna uma tarefa; finalizar: true fecha o período aberto; previa: true simula um intervalo sem gravar, em NDJSON)',
+                'POST /api/posicoes/classificar-frota': 'Classifica todos os veículos com posições pendentes em um pool de processos',
+                'GET /api/posicoes/periodo-aberto/{id}': 'Período do veículo ainda sem evento, continuado pela próxima classificação',
+                'GET /api/posicoes/estatisticas/{id}': 'Estatísticas de posições, somadas dos resumos diários (inclui o arquivo quando o período alcança)',
+                'POST /api/posicoes/arquivar': 'Move posições processadas antigas para partições mensais',
+                'GET /api/posicoes/arquivo': 'Data de corte e partições do arquivo de posições',
                 'GET /api/posicoes/exemplo-importacao': 'Exemplo de formato de importação'
             },
             'eventos': {
                 'POST /api/eventos/criar': 'Cria novo evento',
-                'GET /api/eventos/listar': 'Lista eventos com filtros',
+                'GET /api/eventos/listar': 'Lista eventos com filtros (limite, cursor, exportar; fields, expand)',
                 'GET /api/eventos/{id}': 'Obtém evento específico',
                 'PUT /api/eventos/{id}/atualizar': 'Atualiza evento',
                 'POST /api/eventos/{id}/aprovar': 'Aprova evento',
                 'DELETE /api/eventos/{id}/excluir': 'Exclui evento',
                 'GET /api/eventos/tipos': 'Lista tipos de evento',
-                'GET /api/eventos/estatisticas': 'Estatísticas de eventos'
+                'GET /api/eventos/regras': 'Lista regras de classificação de paradas',
+                'POST /api/eventos/regras/criar': 'Cria regra de classificação',
+                'PUT /api/eventos/regras/{id}/atualizar': 'Atualiza regra de classificação',
+                'DELETE /api/eventos/regras/{id}/excluir': 'Exclui regra de classificação',
+                'GET /api/eventos/estatisticas': 'Estatísticas de eventos (filtros: veiculo_id, motorista_id, data_inicio, data_fim; agrupar=motorista,veiculo,dia,tipo)'
             },
             'veiculos': {
                 'GET /api/veiculos/listar': 'Lista veículos',
@@ -105,14 +132,27 @@ def documentacao():
             'integracoes': {
                 'POST /api/integracoes/abastecimento/importar': 'Importa dados de abastecimento',
                 'POST /api/integracoes/abastecimento/processar': 'Processa abastecimentos',
-                'GET /api/integracoes/abastecimento/listar': 'Lista abastecimentos',
+                'GET /api/integracoes/abastecimento/listar': 'Lista abastecimentos (limite, cursor, exportar)',
                 'POST /api/integracoes/checklist/importar': 'Importa dados de checklist',
                 'POST /api/integracoes/checklist/processar': 'Processa checklists',
-                'GET /api/integracoes/checklist/listar': 'Lista checklists',
+                'GET /api/integracoes/checklist/listar': 'Lista checklists (limite, cursor, exportar)',
                 'POST /api/integracoes/manutencao/importar': 'Importa dados de manutenção',
                 'POST /api/integracoes/manutencao/processar': 'Processa manutenções',
-                'GET /api/integracoes/manutencao/listar': 'Lista manutenções',
+                'GET /api/integracoes/manutencao/listar': 'Lista manutenções (limite, cursor, exportar)',
                 'GET /api/integracoes/estatisticas': 'Estatísticas de integrações'
+            },
+            'jobs': {
+                'GET /api/jobs/{id}': 'Estado, contadores e erro de uma tarefa assíncrona',
+                'GET /api/jobs/listar': 'Lista tarefas recentes (limite, cursor, exportar)'
+            },
+            'geocercas': {
+                'GET /api/geocercas/listar': 'Lista geocercas (filtros: categoria, ativo; limite, cursor, exportar)',
+                'POST /api/geocercas/criar': 'Cria geocerca (círculo ou polígono)',
+                'GET /api/geocercas/{id}': 'Obtém geocerca específica',
+                'PUT /api/geocercas/{id}/atualizar': 'Atualiza geocerca',
+                'DELETE /api/geocercas/{id}/excluir': 'Exclui geocerca',
+                'POST /api/geocercas/importar': 'Importa geocercas em lote (lista ou FeatureCollection GeoJSON)',
+                'GET /api/geocercas/localizar': 'Geocercas que contêm um ponto (latitude, longitude)'
             }
         },
         'fluxo_trabalho': [
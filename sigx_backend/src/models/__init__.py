@@ -6,10 +6,17 @@ db = SQLAlchemy()
 # Importar todos os modelos
 from src.models.veiculo import Veiculo
 from src.models.motorista import Motorista
+from src.models.texto_posicao import TextoPosicao
 from src.models.posicao_rastreador import PosicaoRastreador
+from src.models.periodo_aberto import PeriodoAberto
+from src.models.resumo_posicoes import ResumoDiarioPosicoes
 from src.models.tipo_evento import TipoEvento
+from src.models.regra_classificacao import RegraClassificacao
+from src.models.geocerca import Geocerca
 from src.models.evento_jornada import EventoJornada
 from src.models.integracoes import IntegracaoAbastecimento, IntegracaoChecklist, IntegracaoManutencao
+from src.models.tarefa import Tarefa
+from src.models.migracoes import aplicar_migracoes
 
 # Função para inicializar dados padrão
 def inicializar_dados_padrao():
@@ -26,6 +33,18 @@ def inicializar_dados_padrao():
         db.session.commit()
         print("Tipos de evento padrão criados com sucesso!")
     
+    # Regras de classificação de paradas (equivalentes aos critérios originais)
+    if RegraClassificacao.query.count() == 0:
+        tipos = {tipo.nome: tipo.id for tipo in TipoEvento.query.all()}
+        
+        for regra_data in RegraClassificacao.criar_regras_padrao():
+            tipo_id = tipos.get(regra_data.pop('tipo_evento'))
+            if tipo_id:
+                db.session.add(RegraClassificacao(tipo_evento_id=tipo_id, **regra_data))
+        
+        db.session.commit()
+        print("Regras de classificação padrão criadas com sucesso!")
+    
     # Criar motorista e veículo de exemplo se não existirem
     if Motorista.query.count() == 0:
         from datetime import date
@@ -56,11 +75,17 @@ __all__ = [
     'Veiculo',
     'Motorista', 
     'PosicaoRastreador',
+    'PeriodoAberto',
+    'TextoPosicao',
     'TipoEvento',
+    'RegraClassificacao',
+    'Geocerca',
     'EventoJornada',
     'IntegracaoAbastecimento',
     'IntegracaoChecklist',
     'IntegracaoManutencao',
-    'inicializar_dados_padrao'
+    'Tarefa',
+    'inicializar_dados_padrao',
+    'aplicar_migracoes'
 ]
 
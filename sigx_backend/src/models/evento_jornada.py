@@ -1,8 +1,17 @@
 from src.models import db
+from src.models.tipos import tipo_coordenada
 from datetime import datetime
 
 class EventoJornada(db.Model):
     __tablename__ = 'eventos_jornada'
+    __table_args__ = (
+        # Listagens e correlações por veículo e período
+        db.Index('ix_eventos_veiculo_data_inicio', 'veiculo_id', 'data_inicio'),
+        # Histórico do motorista (análise de padrões filtra por aprovado)
+        db.Index('ix_eventos_motorista_aprovado_data_inicio', 'motorista_id', 'aprovado', 'data_inicio'),
+        # Listagem geral ordenada por data
+        db.Index('ix_eventos_data_inicio', 'data_inicio'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     veiculo_id = db.Column(db.Integer, db.ForeignKey('veiculos.id'), nullable=False)
@@ -11,10 +20,10 @@ class EventoJornada(db.Model):
     data_inicio = db.Column(db.DateTime, nullable=False)
     data_fim = db.Column(db.DateTime)
     duracao_minutos = db.Column(db.Integer)
-    latitude_inicio = db.Column(db.Numeric(10, 8))
-    longitude_inicio = db.Column(db.Numeric(11, 8))
-    latitude_fim = db.Column(db.Numeric(10, 8))
-    longitude_fim = db.Column(db.Numeric(11, 8))
+    latitude_inicio = db.Column(tipo_coordenada())
+    longitude_inicio = db.Column(tipo_coordenada())
+    latitude_fim = db.Column(tipo_coordenada())
+    longitude_fim = db.Column(tipo_coordenada())
     endereco_inicio = db.Column(db.Text)
     endereco_fim = db.Column(db.Text)
     observacoes = db.Column(db.Text)
@@ -39,10 +48,10 @@ class EventoJornada(db.Model):
             'data_inicio': self.data_inicio.isoformat() if self.data_inicio else None,
             'data_fim': self.data_fim.isoformat() if self.data_fim else None,
             'duracao_minutos': self.duracao_minutos,
-            'latitude_inicio': float(self.latitude_inicio) if self.latitude_inicio else None,
-            'longitude_inicio': float(self.longitude_inicio) if self.longitude_inicio else None,
-            'latitude_fim': float(self.latitude_fim) if self.latitude_fim else None,
-            'longitude_fim': float(self.longitude_fim) if self.longitude_fim else None,
+            'latitude_inicio': self.latitude_inicio if self.latitude_inicio else None,
+            'longitude_inicio': self.longitude_inicio if self.longitude_inicio else None,
+            'latitude_fim': self.latitude_fim if self.latitude_fim else None,
+            'longitude_fim': self.longitude_fim if self.longitude_fim else None,
             'endereco_inicio': self.endereco_inicio,
             'endereco_fim': self.endereco_fim,
             'observacoes': self.observacoes,
@@ -0,0 +1,44 @@
+from src.models import db
+from datetime import datetime
+import json
+
+class Geocerca(db.Model):
+    """
+    Área cadastrada (cliente, posto, oficina, garagem...) com uma categoria de local: uma parada
+    cujo centro cai dentro da geocerca recebe a categoria (ver src/geocercas.py).
+    Coordenadas em graus; círculo (centro + raio) ou polígono (vértices).
+    """
+    __tablename__ = 'geocercas'
+
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    categoria = db.Column(db.String(50), nullable=False, index=True)  # ex.: posto_combustivel
+    forma = db.Column(db.String(10), nullable=False)  # circulo ou poligono
+    latitude = db.Column(db.Float)  # centro do círculo
+    longitude = db.Column(db.Float)
+    raio_m = db.Column(db.Float)
+    vertices = db.Column(db.Text)  # polígono: JSON [[latitude, longitude], ...]
+    ativo = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def lista_vertices(self):
+        return json.loads(self.vertices) if self.vertices else []
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'categoria': self.categoria,
+            'forma': self.forma,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'raio_m': self.raio_m,
+            'vertices': self.lista_vertices() if self.forma == 'poligono' else None,
+            'ativo': self.ativo,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<Geocerca {self.categoria} {self.nome}>'
@@ -3,6 +3,10 @@ from datetime import datetime
 
 class IntegracaoAbastecimento(db.Model):
     __tablename__ = 'integracao_abastecimento'
+    __table_args__ = (
+        db.Index('ix_abastecimento_veiculo_data_hora', 'veiculo_id', 'data_hora'),
+        db.Index('ix_abastecimento_processado', 'processado'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     veiculo_id = db.Column(db.Integer, db.ForeignKey('veiculos.id'), nullable=False)
@@ -36,6 +40,11 @@ class IntegracaoAbastecimento(db.Model):
 
 class IntegracaoChecklist(db.Model):
     __tablename__ = 'integracao_checklist'
+    __table_args__ = (
+        db.Index('ix_checklist_veiculo_data_hora', 'veiculo_id', 'data_hora'),
+        db.Index('ix_checklist_motorista_data_hora', 'motorista_id', 'data_hora'),
+        db.Index('ix_checklist_processado', 'processado'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     veiculo_id = db.Column(db.Integer, db.ForeignKey('veiculos.id'), nullable=False)
@@ -70,6 +79,10 @@ class IntegracaoChecklist(db.Model):
 
 class IntegracaoManutencao(db.Model):
     __tablename__ = 'integracao_manutencao'
+    __table_args__ = (
+        db.Index('ix_manutencao_veiculo_data_hora', 'veiculo_id', 'data_hora'),
+        db.Index('ix_manutencao_processado', 'processado'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     veiculo_id = db.Column(db.Integer, db.ForeignKey('veiculos.id'), nullable=False)
@@ -0,0 +1,26 @@
+from src.models import db
+from sqlalchemy import event
+
+def invalidar_ao_alterar(modelo, invalidar):
+    """
+    Chama invalidar(engine) quando instâncias do modelo são incluídas, alteradas ou removidas pelo ORM:
+    no flush (a própria transação já enxerga a alteração) e de novo no commit (outras sessões)
+    ou no rollback (o cache pode ter lido dados descartados)
+    """
+    chave = f'{modelo.__tablename__}_alterados'
+
+    @event.listens_for(db.session, 'before_flush')
+    def _marcar_alterados(session, contexto, instancias):
+        if any(isinstance(objeto, modelo) for objeto in (*session.new, *session.dirty, *session.deleted)):
+            session.info[chave] = True
+
+    @event.listens_for(db.session, 'after_flush')
+    def _invalidar_no_flush(session, contexto):
+        if session.info.get(chave):
+            invalidar(session.get_bind())
+
+    @event.listens_for(db.session, 'after_commit')
+    @event.listens_for(db.session, 'after_rollback')
+    def _invalidar_no_fim(session):
+        if session.info.pop(chave, None):
+            invalidar(session.get_bind())
@@ -0,0 +1,216 @@
+from src.models import db
+from src.models.tipos import FORMATO_COORDENADAS, ESCALA_MICROGRAUS
+from src.models.posicao_rastreador import PosicaoRastreador
+from src.models.texto_posicao import dicionario_textos
+from sqlalchemy import bindparam, inspect, or_, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+# Registro chave/valor do estado do esquema (ex.: formato atual das coordenadas)
+metadados_banco = db.Table(
+    'metadados_banco',
+    db.Column('chave', db.String(50), primary_key=True),
+    db.Column('valor', db.String(200))
+)
+
+# Colunas gravadas com tipo_coordenada(), convertidas quando o formato muda
+COLUNAS_COORDENADAS = {
+    'posicoes_rastreador': ('latitude', 'longitude', 'latitude_fim', 'longitude_fim'),
+    'eventos_jornada': ('latitude_inicio', 'longitude_inicio', 'latitude_fim', 'longitude_fim'),
+    'periodos_abertos': ('latitude_inicio', 'longitude_inicio', 'latitude_fim', 'longitude_fim')
+}
+
+def aplicar_migracoes():
+    """Aplica ajustes de esquema em bancos já existentes (idempotente)"""
+    _adicionar_colunas()
+    _criar_indices()
+    _converter_formato_coordenadas()
+    _migrar_textos_posicoes()
+    _gerar_trechos_posicoes()
+    _gerar_resumos_posicoes()
+
+def _adicionar_colunas():
+    """Adiciona as colunas declaradas nos modelos que ainda não existem no banco"""
+    # db.create_all() não altera tabelas que já existem
+    with db.engine.begin() as conexao:
+        for tabela in db.metadata.sorted_tables:
+            adicionar_colunas_ausentes(conexao, tabela)
+
+def adicionar_colunas_ausentes(conexao, tabela):
+    """ALTER TABLE ADD COLUMN para cada coluna da tabela que falta no banco (colunas anuláveis)"""
+    inspetor = inspect(conexao)
+    if not inspetor.has_table(tabela.name, schema=tabela.schema):
+        return
+
+    existentes = {coluna['name'] for coluna in inspetor.get_columns(tabela.name, schema=tabela.schema)}
+    nome_tabela = f'{tabela.schema}.{tabela.name}' if tabela.schema else tabela.name
+    for coluna in tabela.columns:
+        if coluna.name not in existentes:
+            tipo = coluna.type.compile(dialect=conexao.dialect)
+            conexao.exec_driver_sql(f'ALTER TABLE {nome_tabela} ADD COLUMN {coluna.name} {tipo}')
+            print(f"Coluna {nome_tabela}.{coluna.name} adicionada")
+
+def _criar_indices():
+    """Cria os índices declarados nos modelos que ainda não existem no banco"""
+    # db.create_all() não cria índices novos em tabelas que já existem
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            try:
+                indice.create(db.engine, checkfirst=True)
+            except (IntegrityError, OperationalError) as e:
+                print(f"Não foi possível criar o índice {indice.name}: {e}")
+
+def obter_metadado(conexao, chave):
+    return conexao.execute(
+        db.select(metadados_banco.c.valor).where(metadados_banco.c.chave == chave)
+    ).scalar()
+
+def definir_metadado(conexao, chave, valor):
+    atualizados = conexao.execute(
+        metadados_banco.update().where(metadados_banco.c.chave == chave).values(valor=valor)
+    ).rowcount
+    if not atualizados:
+        conexao.execute(metadados_banco.insert().values(chave=chave, valor=valor))
+
+def _converter_formato_coordenadas():
+    """
+    Converte as coordenadas gravadas para o formato de SIGX_FORMATO_COORDENADAS.
+    Bancos sem registro de formato têm coordenadas em graus (Numeric ou REAL).
+    """
+    with db.engine.begin() as conexao:
+        formato_registrado = obter_metadado(conexao, 'formato_coordenadas')
+        formato_atual = formato_registrado or 'real'
+
+        if formato_registrado == FORMATO_COORDENADAS:
+            return
+
+        for tabela, colunas in COLUNAS_COORDENADAS.items():
+            converter_coordenadas_tabela(conexao, tabela, colunas, formato_atual)
+        definir_metadado(conexao, 'formato_coordenadas', FORMATO_COORDENADAS)
+
+    if formato_atual != FORMATO_COORDENADAS:
+        # Importação tardia: o módulo de arquivo depende dos modelos
+        from src.arquivo_posicoes import converter_coordenadas_arquivo
+        converter_coordenadas_arquivo(formato_atual)
+        print(f"Coordenadas convertidas de '{formato_atual}' para '{FORMATO_COORDENADAS}'")
+
+def converter_coordenadas_tabela(conexao, tabela, colunas, formato_atual, schema=None):
+    """Converte as colunas de coordenadas de uma tabela do formato atual para o configurado"""
+    inspetor = inspect(conexao)
+    if not inspetor.has_table(tabela, schema=schema):
+        return
+
+    tipos = {coluna['name']: coluna['type'] for coluna in inspetor.get_columns(tabela, schema=schema)}
+    nome_tabela = f'{schema}.{tabela}' if schema else tabela
+
+    for coluna in colunas:
+        if coluna not in tipos:
+            continue
+        if conexao.dialect.name == 'postgresql':
+            _alterar_tipo_coordenada_postgresql(conexao, nome_tabela, coluna, tipos[coluna], formato_atual)
+        elif formato_atual == FORMATO_COORDENADAS:
+            continue
+        elif FORMATO_COORDENADAS == 'micrograus':
+            # SQLite: a afinidade NUMERIC da coluna aceita o inteiro sem alterar a declaração
+            conexao.exec_driver_sql(
+                f"UPDATE {nome_tabela} SET {coluna} = CAST(ROUND({coluna} * {ESCALA_MICROGRAUS}) AS INTEGER) "
+                f"WHERE {coluna} IS NOT NULL"
+            )
+        else:
+            conexao.exec_driver_sql(
+                f"UPDATE {nome_tabela} SET {coluna} = {coluna} / {ESCALA_MICROGRAUS}.0 WHERE {coluna} IS NOT NULL"
+            )
+
+def _alterar_tipo_coordenada_postgresql(conexao, tabela, coluna, tipo_existente, formato_atual):
+    """Troca o tipo da coluna no PostgreSQL (NUMERIC legado, DOUBLE PRECISION ou INTEGER)"""
+    tipo_nome = tipo_existente.__class__.__name__.upper()
+
+    if FORMATO_COORDENADAS == 'micrograus':
+        if tipo_nome == 'INTEGER':
+            return
+        conexao.exec_driver_sql(
+            f"ALTER TABLE {tabela} ALTER COLUMN {coluna} TYPE INTEGER "
+            f"USING ROUND({coluna} * {ESCALA_MICROGRAUS})::INTEGER"
+        )
+    else:
+        if tipo_nome in ('DOUBLE_PRECISION', 'DOUBLE', 'FLOAT'):
+            return
+        expressao = f"{coluna} / {ESCALA_MICROGRAUS}.0" if formato_atual == 'micrograus' else coluna
+        conexao.exec_driver_sql(
+            f"ALTER TABLE {tabela} ALTER COLUMN {coluna} TYPE DOUBLE PRECISION "
+            f"USING ({expressao})::DOUBLE PRECISION"
+        )
+
+def _migrar_textos_posicoes(tamanho_lote=5000):
+    """Move endereço e ponto de referência das posições gravadas como texto para o dicionário textos_posicao"""
+    if obter_metadado(db.session, 'textos_posicao_migrados'):
+        return
+
+    tabela = PosicaoRastreador.__table__
+    atualizacao = tabela.update().where(tabela.c.id == bindparam('b_id')).values(
+        endereco_id=bindparam('b_endereco_id'),
+        ponto_referencia_id=bindparam('b_ponto_referencia_id'),
+        endereco=None,
+        ponto_referencia=None
+    )
+
+    ultimo_id = 0
+    migradas = 0
+    while True:
+        # Percorre pela chave primária, um lote por transação
+        linhas = db.session.execute(
+            select(tabela.c.id, tabela.c.endereco, tabela.c.ponto_referencia)
+            .where(tabela.c.id > ultimo_id, or_(tabela.c.endereco.isnot(None), tabela.c.ponto_referencia.isnot(None)))
+            .order_by(tabela.c.id)
+            .limit(tamanho_lote)
+        ).all()
+        if not linhas:
+            break
+
+        ids_textos = dicionario_textos.internar(
+            [linha.endereco for linha in linhas] + [linha.ponto_referencia for linha in linhas]
+        )
+        db.session.execute(atualizacao, [
+            {
+                'b_id': linha.id,
+                'b_endereco_id': ids_textos.get(linha.endereco),
+                'b_ponto_referencia_id': ids_textos.get(linha.ponto_referencia)
+            }
+            for linha in linhas
+        ])
+        db.session.commit()
+
+        ultimo_id = linhas[-1].id
+        migradas += len(linhas)
+
+    definir_metadado(db.session, 'textos_posicao_migrados', '1')
+    db.session.commit()
+    if migradas:
+        print(f"{migradas} posição(ões) migrada(s) para o dicionário de textos")
+
+def _gerar_trechos_posicoes():
+    """Calcula a distância e o tempo desde a posição anterior das posições gravadas antes dessas colunas"""
+    if obter_metadado(db.session, 'trechos_posicoes_gerados'):
+        return
+
+    # Importação tardia: o módulo de trechos depende dos modelos
+    from src.trechos_posicoes import gerar_trechos
+    posicoes = gerar_trechos()
+
+    definir_metadado(db.session, 'trechos_posicoes_gerados', '1')
+    db.session.commit()
+    if posicoes:
+        print(f"Trechos entre posições calculados ({posicoes} posição(ões))")
+
+def _gerar_resumos_posicoes():
+    """Gera os resumos diários das posições gravadas antes da tabela de resumos existir"""
+    if obter_metadado(db.session, 'resumos_posicoes_gerados'):
+        return
+
+    # Importação tardia: o módulo de resumos depende dos modelos
+    from src.resumo_posicoes import gerar_resumos
+    dias = gerar_resumos()
+
+    definir_metadado(db.session, 'resumos_posicoes_gerados', '1')
+    db.session.commit()
+    if dias:
+        print(f"Resumos diários de posições gerados ({dias} dia(s))")
@@ -0,0 +1,92 @@
+from src.models import db
+from src.models.tipos import tipo_coordenada
+from src.models.posicao_rastreador import AcessoresPosicao
+from datetime import datetime
+
+class PontoPeriodo(AcessoresPosicao):
+    """
+    Primeiro ou último ponto de um período (aberto ou montado pela segmentação vetorizada),
+    com os mesmos acessores de PosicaoRastreador
+    """
+    __slots__ = ('data_hora', 'latitude', 'longitude', 'endereco_id', 'ponto_referencia_id',
+                 'endereco_texto', 'ponto_referencia_texto')
+
+    # Colunas de PosicaoRastreador que o ponto do período não guarda
+    data_hora_fim = None
+    quantidade_pontos = None
+    latitude_fim = None
+    longitude_fim = None
+    distancia_interna_m = None
+
+    def __init__(self, data_hora, latitude, longitude, endereco_id, ponto_referencia_id,
+                 endereco_texto=None, ponto_referencia_texto=None):
+        self.data_hora = data_hora
+        self.latitude = latitude
+        self.longitude = longitude
+        self.endereco_id = endereco_id
+        self.ponto_referencia_id = ponto_referencia_id
+        self.endereco_texto = endereco_texto
+        self.ponto_referencia_texto = ponto_referencia_texto
+
+class PeriodoAberto(db.Model):
+    """
+    Último período (parada ou movimento) de um veículo, ainda sem evento.
+    A próxima classificação continua o período em vez de reler as posições já processadas.
+    """
+    __tablename__ = 'periodos_abertos'
+
+    veiculo_id = db.Column(db.Integer, db.ForeignKey('veiculos.id'), primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False)  # parada ou movimento
+    # Primeiro ponto do período
+    data_inicio = db.Column(db.DateTime, nullable=False)
+    latitude_inicio = db.Column(tipo_coordenada())
+    longitude_inicio = db.Column(tipo_coordenada())
+    endereco_inicio_id = db.Column(db.Integer, db.ForeignKey('textos_posicao.id'))
+    ponto_referencia_inicio_id = db.Column(db.Integer, db.ForeignKey('textos_posicao.id'))
+    # Último ponto do período
+    data_fim = db.Column(db.DateTime, nullable=False)
+    latitude_fim = db.Column(tipo_coordenada())
+    longitude_fim = db.Column(tipo_coordenada())
+    endereco_fim_id = db.Column(db.Integer, db.ForeignKey('textos_posicao.id'))
+    ponto_referencia_fim_id = db.Column(db.Integer, db.ForeignKey('textos_posicao.id'))
+    distancia_m = db.Column(db.Float, default=0)  # distância acumulada até o último ponto
+    quantidade_pontos = db.Column(db.Integer, default=0)
+    # Somas das coordenadas dos pontos (graus), para o centro do período
+    soma_latitude = db.Column(db.Float, default=0)
+    soma_longitude = db.Column(db.Float, default=0)
+    pontos_coordenadas = db.Column(db.Integer, default=0)
+    # Detecção por agrupamento: células da grade ocupadas pela parada aberta (JSON)
+    celulas_parada = db.Column(db.Text)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def ponto_inicio(self):
+        return PontoPeriodo(self.data_inicio, self.latitude_inicio, self.longitude_inicio,
+                            self.endereco_inicio_id, self.ponto_referencia_inicio_id)
+
+    def ponto_fim(self):
+        return PontoPeriodo(self.data_fim, self.latitude_fim, self.longitude_fim,
+                            self.endereco_fim_id, self.ponto_referencia_fim_id)
+
+    def to_dict(self):
+        inicio = self.ponto_inicio()
+        fim = self.ponto_fim()
+        return {
+            'veiculo_id': self.veiculo_id,
+            'tipo': self.tipo,
+            'data_inicio': self.data_inicio.isoformat(),
+            'data_fim': self.data_fim.isoformat(),
+            'duracao_minutos': int((self.data_fim - self.data_inicio).total_seconds() / 60),
+            'latitude_inicio': self.latitude_inicio,
+            'longitude_inicio': self.longitude_inicio,
+            'latitude_fim': self.latitude_fim,
+            'longitude_fim': self.longitude_fim,
+            'endereco_inicio': inicio.endereco,
+            'ponto_referencia_inicio': inicio.ponto_referencia,
+            'endereco_fim': fim.endereco,
+            'distancia_km': round((self.distancia_m or 0) / 1000, 2),
+            'quantidade_pontos': self.quantidade_pontos,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
+
+    def __repr__(self):
+        return f'<PeriodoAberto {self.veiculo_id} - {self.tipo} desde {self.data_inicio}>'
@@ -1,32 +1,63 @@
 from src.models import db
+from src.models.tipos import tipo_coordenada
+from src.models.texto_posicao import dicionario_textos
 from datetime import datetime
 
-class PosicaoRastreador(db.Model):
-    __tablename__ = 'posicoes_rastreador'
+class AcessoresPosicao:
+    """Acessores comuns à posição ativa (PosicaoRastreador) e à arquivada"""
+    __slots__ = ()
     
-    id = db.Column(db.Integer, primary_key=True)
-    veiculo_id = db.Column(db.Integer, db.ForeignKey('veiculos.id'), nullable=False)
-    data_hora = db.Column(db.DateTime, nullable=False)
-    latitude = db.Column(db.Numeric(10, 8))
-    longitude = db.Column(db.Numeric(11, 8))
-    velocidade = db.Column(db.Integer, default=0)
-    endereco = db.Column(db.Text)
-    ponto_referencia = db.Column(db.String(200))
-    km_aproximado = db.Column(db.Integer)
-    tempo_parado = db.Column(db.Integer, default=0)  # em minutos
-    tipo_mensagem = db.Column(db.String(50))
-    modo_emergencia = db.Column(db.Boolean, default=False)
-    bateria = db.Column(db.Integer)
-    processado = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    @property
+    def endereco(self):
+        if self.endereco_id:
+            return dicionario_textos.texto(self.endereco_id)
+        return self.endereco_texto
+    
+    @endereco.setter
+    def endereco(self, valor):
+        self.endereco_texto = valor
+        self.endereco_id = None
+    
+    @property
+    def ponto_referencia(self):
+        if self.ponto_referencia_id:
+            return dicionario_textos.texto(self.ponto_referencia_id)
+        return self.ponto_referencia_texto
+    
+    @ponto_referencia.setter
+    def ponto_referencia(self, valor):
+        self.ponto_referencia_texto = valor
+        self.ponto_referencia_id = None
+    
+    # Uma linha compactada representa vários pontos parados consecutivos:
+    # data_hora/latitude/longitude são do primeiro ponto e os acessores *_final, do último
+    @property
+    def compactada(self):
+        return self.data_hora_fim is not None
+    
+    @property
+    def pontos(self):
+        return self.quantidade_pontos or 1
+    
+    @property
+    def data_hora_final(self):
+        return self.data_hora_fim or self.data_hora
+    
+    @property
+    def latitude_final(self):
+        return self.latitude_fim if self.compactada else self.latitude
+    
+    @property
+    def longitude_final(self):
+        return self.longitude_fim if self.compactada else self.longitude
     
     def to_dict(self):
-        return {
+        dados = {
             'id': self.id,
             'veiculo_id': self.veiculo_id,
             'data_hora': self.data_hora.isoformat() if self.data_hora else None,
-            'latitude': float(self.latitude) if self.latitude else None,
-            'longitude': float(self.longitude) if self.longitude else None,
+            'latitude': self.latitude if self.latitude else None,
+            'longitude': self.longitude if self.longitude else None,
             'velocidade': self.velocidade,
             'endereco': self.endereco,
             'ponto_referencia': self.ponto_referencia,
@@ -38,6 +69,58 @@ class PosicaoRastreador(db.Model):
             'processado': self.processado,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+        if self.compactada:
+            dados.update({
+                'data_hora_fim': self.data_hora_fim.isoformat(),
+                'quantidade_pontos': self.quantidade_pontos,
+                'latitude_fim': self.latitude_fim,
+                'longitude_fim': self.longitude_fim,
+                'distancia_interna_m': self.distancia_interna_m
+            })
+        return dados
+
+class PosicaoRastreador(AcessoresPosicao, db.Model):
+    __tablename__ = 'posicoes_rastreador'
+    __table_args__ = (
+        # Uma posição por veículo e horário; base da deduplicação na importação em lote
+        db.Index('uq_posicoes_veiculo_data_hora', 'veiculo_id', 'data_hora', unique=True),
+        # Posições pendentes de classificação de um veículo, em ordem cronológica
+        db.Index('ix_posicoes_veiculo_processado_data_hora', 'veiculo_id', 'processado', 'data_hora'),
+        # Linhas compactadas que cobrem um horário (deduplicação na importação)
+        db.Index('ix_posicoes_veiculo_data_hora_fim', 'veiculo_id', 'data_hora_fim',
+                 sqlite_where=db.text('data_hora_fim IS NOT NULL'),
+                 postgresql_where=db.text('data_hora_fim IS NOT NULL')),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    veiculo_id = db.Column(db.Integer, db.ForeignKey('veiculos.id'), nullable=False)
+    data_hora = db.Column(db.DateTime, nullable=False)
+    latitude = db.Column(tipo_coordenada())
+    longitude = db.Column(tipo_coordenada())
+    velocidade = db.Column(db.Integer, default=0)
+    # Endereço e ponto de referência ficam no dicionário textos_posicao
+    endereco_id = db.Column(db.Integer, db.ForeignKey('textos_posicao.id'))
+    ponto_referencia_id = db.Column(db.Integer, db.ForeignKey('textos_posicao.id'))
+    # Colunas de texto anteriores ao dicionário, lidas quando não há id
+    endereco_texto = db.Column('endereco', db.Text)
+    ponto_referencia_texto = db.Column('ponto_referencia', db.String(200))
+    km_aproximado = db.Column(db.Integer)
+    tempo_parado = db.Column(db.Integer, default=0)  # em minutos
+    tipo_mensagem = db.Column(db.String(50))
+    modo_emergencia = db.Column(db.Boolean, default=False)
+    bateria = db.Column(db.Integer)
+    processado = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Compactação de paradas (nulos em posições não compactadas)
+    data_hora_fim = db.Column(db.DateTime)  # horário do último ponto
+    quantidade_pontos = db.Column(db.Integer)
+    latitude_fim = db.Column(tipo_coordenada())
+    longitude_fim = db.Column(tipo_coordenada())
+    distancia_interna_m = db.Column(db.Float)  # soma das distâncias entre os pontos compactados
+    # Trecho desde a posição anterior do veículo (do seu último ponto até o primeiro desta),
+    # gravado na importação; zeros na primeira posição (ver src/trechos_posicoes.py)
+    distancia_anterior_m = db.Column(db.Float)
+    segundos_anterior = db.Column(db.Float)
     
     @staticmethod
     def calcular_distancia(lat1, lon1, lat2, lon2):
@@ -48,7 +131,7 @@ class PosicaoRastreador(db.Model):
             return 0
             
         # Converter graus para radianos
-        lat1, lon1, lat2, lon2 = map(math.radians, [float(lat1), float(lon1), float(lat2), float(lon2)])
+        lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
         
         # Fórmula de Haversine
         dlat = lat2 - lat1
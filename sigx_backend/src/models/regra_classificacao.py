@@ -0,0 +1,71 @@
+from src.models import db
+from datetime import datetime
+
+class RegraClassificacao(db.Model):
+    """
+    Regra de classificação de paradas: a primeira regra ativa (menor prioridade) cujas condições
+    a parada atende define o tipo do evento. Condições vazias não restringem; sem duração
+    própria, a regra usa a duração mínima/máxima do tipo de evento.
+    """
+    __tablename__ = 'regras_classificacao'
+
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False, unique=True)
+    tipo_evento_id = db.Column(db.Integer, db.ForeignKey('tipos_evento.id'), nullable=False)
+    prioridade = db.Column(db.Integer, nullable=False, default=100)  # menor = avaliada antes
+    categoria_local = db.Column(db.String(50))  # ex.: posto_combustivel (src/identificacao_locais.py)
+    duracao_minima = db.Column(db.Integer)  # em minutos
+    duracao_maxima = db.Column(db.Integer)  # em minutos
+    hora_minima = db.Column(db.Integer)  # hora de início da parada, 0-23 (inclusive)
+    hora_maxima = db.Column(db.Integer)  # menor que hora_minima: faixa que passa da meia-noite
+    observacoes = db.Column(db.String(200))  # {local}: ponto de referência ou endereço da parada
+    ativo = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'tipo_evento_id': self.tipo_evento_id,
+            'prioridade': self.prioridade,
+            'categoria_local': self.categoria_local,
+            'duracao_minima': self.duracao_minima,
+            'duracao_maxima': self.duracao_maxima,
+            'hora_minima': self.hora_minima,
+            'hora_maxima': self.hora_maxima,
+            'observacoes': self.observacoes,
+            'ativo': self.ativo,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    @staticmethod
+    def criar_regras_padrao():
+        """Regras equivalentes à classificação de paradas original (tipo_evento: nome do tipo)"""
+        return [
+            {'nome': 'Interjornada', 'tipo_evento': 'Interjornada', 'prioridade': 10,
+             'observacoes': 'Interjornada identificada automaticamente'},
+            {'nome': 'Abastecimento', 'tipo_evento': 'Abastecimento', 'prioridade': 20,
+             'categoria_local': 'posto_combustivel', 'duracao_minima': 10, 'duracao_maxima': 45,
+             'observacoes': 'Abastecimento em {local}'},
+            {'nome': 'Carga', 'tipo_evento': 'Carga', 'prioridade': 30,
+             'categoria_local': 'carga_descarga', 'duracao_minima': 30, 'duracao_maxima': 300,
+             'hora_minima': 0, 'hora_maxima': 11, 'observacoes': 'Carga em {local}'},
+            {'nome': 'Descarga', 'tipo_evento': 'Descarga', 'prioridade': 31,
+             'categoria_local': 'carga_descarga', 'duracao_minima': 30, 'duracao_maxima': 300,
+             'hora_minima': 12, 'hora_maxima': 23, 'observacoes': 'Descarga em {local}'},
+            {'nome': 'Almoço', 'tipo_evento': 'Almoço', 'prioridade': 40,
+             'hora_minima': 11, 'hora_maxima': 14, 'observacoes': 'Almoço identificado por horário'},
+            {'nome': 'Jantar', 'tipo_evento': 'Almoço', 'prioridade': 41,
+             'hora_minima': 18, 'hora_maxima': 21, 'observacoes': 'Jantar identificado por horário'},
+            {'nome': 'Café/Lanche', 'tipo_evento': 'Café/Lanche', 'prioridade': 50,
+             'observacoes': 'Lanche/café identificado por duração'},
+            {'nome': 'Manutenção', 'tipo_evento': 'Manutenção', 'prioridade': 60,
+             'categoria_local': 'oficina_manutencao', 'observacoes': 'Manutenção em {local}'},
+            {'nome': 'Outros', 'tipo_evento': 'Outros', 'prioridade': 1000,
+             'observacoes': 'Parada não categorizada automaticamente'}
+        ]
+
+    def __repr__(self):
+        return f'<RegraClassificacao {self.prioridade} {self.nome}>'
@@ -0,0 +1,34 @@
+from src.models import db
+from datetime import datetime
+
+class ResumoDiarioPosicoes(db.Model):
+    """
+    Totais das posições de um veículo em um dia (pela data_hora de cada linha), mantidos pela
+    importação e pela classificação. Guarda também o primeiro e o último ponto do dia, para que
+    a distância e o tempo entre dias consecutivos sejam somados ao juntar os resumos
+    (ver src/resumo_posicoes.py).
+    """
+    __tablename__ = 'resumos_diarios_posicoes'
+
+    veiculo_id = db.Column(db.Integer, db.ForeignKey('veiculos.id'), primary_key=True)
+    dia = db.Column(db.Date, primary_key=True)
+    # Pontos (uma linha compactada conta todos os seus pontos)
+    total_pontos = db.Column(db.Integer, nullable=False, default=0)
+    pontos_processados = db.Column(db.Integer, nullable=False, default=0)
+    pontos_parados = db.Column(db.Integer, nullable=False, default=0)
+    # Somas entre as posições do próprio dia
+    distancia_m = db.Column(db.Float, nullable=False, default=0)
+    minutos_movimento = db.Column(db.Float, nullable=False, default=0)
+    minutos_parado = db.Column(db.Float, nullable=False, default=0)
+    # Primeira posição do dia (início e velocidade) e fim da última
+    primeira_data_hora = db.Column(db.DateTime, nullable=False)
+    primeira_latitude = db.Column(db.Float)
+    primeira_longitude = db.Column(db.Float)
+    primeira_velocidade = db.Column(db.Integer)
+    ultima_data_hora = db.Column(db.DateTime, nullable=False)
+    ultima_latitude = db.Column(db.Float)
+    ultima_longitude = db.Column(db.Float)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ResumoDiarioPosicoes {self.veiculo_id} - {self.dia}>'
@@ -0,0 +1,53 @@
+from src.models import db
+from datetime import datetime
+import json
+import uuid
+
+class Tarefa(db.Model):
+    __tablename__ = 'tarefas'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    tipo = db.Column(db.String(30), nullable=False)  # 'importacao', 'classificacao', 'arquivamento'
+    estado = db.Column(db.String(20), nullable=False, default='pendente', index=True)  # 'pendente', 'executando', 'concluida', 'erro'
+    parametros = db.Column(db.Text)  # JSON com os dados da requisição
+    contadores = db.Column(db.Text)  # JSON com o progresso e o resultado
+    erro = db.Column(db.Text)
+    tentativas = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciada_em = db.Column(db.DateTime)
+    concluida_em = db.Column(db.DateTime)
+
+    def obter_parametros(self):
+        return json.loads(self.parametros) if self.parametros else {}
+
+    def definir_parametros(self, parametros):
+        self.parametros = json.dumps(parametros)
+
+    def obter_contadores(self):
+        return json.loads(self.contadores) if self.contadores else {}
+
+    def definir_contadores(self, contadores):
+        self.contadores = json.dumps(contadores)
+
+    def to_dict(self):
+        # Os dados de entrada (ex.: posições) não são devolvidos, apenas o resumo
+        parametros = {
+            chave: valor for chave, valor in self.obter_parametros().items()
+            if chave != 'posicoes'
+        }
+
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'parametros': parametros,
+            'contadores': self.obter_contadores(),
+            'erro': self.erro,
+            'tentativas': self.tentativas,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'iniciada_em': self.iniciada_em.isoformat() if self.iniciada_em else None,
+            'concluida_em': self.concluida_em.isoformat() if self.concluida_em else None
+        }
+
+    def __repr__(self):
+        return f'<Tarefa {self.id} - {self.tipo} ({self.estado})>'
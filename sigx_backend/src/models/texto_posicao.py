@@ -0,0 +1,145 @@
+from src.models import db
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+import hashlib
+import threading
+import weakref
+
+class TextoPosicao(db.Model):
+    """Dicionário de endereços e pontos de referência: cada texto distinto é gravado uma única vez"""
+    __tablename__ = 'textos_posicao'
+
+    id = db.Column(db.Integer, primary_key=True)
+    hash = db.Column(db.String(40), nullable=False, unique=True)  # SHA-1 do texto
+    texto = db.Column(db.Text, nullable=False)
+
+    @staticmethod
+    def calcular_hash(texto):
+        return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+    def __repr__(self):
+        return f'<TextoPosicao {self.id}>'
+
+
+class DicionarioTextos:
+    """
+    Cache dos textos internados, compartilhado pelo processo (um por banco).
+    Textos gravados na transação corrente ficam em session.info até o commit,
+    para que um rollback não deixe no cache ids que não existem no banco.
+    """
+
+    # Limite de hashes por cláusula IN
+    TAMANHO_CONSULTA = 500
+
+    def __init__(self):
+        # engine -> ({id: texto}, {hash: id})
+        self._caches = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _cache(self, engine=None):
+        engine = engine or db.engine
+        cache = self._caches.get(engine)
+        if cache is None:
+            with self._lock:
+                cache = self._caches.setdefault(engine, ({}, {}))
+        return cache
+
+    def _pendentes(self):
+        return db.session.info.setdefault('textos_pendentes', {})
+
+    def _guardar(self, registros, engine=None):
+        """registros: {id: (hash, texto)}"""
+        por_id, por_hash = self._cache(engine)
+        with self._lock:
+            for texto_id, (hash_texto, texto) in registros.items():
+                por_id[texto_id] = texto
+                por_hash[hash_texto] = texto_id
+
+    def texto(self, texto_id):
+        """Texto de um id do dicionário"""
+        if texto_id is None:
+            return None
+
+        texto = self._cache()[0].get(texto_id)
+        if texto is not None:
+            return texto
+
+        pendentes = db.session.info.get('textos_pendentes')
+        if pendentes and texto_id in pendentes:
+            return pendentes[texto_id][1]
+
+        registro = db.session.execute(
+            select(TextoPosicao.hash, TextoPosicao.texto).where(TextoPosicao.id == texto_id)
+        ).first()
+        if registro is None:
+            return None
+        self._guardar({texto_id: (registro.hash, registro.texto)})
+        return registro.texto
+
+    def internar(self, textos):
+        """
+        Retorna {texto: id} para os textos informados, gravando os que ainda não existem.
+        Não faz commit: a transação pertence a quem chama.
+        """
+        por_hash = self._cache()[1]
+        ids = {}
+        faltantes = {}
+        pendentes_por_hash = {hash_texto: texto_id for texto_id, (hash_texto, _) in self._pendentes().items()}
+
+        for texto in set(textos):
+            if texto is None:
+                continue
+            hash_texto = TextoPosicao.calcular_hash(texto)
+            texto_id = por_hash.get(hash_texto) or pendentes_por_hash.get(hash_texto)
+            if texto_id:
+                ids[texto] = texto_id
+            else:
+                faltantes[hash_texto] = texto
+
+        if not faltantes:
+            return ids
+
+        # Conflito no hash: outro processo gravou o mesmo texto; o id é lido abaixo
+        db.session.execute(
+            self._instrucao_insercao(),
+            [{'hash': hash_texto, 'texto': texto} for hash_texto, texto in faltantes.items()]
+        )
+
+        hashes = list(faltantes)
+        pendentes = self._pendentes()
+        for inicio in range(0, len(hashes), self.TAMANHO_CONSULTA):
+            consulta = select(TextoPosicao.id, TextoPosicao.hash).where(
+                TextoPosicao.hash.in_(hashes[inicio:inicio + self.TAMANHO_CONSULTA])
+            )
+            for texto_id, hash_texto in db.session.execute(consulta):
+                ids[faltantes[hash_texto]] = texto_id
+                pendentes[texto_id] = (hash_texto, faltantes[hash_texto])
+
+        return ids
+
+    def _instrucao_insercao(self):
+        """INSERT que ignora conflitos no hash"""
+        tabela = TextoPosicao.__table__
+        dialeto = db.session.get_bind().dialect.name
+
+        if dialeto == 'postgresql':
+            return postgresql.insert(tabela).on_conflict_do_nothing(index_elements=['hash'])
+        if dialeto == 'sqlite':
+            return sqlite.insert(tabela).on_conflict_do_nothing(index_elements=['hash'])
+        return tabela.insert()
+
+
+# Instância única do dicionário
+dicionario_textos = DicionarioTextos()
+
+
+@event.listens_for(db.session, 'after_commit')
+def _confirmar_textos_pendentes(session):
+    pendentes = session.info.pop('textos_pendentes', None)
+    if pendentes:
+        dicionario_textos._guardar(pendentes, session.get_bind())
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_textos_pendentes(session):
+    session.info.pop('textos_pendentes', None)
@@ -1,5 +1,9 @@
 from src.models import db
+from src.models.invalidacao import invalidar_ao_alterar
+from sqlalchemy import select
 from datetime import datetime
+import threading
+import weakref
 
 class TipoEvento(db.Model):
     __tablename__ = 'tipos_evento'
@@ -118,3 +122,66 @@ class TipoEvento(db.Model):
     def __repr__(self):
         return f'<TipoEvento {self.nome}>'
 
+
+
+class TipoEventoRegistrado:
+    """Cópia somente leitura de um TipoEvento, usável fora da sessão que o carregou"""
+    __slots__ = ('id', 'nome', 'descricao', 'cor_hex', 'duracao_minima', 'duracao_maxima',
+                 'automatico', 'ativo', 'created_at', '_dict')
+
+    def __init__(self, tipo):
+        for campo in self.__slots__[:-1]:
+            setattr(self, campo, getattr(tipo, campo))
+        self._dict = tipo.to_dict()
+
+    def to_dict(self):
+        return dict(self._dict)
+
+    def __repr__(self):
+        return f'<TipoEventoRegistrado {self.nome}>'
+
+
+class RegistroTiposEvento:
+    """
+    Tipos de evento em memória, por nome e por id, compartilhados pelo processo (um por banco).
+    Carregados uma vez e descartados quando um TipoEvento é gravado ou removido pelo ORM.
+    """
+
+    def __init__(self):
+        # engine -> ({id: tipo}, {nome: tipo})
+        self._caches = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        # Incrementada a cada invalidação (caches derivados dos tipos comparam a versão)
+        self.versao = 0
+
+    def _cache(self):
+        engine = db.engine
+        cache = self._caches.get(engine)
+        if cache is None:
+            tipos = [TipoEventoRegistrado(tipo) for tipo in db.session.execute(select(TipoEvento)).scalars()]
+            cache = ({tipo.id: tipo for tipo in tipos}, {tipo.nome: tipo for tipo in tipos})
+            with self._lock:
+                self._caches[engine] = cache
+        return cache
+
+    def por_id(self, tipo_id):
+        return self._cache()[0].get(tipo_id)
+
+    def por_nome(self, nome):
+        return self._cache()[1].get(nome)
+
+    def ativos(self):
+        """{nome: tipo} dos tipos ativos"""
+        return {nome: tipo for nome, tipo in self._cache()[1].items() if tipo.ativo}
+
+    def invalidar(self, engine=None):
+        with self._lock:
+            self._caches.pop(engine or db.engine, None)
+            self.versao += 1
+
+
+# Instância única do registro
+registro_tipos_evento = RegistroTiposEvento()
+
+
+invalidar_ao_alterar(TipoEvento, registro_tipos_evento.invalidar)
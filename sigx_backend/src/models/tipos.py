@@ -0,0 +1,33 @@
+import os
+from sqlalchemy.types import Float, Integer, TypeDecorator
+
+# Formato de armazenamento das coordenadas:
+#   'real'       - ponto flutuante (padrão); lido direto como float, sem Decimal
+#   'micrograus' - inteiro com graus × 10^6 (~0,11 m de resolução); menor no disco
+FORMATO_COORDENADAS = os.environ.get('SIGX_FORMATO_COORDENADAS', 'real')
+FORMATOS_COORDENADAS = ('real', 'micrograus')
+ESCALA_MICROGRAUS = 1000000
+
+if FORMATO_COORDENADAS not in FORMATOS_COORDENADAS:
+    raise ValueError(f"SIGX_FORMATO_COORDENADAS inválido: {FORMATO_COORDENADAS}")
+
+class CoordenadaMicrograus(TypeDecorator):
+    """Coordenada gravada como inteiro em micrograus e lida como float em graus"""
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int(round(float(value) * ESCALA_MICROGRAUS))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return value / ESCALA_MICROGRAUS
+
+def tipo_coordenada():
+    """Tipo de coluna das coordenadas conforme SIGX_FORMATO_COORDENADAS"""
+    if FORMATO_COORDENADAS == 'micrograus':
+        return CoordenadaMicrograus()
+    return Float()
@@ -0,0 +1,125 @@
+"""
+Módulo de Paginação
+Paginação por cursor (keyset) das listagens: cada página continua a partir da última linha da página
+anterior pela ordenação (data, id), sem OFFSET, e o custo de uma página não depende da sua posição
+na tabela. O cursor devolvido em "proximo_cursor" é um token opaco. Com exportar=true a listagem
+inteira é enviada em fluxo como um array JSON, lida em páginas internamente.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from flask import request, jsonify, Response, stream_with_context
+from sqlalchemy import DateTime, tuple_
+from src.models import db
+
+LIMITE_PADRAO = 1000
+LIMITE_MAXIMO = 10000
+# Linhas por consulta na exportação em fluxo
+TAMANHO_PAGINA_EXPORTACAO = 1000
+
+
+class CursorInvalido(ValueError):
+    """Token de cursor malformado ou de outra listagem"""
+
+
+def codificar_cursor(valores):
+    """Token opaco com os valores da ordenação da última linha da página"""
+    valores = [valor.isoformat() if isinstance(valor, datetime) else valor for valor in valores]
+    return base64.urlsafe_b64encode(json.dumps(valores, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(token, colunas):
+    """Valores da ordenação guardados no token, convertidos para o tipo das colunas"""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(valores, list) or len(valores) != len(colunas) or None in valores:
+            raise CursorInvalido('Cursor inválido')
+        return [
+            datetime.fromisoformat(valor) if isinstance(coluna.type, DateTime) else valor
+            for coluna, valor in zip(colunas, valores)
+        ]
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise CursorInvalido('Cursor inválido')
+
+
+def ordenar_apos(query, colunas, valores=None, decrescente=True):
+    """Ordena a consulta pelas colunas e mantém só as linhas depois dos valores do cursor"""
+    if valores is not None:
+        chave = tuple_(*colunas) if len(colunas) > 1 else colunas[0]
+        limite = tuple(valores) if len(colunas) > 1 else valores[0]
+        query = query.filter(chave < limite if decrescente else chave > limite)
+    return query.order_by(*(coluna.desc() if decrescente else coluna for coluna in colunas))
+
+
+def fechar_pagina(itens, colunas, limite):
+    """Corta a página no limite; se sobrou linha, o cursor aponta para a última linha mantida"""
+    if len(itens) <= limite:
+        return itens, None
+    itens = itens[:limite]
+    return itens, codificar_cursor([getattr(itens[-1], coluna.key) for coluna in colunas])
+
+
+def paginar(query, colunas, limite, cursor=None, decrescente=True):
+    """Uma página da consulta a partir do cursor: (itens, proximo_cursor)"""
+    valores = decodificar_cursor(cursor, colunas) if cursor else None
+    itens = ordenar_apos(query, colunas, valores, decrescente).limit(limite + 1).all()
+    return fechar_pagina(itens, colunas, limite)
+
+
+def _exportar(chave, buscar_pagina, serializar):
+    """Array JSON em fluxo com todas as páginas; um erro no meio fecha o array com {"erro": ...}"""
+    def gerar():
+        yield '['
+        separador = ''
+        cursor = None
+        try:
+            while True:
+                itens, cursor = buscar_pagina(TAMANHO_PAGINA_EXPORTACAO, cursor)
+                for item in itens:
+                    yield separador + json.dumps(serializar(item), ensure_ascii=False)
+                    separador = ','
+                # Objetos já enviados não precisam ficar no mapa de identidade da sessão
+                db.session.expunge_all()
+                if cursor is None:
+                    break
+        except Exception as e:
+            yield separador + json.dumps({'erro': f'Erro interno: {str(e)}'}, ensure_ascii=False)
+        finally:
+            db.session.rollback()
+        yield ']'
+
+    return Response(stream_with_context(gerar()), mimetype='application/json',
+                    headers={'Content-Disposition': f'attachment; filename={chave}.json'})
+
+
+def listar_paginado(chave, buscar_pagina, limite_padrao=LIMITE_PADRAO, serializar=None, extras=None):
+    """
+    Resposta de uma listagem paginada: buscar_pagina(limite, cursor) -> (itens, proximo_cursor).
+    Parâmetros da requisição: limite, cursor (o "proximo_cursor" da página anterior) e exportar.
+    """
+    serializar = serializar or (lambda item: item.to_dict())
+
+    if request.args.get('exportar', '').lower() == 'true':
+        return _exportar(chave, buscar_pagina, serializar)
+
+    limite = min(max(request.args.get('limite', type=int, default=limite_padrao), 1), LIMITE_MAXIMO)
+    try:
+        itens, proximo_cursor = buscar_pagina(limite, request.args.get('cursor') or None)
+    except CursorInvalido as e:
+        return jsonify({'erro': str(e)}), 400
+
+    return jsonify({
+        chave: [serializar(item) for item in itens],
+        **(extras or {}),
+        'total': len(itens),
+        'proximo_cursor': proximo_cursor
+    })
+
+
+def listar_consulta(chave, query, colunas, decrescente=True, **opcoes):
+    """listar_paginado de uma consulta ORM ordenada pelas colunas (a última deve ser única, ex.: id)"""
+    return listar_paginado(
+        chave, lambda limite, cursor: paginar(query, colunas, limite, cursor, decrescente), **opcoes
+    )
@@ -0,0 +1,134 @@
+"""
+Módulo de Prévia da Classificação
+Executa a classificação sobre um intervalo qualquer sem gravar nada (eventos, posições processadas
+ou período aberto) e compara os eventos que seriam gerados com os já existentes. A comparação é uma
+junção por data de início (merge join) entre os dois fluxos ordenados: os eventos previstos saem
+janela a janela e os existentes são lidos em páginas, e a memória não cresce com o intervalo.
+"""
+
+from datetime import datetime
+from sqlalchemy import select, tuple_
+from src.models import db, EventoJornada
+from src.models.tipo_evento import registro_tipos_evento
+from src.classificador_eventos import ClassificadorEventos
+
+# Eventos existentes por consulta
+TAMANHO_PAGINA_EVENTOS = 1000
+SITUACOES = ('igual', 'alterado', 'novo', 'removido')
+
+COLUNAS_EXISTENTES = (
+    EventoJornada.id,
+    EventoJornada.tipo_evento_id,
+    EventoJornada.data_inicio,
+    EventoJornada.data_fim,
+    EventoJornada.duracao_minutos,
+    EventoJornada.observacoes,
+    EventoJornada.aprovado
+)
+
+
+def _nome_tipo(tipo_evento_id):
+    tipo = registro_tipos_evento.por_id(tipo_evento_id)
+    return tipo.nome if tipo else None
+
+
+def _eventos_existentes(veiculo_id, data_inicio, data_fim):
+    """Eventos automáticos do veículo com início no intervalo, em ordem de (data_inicio, id), por páginas"""
+    ultimo = None
+    while True:
+        consulta = select(*COLUNAS_EXISTENTES).where(
+            EventoJornada.veiculo_id == veiculo_id,
+            EventoJornada.classificacao_automatica == True,
+            EventoJornada.data_inicio >= data_inicio,
+            EventoJornada.data_inicio <= data_fim
+        )
+        if ultimo is not None:
+            consulta = consulta.where(tuple_(EventoJornada.data_inicio, EventoJornada.id) > ultimo)
+        pagina = db.session.execute(
+            consulta.order_by(EventoJornada.data_inicio, EventoJornada.id).limit(TAMANHO_PAGINA_EVENTOS)
+        ).all()
+        yield from pagina
+        if len(pagina) < TAMANHO_PAGINA_EVENTOS:
+            return
+        ultimo = (pagina[-1].data_inicio, pagina[-1].id)
+
+
+def _evento_previsto(registro):
+    evento = {
+        chave: valor.isoformat() if isinstance(valor, datetime) else valor
+        for chave, valor in registro.items()
+        if chave not in ('classificacao_automatica', 'aprovado', 'sincronizado_sigx')
+    }
+    evento['tipo_evento'] = _nome_tipo(registro['tipo_evento_id'])
+    return evento
+
+
+def _evento_existente(linha):
+    return {
+        'id': linha.id,
+        'tipo_evento_id': linha.tipo_evento_id,
+        'tipo_evento': _nome_tipo(linha.tipo_evento_id),
+        'data_inicio': linha.data_inicio.isoformat(),
+        'data_fim': linha.data_fim.isoformat() if linha.data_fim else None,
+        'duracao_minutos': linha.duracao_minutos,
+        'observacoes': linha.observacoes,
+        'aprovado': linha.aprovado
+    }
+
+
+def previa_classificacao(veiculo_id, data_inicio, data_fim, motor=None, deteccao=None):
+    """
+    Gera as linhas da prévia de [data_inicio, data_fim]: cada evento previsto com a situação em relação
+    ao evento automático existente de mesmo início ('igual', 'alterado' ou 'novo'), os existentes sem
+    correspondente ('removido') e, por último, o resumo. Nada é gravado.
+    """
+    classificador = ClassificadorEventos(motor, deteccao)
+    contagem = dict.fromkeys(SITUACOES, 0)
+    por_tipo = {}
+
+    def contar(nome, origem):
+        por_tipo.setdefault(nome, {'previstos': 0, 'existentes': 0})[origem] += 1
+
+    def removido(linha):
+        contagem['removido'] += 1
+        contar(_nome_tipo(linha.tipo_evento_id), 'existentes')
+        return {'situacao': 'removido', 'evento_existente': _evento_existente(linha)}
+
+    try:
+        existentes = _eventos_existentes(veiculo_id, data_inicio, data_fim)
+        existente = next(existentes, None)
+        for registro in classificador.simular_classificacao(veiculo_id, data_inicio, data_fim):
+            while existente is not None and existente.data_inicio < registro['data_inicio']:
+                yield removido(existente)
+                existente = next(existentes, None)
+
+            linha = {'situacao': 'novo', 'evento': _evento_previsto(registro)}
+            if existente is not None and existente.data_inicio == registro['data_inicio']:
+                iguais = (existente.tipo_evento_id, existente.data_fim) == (registro['tipo_evento_id'], registro['data_fim'])
+                linha['situacao'] = 'igual' if iguais else 'alterado'
+                linha['evento_existente'] = _evento_existente(existente)
+                contar(_nome_tipo(existente.tipo_evento_id), 'existentes')
+                existente = next(existentes, None)
+
+            contagem[linha['situacao']] += 1
+            contar(linha['evento']['tipo_evento'], 'previstos')
+            yield linha
+
+        while existente is not None:
+            yield removido(existente)
+            existente = next(existentes, None)
+
+        yield {
+            'sucesso': True,
+            'previa': True,
+            'veiculo_id': veiculo_id,
+            'data_inicio': data_inicio.isoformat(),
+            'data_fim': data_fim.isoformat(),
+            'eventos_previstos': contagem['igual'] + contagem['alterado'] + contagem['novo'],
+            'eventos_existentes': contagem['igual'] + contagem['alterado'] + contagem['removido'],
+            'diferencas': contagem,
+            'por_tipo': por_tipo
+        }
+    finally:
+        # Somente leitura: encerra a transação de leitura sem gravar nada
+        db.session.rollback()
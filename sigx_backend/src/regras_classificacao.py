@@ -0,0 +1,127 @@
+"""
+Módulo de Regras de Classificação
+Compila as regras de classificação de paradas (tabela regras_classificacao) em uma tabela de
+decisão em memória, avaliada em lote sobre as paradas de uma classificação, sem consultas por regra.
+A tabela é recompilada quando uma regra ou um tipo de evento é alterado.
+"""
+
+import threading
+import weakref
+from sqlalchemy import select
+from src.models import db
+from src.models.invalidacao import invalidar_ao_alterar
+from src.models.regra_classificacao import RegraClassificacao
+from src.models.tipo_evento import registro_tipos_evento
+
+INFINITO = float('inf')
+
+
+class RegraCompilada:
+    """Regra com os limites já resolvidos (duração do tipo de evento quando a regra não define)"""
+    __slots__ = ('id', 'nome', 'prioridade', 'tipo_evento_id', 'categoria_local',
+                 'duracao_minima', 'duracao_maxima', 'hora_minima', 'hora_maxima', 'modelo_observacoes')
+
+    def __init__(self, regra, tipo):
+        self.id = regra.id
+        self.nome = regra.nome
+        self.prioridade = regra.prioridade
+        self.tipo_evento_id = tipo.id
+        self.categoria_local = regra.categoria_local or None
+        duracao_minima = regra.duracao_minima if regra.duracao_minima is not None else tipo.duracao_minima
+        duracao_maxima = regra.duracao_maxima if regra.duracao_maxima is not None else tipo.duracao_maxima
+        self.duracao_minima = duracao_minima if duracao_minima is not None else -INFINITO
+        self.duracao_maxima = duracao_maxima if duracao_maxima is not None else INFINITO
+        self.hora_minima = regra.hora_minima
+        self.hora_maxima = regra.hora_maxima
+        self.modelo_observacoes = regra.observacoes or ''
+
+    def aceita_horario(self, hora):
+        if self.hora_minima is None and self.hora_maxima is None:
+            return True
+        minima = 0 if self.hora_minima is None else self.hora_minima
+        maxima = 23 if self.hora_maxima is None else self.hora_maxima
+        if minima <= maxima:
+            return minima <= hora <= maxima
+        # Faixa que passa da meia-noite (ex.: 22 a 4)
+        return hora >= minima or hora <= maxima
+
+    def observacoes(self, local):
+        return self.modelo_observacoes.replace('{local}', local)
+
+
+class TabelaDecisao:
+    """
+    Regras ordenadas por prioridade (a primeira que aceita a parada vale). Para cada conjunto de
+    categorias de local, guarda só as regras aplicáveis: a condição de local, a mais seletiva,
+    é resolvida uma vez por combinação de categorias, e não por parada.
+    """
+
+    def __init__(self, regras):
+        self.regras = sorted(regras, key=lambda regra: (regra.prioridade, regra.id))
+        self._por_categorias = {}
+
+    def _regras_aplicaveis(self, categorias):
+        regras = self._por_categorias.get(categorias)
+        if regras is None:
+            regras = [
+                regra for regra in self.regras
+                if regra.categoria_local is None or regra.categoria_local in categorias
+            ]
+            self._por_categorias[categorias] = regras
+        return regras
+
+    def avaliar(self, paradas):
+        """
+        paradas: [(duracao_minutos, hora_inicio, categorias_local)].
+        Retorna a regra aplicada a cada parada (None se nenhuma regra aceitar).
+        """
+        resultado = []
+        for duracao, hora, categorias in paradas:
+            aplicada = None
+            for regra in self._regras_aplicaveis(categorias):
+                if regra.duracao_minima <= duracao <= regra.duracao_maxima and regra.aceita_horario(hora):
+                    aplicada = regra
+                    break
+            resultado.append(aplicada)
+        return resultado
+
+
+class CacheTabelaDecisao:
+    """Tabela de decisão compilada, compartilhada pelo processo (uma por banco)"""
+
+    def __init__(self):
+        # engine -> (versão do registro de tipos, tabela)
+        self._tabelas = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def obter(self):
+        engine = db.engine
+        versao = registro_tipos_evento.versao
+        registro = self._tabelas.get(engine)
+        if registro is not None and registro[0] == versao:
+            return registro[1]
+
+        tabela = self._compilar()
+        with self._lock:
+            self._tabelas[engine] = (versao, tabela)
+        return tabela
+
+    def _compilar(self):
+        """Uma consulta às regras ativas; regras de tipos inativos ou inexistentes são ignoradas"""
+        regras = []
+        for regra in db.session.execute(select(RegraClassificacao).where(RegraClassificacao.ativo == True)).scalars():
+            tipo = registro_tipos_evento.por_id(regra.tipo_evento_id)
+            if tipo is not None and tipo.ativo:
+                regras.append(RegraCompilada(regra, tipo))
+        return TabelaDecisao(regras)
+
+    def invalidar(self, engine=None):
+        with self._lock:
+            self._tabelas.pop(engine or db.engine, None)
+
+
+# Instância única do cache
+tabela_decisao = CacheTabelaDecisao()
+
+
+invalidar_ao_alterar(RegraClassificacao, tabela_decisao.invalidar)
@@ -0,0 +1,417 @@
+"""
+Módulo de Resumos Diários de Posições
+Mantém, por veículo e dia, os totais das estatísticas de posições (pontos, processados, parados,
+distância e tempo em movimento e parado), com o primeiro e o último ponto do dia. As estatísticas
+de um intervalo juntam os resumos dos dias completos e somam no banco, pelos trechos entre posições
+(src/trechos_posicoes.py), o restante (dias parciais das pontas ou dias ainda sem resumo).
+
+A importação acumula as posições novas no resumo do dia quando elas vêm depois da última posição
+já resumida; nos demais casos o dia é refeito a partir das posições. A classificação soma as
+posições que marca como processadas.
+"""
+
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import bindparam, case, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models import db, PosicaoRastreador
+from src.models.resumo_posicoes import ResumoDiarioPosicoes
+from src.models.migracoes import obter_metadado
+from src.arquivo_posicoes import consultar_arquivo, mesclar_posicoes, posicoes_arquivadas
+from src.trechos_posicoes import PosicaoImportada, trecho_gravado
+
+# Até esta velocidade (km/h) a posição conta como parada
+VELOCIDADE_PARADO = 5
+# Dias refeitos por transação na geração dos resumos de um banco existente
+DIAS_POR_LOTE_GERACAO = 7
+
+UM_DIA = timedelta(days=1)
+CAMPOS_RESUMO = (
+    'total_pontos', 'pontos_processados', 'pontos_parados', 'distancia_m', 'minutos_movimento',
+    'minutos_parado', 'primeira_data_hora', 'primeira_latitude', 'primeira_longitude',
+    'primeira_velocidade', 'ultima_data_hora', 'ultima_latitude', 'ultima_longitude'
+)
+
+
+class AcumuladorPosicoes:
+    """
+    Totais de uma sequência de posições em ordem cronológica, alimentada por posições ou por
+    resumos diários: a distância e o tempo entre o fim de um trecho e o início do seguinte são
+    somados na junção, e o resultado é o mesmo de percorrer todas as posições.
+    """
+
+    def __init__(self):
+        self.total_pontos = 0
+        self.pontos_processados = 0
+        self.pontos_parados = 0
+        self.distancia_m = 0.0
+        self.minutos_movimento = 0.0
+        self.minutos_parado = 0.0
+        self.primeira_data_hora = None
+        self.primeira_latitude = None
+        self.primeira_longitude = None
+        self.primeira_velocidade = None
+        self.ultima_data_hora = None
+        self.ultima_latitude = None
+        self.ultima_longitude = None
+
+    def _ligar(self, data_hora, latitude, longitude, velocidade, trecho=None):
+        """Distância e tempo do fim do que já foi acumulado até o próximo ponto (trecho: já calculados)"""
+        if self.ultima_data_hora is None:
+            return
+        if trecho is not None:
+            self.distancia_m += trecho[0]
+            minutos = trecho[1] / 60
+        else:
+            if latitude and longitude and self.ultima_latitude and self.ultima_longitude:
+                self.distancia_m += PosicaoRastreador.calcular_distancia(
+                    self.ultima_latitude, self.ultima_longitude, latitude, longitude
+                )
+            minutos = (data_hora - self.ultima_data_hora).total_seconds() / 60
+        if (velocidade or 0) > VELOCIDADE_PARADO:
+            self.minutos_movimento += minutos
+        else:
+            self.minutos_parado += minutos
+
+    def _iniciar(self, data_hora, latitude, longitude, velocidade):
+        if self.primeira_data_hora is None:
+            self.primeira_data_hora = data_hora
+            self.primeira_latitude = latitude
+            self.primeira_longitude = longitude
+            self.primeira_velocidade = velocidade
+
+    def adicionar_posicao(self, posicao):
+        pontos = posicao.pontos
+        self.total_pontos += pontos
+        if posicao.processado:
+            self.pontos_processados += pontos
+        if (posicao.velocidade or 0) <= VELOCIDADE_PARADO:
+            self.pontos_parados += pontos
+
+        # Distância e tempo entre os pontos absorvidos (posição compactada, sempre parada)
+        if posicao.compactada:
+            self.distancia_m += posicao.distancia_interna_m or 0
+            self.minutos_parado += (posicao.data_hora_fim - posicao.data_hora).total_seconds() / 60
+
+        self._ligar(posicao.data_hora, posicao.latitude, posicao.longitude, posicao.velocidade,
+                    trecho_gravado(posicao, self.ultima_data_hora))
+        self._iniciar(posicao.data_hora, posicao.latitude, posicao.longitude, posicao.velocidade)
+        self.ultima_data_hora = posicao.data_hora_final
+        self.ultima_latitude = posicao.latitude_final
+        self.ultima_longitude = posicao.longitude_final
+
+    def adicionar_resumo(self, resumo):
+        self._ligar(resumo.primeira_data_hora, resumo.primeira_latitude, resumo.primeira_longitude,
+                    resumo.primeira_velocidade)
+        self._iniciar(resumo.primeira_data_hora, resumo.primeira_latitude, resumo.primeira_longitude,
+                      resumo.primeira_velocidade)
+        for campo in ('total_pontos', 'pontos_processados', 'pontos_parados',
+                      'distancia_m', 'minutos_movimento', 'minutos_parado'):
+            setattr(self, campo, getattr(self, campo) + getattr(resumo, campo))
+        self.ultima_data_hora = resumo.ultima_data_hora
+        self.ultima_latitude = resumo.ultima_latitude
+        self.ultima_longitude = resumo.ultima_longitude
+
+    def colunas(self):
+        return {campo: getattr(self, campo) for campo in CAMPOS_RESUMO}
+
+    def estatisticas(self):
+        """Período e estatísticas no formato de /api/posicoes/estatisticas"""
+        total = self.total_pontos
+        posicoes_movimento = total - self.pontos_parados
+
+        # Velocidade média (apenas em movimento)
+        velocidade_media = 0
+        if self.minutos_movimento > 0:
+            velocidade_media = (self.distancia_m / 1000) / (self.minutos_movimento / 60)
+
+        return {
+            'periodo': {
+                'inicio': self.primeira_data_hora.isoformat(),
+                'fim': self.ultima_data_hora.isoformat(),
+                'duracao_horas': round((self.ultima_data_hora - self.primeira_data_hora).total_seconds() / 3600, 2)
+            },
+            'estatisticas': {
+                'total_posicoes': total,
+                'posicoes_processadas': self.pontos_processados,
+                'posicoes_pendentes': total - self.pontos_processados,
+                'posicoes_parado': self.pontos_parados,
+                'posicoes_movimento': posicoes_movimento,
+                'distancia_total_km': round(self.distancia_m / 1000, 2),
+                'tempo_movimento_horas': round(self.minutos_movimento / 60, 2),
+                'tempo_parado_horas': round(self.minutos_parado / 60, 2),
+                'velocidade_media_kmh': round(velocidade_media, 2),
+                'percentual_parado': round((self.pontos_parados / total) * 100, 2),
+                'percentual_movimento': round((posicoes_movimento / total) * 100, 2)
+            }
+        }
+
+
+def _inicio_dia(dia):
+    return datetime.combine(dia, time())
+
+
+def _como_data(valor):
+    # date() do SQLite devolve texto; o PostgreSQL, date
+    return date.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+def ler_posicoes(veiculo_id, inicio=None, fim=None):
+    """Posições do veículo com data_hora em [inicio, fim), ativas e arquivadas, em ordem cronológica"""
+    query = PosicaoRastreador.query.filter_by(veiculo_id=veiculo_id)
+    if inicio:
+        query = query.filter(PosicaoRastreador.data_hora >= inicio)
+    if fim:
+        query = query.filter(PosicaoRastreador.data_hora < fim)
+    posicoes = query.order_by(PosicaoRastreador.data_hora).all()
+
+    if consultar_arquivo(inicio):
+        posicoes = mesclar_posicoes(posicoes, posicoes_arquivadas(
+            veiculo_id, inicio, fim - timedelta(microseconds=1) if fim else None
+        ))
+    return posicoes
+
+
+def _consulta_resumos(veiculo_id):
+    # Linhas da tabela (não objetos ORM): os resumos são gravados por INSERT/UPDATE em lote
+    tabela = ResumoDiarioPosicoes.__table__
+    return select(tabela).where(tabela.c.veiculo_id == veiculo_id).order_by(tabela.c.dia)
+
+
+def _gravar_resumos(veiculo_id, acumuladores):
+    """Grava (insere ou substitui) os resumos {dia: acumulador} do veículo"""
+    if not acumuladores:
+        return
+
+    tabela = ResumoDiarioPosicoes.__table__
+    agora = datetime.utcnow()
+    linhas = [
+        {'veiculo_id': veiculo_id, 'dia': dia, **acumulador.colunas(), 'updated_at': agora}
+        for dia, acumulador in acumuladores.items()
+    ]
+
+    dialeto = db.session.get_bind().dialect.name
+    if dialeto in ('postgresql', 'sqlite'):
+        instrucao = (postgresql if dialeto == 'postgresql' else sqlite).insert(tabela)
+        instrucao = instrucao.on_conflict_do_update(
+            index_elements=['veiculo_id', 'dia'],
+            set_={campo: instrucao.excluded[campo] for campo in CAMPOS_RESUMO + ('updated_at',)}
+        )
+        db.session.execute(instrucao, linhas)
+        return
+
+    db.session.execute(delete(tabela).where(
+        tabela.c.veiculo_id == veiculo_id, tabela.c.dia.in_(list(acumuladores))
+    ))
+    db.session.execute(tabela.insert(), linhas)
+
+
+def _recalcular_intervalo(veiculo_id, primeiro_dia, ultimo_dia):
+    """Refaz os resumos de [primeiro_dia, ultimo_dia] a partir das posições"""
+    acumuladores = {}
+    for posicao in ler_posicoes(veiculo_id, _inicio_dia(primeiro_dia), _inicio_dia(ultimo_dia) + UM_DIA):
+        dia = posicao.data_hora.date()
+        if dia not in acumuladores:
+            acumuladores[dia] = AcumuladorPosicoes()
+        acumuladores[dia].adicionar_posicao(posicao)
+
+    # Dias que ficaram sem posições perdem o resumo
+    tabela = ResumoDiarioPosicoes.__table__
+    db.session.execute(delete(tabela).where(
+        tabela.c.veiculo_id == veiculo_id,
+        tabela.c.dia >= primeiro_dia,
+        tabela.c.dia <= ultimo_dia,
+        tabela.c.dia.notin_(list(acumuladores))
+    ))
+    _gravar_resumos(veiculo_id, acumuladores)
+
+
+def recalcular_resumos(veiculo_id, dias):
+    """Refaz os resumos dos dias informados, lendo as posições de cada sequência de dias consecutivos"""
+    dias = sorted(set(dias))
+    inicio = 0
+    for indice in range(1, len(dias) + 1):
+        if indice == len(dias) or dias[indice] - dias[indice - 1] > UM_DIA:
+            _recalcular_intervalo(veiculo_id, dias[inicio], dias[indice - 1])
+            inicio = indice
+
+
+def acrescentar_posicoes(veiculo_id, registros, dias_alterados=()):
+    """
+    Atualiza os resumos com as linhas inseridas por uma importação (dicionários de colunas).
+    Linhas posteriores à última posição do resumo (ou de um dia ainda sem posições) são acumuladas
+    nele; o dia é refeito a partir das posições se a linha cai no meio do dia, se não há como saber
+    se o dia já tinha posições ou se está em dias_alterados (ex.: parada compactada estendida).
+    Não faz commit: a transação pertence a quem chama.
+    """
+    por_dia = {}
+    for registro in sorted(registros, key=lambda registro: registro['data_hora']):
+        por_dia.setdefault(registro['data_hora'].date(), []).append(registro)
+
+    refazer = set(dias_alterados)
+    tabela = ResumoDiarioPosicoes.__table__
+    resumos = {
+        resumo.dia: resumo for resumo in db.session.execute(
+            _consulta_resumos(veiculo_id).where(tabela.c.dia.in_(list(por_dia)))
+        )
+    } if por_dia else {}
+
+    # Depois da geração dos resumos, todo dia com posições ativas tem resumo: um dia sem resumo
+    # (e fora do arquivo) ainda não tinha posições
+    resumos_completos = bool(obter_metadado(db.session, 'resumos_posicoes_gerados'))
+
+    acumuladores = {}
+    for dia, linhas in por_dia.items():
+        resumo = resumos.get(dia)
+        if resumo is None:
+            dia_novo = resumos_completos and not consultar_arquivo(_inicio_dia(dia))
+            if dia in refazer or not dia_novo:
+                refazer.add(dia)
+                continue
+        elif dia in refazer or linhas[0]['data_hora'] <= resumo.ultima_data_hora:
+            refazer.add(dia)
+            continue
+        acumulador = AcumuladorPosicoes()
+        if resumo is not None:
+            acumulador.adicionar_resumo(resumo)
+        for linha in linhas:
+            acumulador.adicionar_posicao(PosicaoImportada(linha))
+        acumuladores[dia] = acumulador
+
+    _gravar_resumos(veiculo_id, acumuladores)
+    recalcular_resumos(veiculo_id, refazer)
+
+
+def registrar_processadas(veiculo_id, ids_posicoes):
+    """
+    Soma aos resumos os pontos das posições que a classificação acabou de marcar como processadas
+    (todas estavam pendentes). Não faz commit.
+    """
+    dia = func.date(PosicaoRastreador.data_hora)
+    pontos = func.sum(func.coalesce(PosicaoRastreador.quantidade_pontos, 1))
+    linhas = db.session.execute(
+        select(dia, pontos).where(PosicaoRastreador.id.in_(ids_posicoes)).group_by(dia)
+    ).all()
+    if not linhas:
+        return
+
+    tabela = ResumoDiarioPosicoes.__table__
+    db.session.execute(
+        tabela.update()
+        .where(tabela.c.veiculo_id == bindparam('b_veiculo_id'), tabela.c.dia == bindparam('b_dia'))
+        .values(pontos_processados=tabela.c.pontos_processados + bindparam('b_pontos')),
+        [{'b_veiculo_id': veiculo_id, 'b_dia': _como_data(dia), 'b_pontos': pontos} for dia, pontos in linhas]
+    )
+
+
+def _somar_intervalo(veiculo_id, inicio, fim):
+    """
+    Acumulador das posições ativas de [inicio, fim) somado no banco pelos trechos gravados
+    (src/trechos_posicoes.py), com o primeiro e o último ponto lidos; None se alguma posição do
+    intervalo ainda não tem trecho
+    """
+    filtros = [PosicaoRastreador.veiculo_id == veiculo_id]
+    if inicio:
+        filtros.append(PosicaoRastreador.data_hora >= inicio)
+    if fim:
+        filtros.append(PosicaoRastreador.data_hora < fim)
+
+    acumulador = AcumuladorPosicoes()
+    consulta = PosicaoRastreador.query.filter(*filtros)
+    primeira = consulta.order_by(PosicaoRastreador.data_hora).first()
+    if primeira is None:
+        return acumulador
+    ultima = consulta.order_by(PosicaoRastreador.data_hora.desc()).first()
+
+    # O trecho da primeira posição liga o intervalo ao que vem antes dele e fica de fora das somas
+    seguinte = PosicaoRastreador.data_hora > primeira.data_hora
+    pontos = func.coalesce(PosicaoRastreador.quantidade_pontos, 1)
+    parada = func.coalesce(PosicaoRastreador.velocidade, 0) <= VELOCIDADE_PARADO
+    somas = db.session.execute(select(
+        func.count(case((seguinte, 1))).label('linhas_seguintes'),
+        func.count(case((seguinte, PosicaoRastreador.segundos_anterior))).label('linhas_com_trecho'),
+        func.sum(pontos).label('total_pontos'),
+        func.sum(case((PosicaoRastreador.processado == True, pontos), else_=0)).label('pontos_processados'),
+        func.sum(case((parada, pontos), else_=0)).label('pontos_parados'),
+        func.coalesce(func.sum(case((seguinte, PosicaoRastreador.distancia_anterior_m), else_=0)), 0)
+        .label('distancia_anterior_m'),
+        func.coalesce(func.sum(PosicaoRastreador.distancia_interna_m), 0).label('distancia_interna_m'),
+        func.coalesce(func.sum(case((seguinte & ~parada, PosicaoRastreador.segundos_anterior), else_=0)), 0)
+        .label('segundos_movimento')
+    ).where(*filtros)).one()
+    if somas.linhas_com_trecho < somas.linhas_seguintes:
+        return None
+
+    segundos_total = (ultima.data_hora_final - primeira.data_hora).total_seconds()
+    acumulador.total_pontos = somas.total_pontos
+    acumulador.pontos_processados = somas.pontos_processados
+    acumulador.pontos_parados = somas.pontos_parados
+    acumulador.distancia_m = somas.distancia_anterior_m + somas.distancia_interna_m
+    acumulador.minutos_movimento = somas.segundos_movimento / 60
+    # Entre o primeiro e o último ponto, o tempo que não é de movimento é de parada
+    acumulador.minutos_parado = max(segundos_total - somas.segundos_movimento, 0) / 60
+    acumulador._iniciar(primeira.data_hora, primeira.latitude, primeira.longitude, primeira.velocidade)
+    acumulador.ultima_data_hora = ultima.data_hora_final
+    acumulador.ultima_latitude = ultima.latitude_final
+    acumulador.ultima_longitude = ultima.longitude_final
+    return acumulador
+
+
+def _acumular_intervalo(acumulador, veiculo_id, inicio, fim):
+    """Acumula as posições de [inicio, fim): somas no banco ou, com arquivo ou sem trechos, posição a posição"""
+    if not consultar_arquivo(inicio):
+        somado = _somar_intervalo(veiculo_id, inicio, fim)
+        if somado is not None:
+            if somado.total_pontos:
+                acumulador.adicionar_resumo(somado)
+            return
+    for posicao in ler_posicoes(veiculo_id, inicio, fim):
+        acumulador.adicionar_posicao(posicao)
+
+
+def acumular_periodo(veiculo_id, data_inicio=None, data_fim=None):
+    """
+    Acumulador das posições do veículo com data_hora em [data_inicio, data_fim] (limites opcionais):
+    resumos dos dias inteiros no intervalo e posições das pontas e dos dias sem resumo
+    """
+    fim = data_fim + timedelta(microseconds=1) if data_fim else None
+    tabela = ResumoDiarioPosicoes.__table__
+    consulta = _consulta_resumos(veiculo_id)
+    if data_inicio:
+        # Primeiro dia que começa dentro do intervalo
+        primeiro_dia = data_inicio.date() if data_inicio.time() == time() else data_inicio.date() + UM_DIA
+        consulta = consulta.where(tabela.c.dia >= primeiro_dia)
+    if fim:
+        # Último dia que termina dentro do intervalo
+        consulta = consulta.where(tabela.c.dia < fim.date())
+
+    acumulador = AcumuladorPosicoes()
+    cursor = data_inicio
+    for resumo in db.session.execute(consulta):
+        inicio_dia = _inicio_dia(resumo.dia)
+        if cursor is None or cursor < inicio_dia:
+            _acumular_intervalo(acumulador, veiculo_id, cursor, inicio_dia)
+        acumulador.adicionar_resumo(resumo)
+        cursor = inicio_dia + UM_DIA
+
+    if cursor is None or fim is None or cursor < fim:
+        _acumular_intervalo(acumulador, veiculo_id, cursor, fim)
+    return acumulador
+
+
+def gerar_resumos():
+    """Gera os resumos de todas as posições ativas (banco anterior aos resumos), em lotes de dias"""
+    intervalos = db.session.execute(
+        select(PosicaoRastreador.veiculo_id, func.min(PosicaoRastreador.data_hora), func.max(PosicaoRastreador.data_hora))
+        .group_by(PosicaoRastreador.veiculo_id)
+    ).all()
+
+    dias_gerados = 0
+    for veiculo_id, primeira, ultima in intervalos:
+        dia = primeira.date()
+        while dia <= ultima.date():
+            ultimo_dia = min(dia + timedelta(days=DIAS_POR_LOTE_GERACAO - 1), ultima.date())
+            _recalcular_intervalo(veiculo_id, dia, ultimo_dia)
+            db.session.commit()
+            dias_gerados += (ultimo_dia - dia).days + 1
+            dia = ultimo_dia + UM_DIA
+    return dias_gerados
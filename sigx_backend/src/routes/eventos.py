@@ -1,6 +1,11 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from src.models import db, EventoJornada, TipoEvento, Veiculo, Motorista
+from src.models import db, EventoJornada, RegraClassificacao, Veiculo, Motorista
+from src.models.tipo_evento import registro_tipos_evento
+from src.identificacao_locais import categorias_disponiveis
+from src.paginacao import listar_consulta
+from src.serializacao import SerializadorEventos
+from src.estatisticas_eventos import calcular_estatisticas_eventos
 
 eventos_bp = Blueprint('eventos', __name__)
 
@@ -43,7 +48,7 @@ def criar_evento():
         if not motorista:
             return jsonify({'erro': 'Motorista não encontrado'}), 404
         
-        tipo_evento = TipoEvento.query.get(data['tipo_evento_id'])
+        tipo_evento = registro_tipos_evento.por_id(data['tipo_evento_id'])
         if not tipo_evento:
             return jsonify({'erro': 'Tipo de evento não encontrado'}), 404
         
@@ -88,8 +93,16 @@ def criar_evento():
 
 @eventos_bp.route('/listar', methods=['GET'])
 def listar_eventos():
-    """Lista eventos com filtros opcionais"""
+    """
+    Lista eventos com filtros opcionais, do mais recente, paginados por cursor (limite, cursor, exportar)
+    Campos: fields=id,data_inicio,tipo_evento e expand=veiculo,motorista (padrão: todos)
+    """
     try:
+        try:
+            serializador = SerializadorEventos.da_requisicao()
+        except ValueError as e:
+            return jsonify({'erro': str(e)}), 400
+        
         # Parâmetros de filtro
         veiculo_id = request.args.get('veiculo_id', type=int)
         motorista_id = request.args.get('motorista_id', type=int)
@@ -127,12 +140,8 @@ def listar_eventos():
             classificacao_automatica = classificacao_automatica.lower() == 'true'
             query = query.filter(EventoJornada.classificacao_automatica == classificacao_automatica)
         
-        eventos = query.order_by(EventoJornada.data_inicio.desc()).all()
-        
-        return jsonify({
-            'eventos': [evento.to_dict() for evento in eventos],
-            'total': len(eventos)
-        })
+        return listar_consulta('eventos', query.options(*serializador.opcoes()),
+                               (EventoJornada.data_inicio, EventoJornada.id), serializar=serializador)
         
     except Exception as e:
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
@@ -267,7 +276,7 @@ def excluir_evento(evento_id):
 def listar_tipos_evento():
     """Lista todos os tipos de evento disponíveis"""
     try:
-        tipos = TipoEvento.query.filter_by(ativo=True).order_by(TipoEvento.nome).all()
+        tipos = sorted(registro_tipos_evento.ativos().values(), key=lambda tipo: tipo.nome)
         
         return jsonify({
             'tipos_evento': [tipo.to_dict() for tipo in tipos],
@@ -277,56 +286,161 @@ def listar_tipos_evento():
     except Exception as e:
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
 
+# ==================== REGRAS DE CLASSIFICAÇÃO ====================
+
+CAMPOS_REGRA = [
+    'nome', 'tipo_evento_id', 'prioridade', 'categoria_local', 'duracao_minima', 'duracao_maxima',
+    'hora_minima', 'hora_maxima', 'observacoes', 'ativo'
+]
+
+def _validar_regra(data):
+    """Mensagem de erro dos campos informados, ou None se forem válidos"""
+    if 'nome' in data and not data['nome']:
+        return 'Campo obrigatório: nome'
+    if 'tipo_evento_id' in data and not registro_tipos_evento.por_id(data['tipo_evento_id']):
+        return 'Tipo de evento não encontrado'
+    if data.get('categoria_local') and data['categoria_local'] not in categorias_disponiveis():
+        return f"categoria_local deve ser uma de: {', '.join(categorias_disponiveis())}"
+    for campo in ('prioridade', 'duracao_minima', 'duracao_maxima', 'hora_minima', 'hora_maxima'):
+        valor = data.get(campo)
+        if valor is not None and (not isinstance(valor, int) or isinstance(valor, bool) or valor < 0):
+            return f'{campo} deve ser um inteiro não negativo'
+    for campo in ('hora_minima', 'hora_maxima'):
+        if data.get(campo) is not None and data[campo] > 23:
+            return f'{campo} deve estar entre 0 e 23'
+    return None
+
+@eventos_bp.route('/regras', methods=['GET'])
+def listar_regras():
+    """Lista as regras de classificação de paradas, na ordem de avaliação"""
+    try:
+        regras = RegraClassificacao.query.order_by(RegraClassificacao.prioridade, RegraClassificacao.id).all()
+        
+        return jsonify({
+            'regras': [regra.to_dict() for regra in regras],
+            'categorias_local': list(categorias_disponiveis()),
+            'total': len(regras)
+        })
+        
+    except Exception as e:
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@eventos_bp.route('/regras/criar', methods=['POST'])
+def criar_regra():
+    """
+    Cria uma regra de classificação de paradas (vale na próxima classificação, sem reiniciar)
+    Formato esperado:
+    {
+        "nome": "Pernoite no pátio",
+        "tipo_evento_id": 1,
+        "prioridade": 5,
+        "categoria_local": "carga_descarga",
+        "duracao_minima": 360,
+        "hora_minima": 20,
+        "hora_maxima": 4,
+        "observacoes": "Pernoite em {local}"
+    }
+    """
+    try:
+        data = request.get_json() or {}
+        
+        for campo in ('nome', 'tipo_evento_id'):
+            if campo not in data:
+                return jsonify({'erro': f'Campo obrigatório: {campo}'}), 400
+        
+        erro = _validar_regra(data)
+        if erro:
+            return jsonify({'erro': erro}), 400
+        
+        if RegraClassificacao.query.filter_by(nome=data['nome']).first():
+            return jsonify({'erro': 'Já existe uma regra com este nome'}), 400
+        
+        regra = RegraClassificacao(**{campo: data[campo] for campo in CAMPOS_REGRA if campo in data})
+        db.session.add(regra)
+        db.session.commit()
+        
+        return jsonify({
+            'sucesso': True,
+            'regra': regra.to_dict()
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@eventos_bp.route('/regras/<int:regra_id>/atualizar', methods=['PUT'])
+def atualizar_regra(regra_id):
+    """Atualiza uma regra de classificação (ex.: limites de duração ou horário)"""
+    try:
+        regra = db.session.get(RegraClassificacao, regra_id)
+        if not regra:
+            return jsonify({'erro': 'Regra não encontrada'}), 404
+        
+        data = request.get_json() or {}
+        erro = _validar_regra(data)
+        if erro:
+            return jsonify({'erro': erro}), 400
+        
+        if data.get('nome') and data['nome'] != regra.nome and RegraClassificacao.query.filter_by(nome=data['nome']).first():
+            return jsonify({'erro': 'Já existe uma regra com este nome'}), 400
+        
+        for campo in CAMPOS_REGRA:
+            if campo in data:
+                setattr(regra, campo, data[campo])
+        
+        db.session.commit()
+        
+        return jsonify({
+            'sucesso': True,
+            'regra': regra.to_dict()
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@eventos_bp.route('/regras/<int:regra_id>/excluir', methods=['DELETE'])
+def excluir_regra(regra_id):
+    """Exclui uma regra de classificação"""
+    try:
+        regra = db.session.get(RegraClassificacao, regra_id)
+        if not regra:
+            return jsonify({'erro': 'Regra não encontrada'}), 404
+        
+        db.session.delete(regra)
+        db.session.commit()
+        
+        return jsonify({'sucesso': True})
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
 @eventos_bp.route('/estatisticas', methods=['GET'])
 def estatisticas_eventos():
-    """Retorna estatísticas dos eventos"""
+    """
+    Retorna estatísticas dos eventos (calculadas no banco)
+    Filtros: veiculo_id, motorista_id, data_inicio, data_fim; agrupar=motorista,dia,tipo (também veiculo)
+    """
     try:
         veiculo_id = request.args.get('veiculo_id', type=int)
+        motorista_id = request.args.get('motorista_id', type=int)
         data_inicio = request.args.get('data_inicio')
         data_fim = request.args.get('data_fim')
-        
-        query = EventoJornada.query
-        
-        if veiculo_id:
-            query = query.filter(EventoJornada.veiculo_id == veiculo_id)
+        agrupar = [item.strip() for item in request.args.get('agrupar', '').split(',') if item.strip()]
         
         if data_inicio:
             data_inicio = datetime.fromisoformat(data_inicio)
-            query = query.filter(EventoJornada.data_inicio >= data_inicio)
         
         if data_fim:
             data_fim = datetime.fromisoformat(data_fim)
-            query = query.filter(EventoJornada.data_inicio <= data_fim)
-        
-        eventos = query.all()
-        
-        # Calcular estatísticas
-        total_eventos = len(eventos)
-        eventos_aprovados = sum(1 for e in eventos if e.aprovado)
-        eventos_automaticos = sum(1 for e in eventos if e.classificacao_automatica)
-        eventos_sincronizados = sum(1 for e in eventos if e.sincronizado_sigx)
         
-        # Estatísticas por tipo
-        tipos_stats = {}
-        for evento in eventos:
-            tipo_nome = evento.tipo_evento.nome if evento.tipo_evento else 'Desconhecido'
-            if tipo_nome not in tipos_stats:
-                tipos_stats[tipo_nome] = 0
-            tipos_stats[tipo_nome] += 1
+        try:
+            estatisticas = calcular_estatisticas_eventos(veiculo_id, motorista_id, data_inicio, data_fim, agrupar)
+        except ValueError as e:
+            return jsonify({'erro': str(e)}), 400
         
-        return jsonify({
-            'estatisticas': {
-                'total_eventos': total_eventos,
-                'eventos_aprovados': eventos_aprovados,
-                'eventos_pendentes': total_eventos - eventos_aprovados,
-                'eventos_automaticos': eventos_automaticos,
-                'eventos_manuais': total_eventos - eventos_automaticos,
-                'eventos_sincronizados': eventos_sincronizados,
-                'percentual_aprovados': round((eventos_aprovados / total_eventos) * 100, 2) if total_eventos > 0 else 0,
-                'percentual_automaticos': round((eventos_automaticos / total_eventos) * 100, 2) if total_eventos > 0 else 0
-            },
-            'por_tipo': tipos_stats
-        })
+        return jsonify(estatisticas)
         
     except Exception as e:
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
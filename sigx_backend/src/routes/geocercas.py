@@ -0,0 +1,198 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy import insert
+from src.models import db, Geocerca
+from src.geocercas import normalizar_geocerca, geocercas_geojson, indice_geocercas
+from src.identificacao_locais import categorias_disponiveis
+from src.paginacao import listar_consulta
+
+geocercas_bp = Blueprint('geocercas', __name__)
+
+# Geocercas por INSERT na importação em lote
+TAMANHO_LOTE_IMPORTACAO = 1000
+# Erros de validação devolvidos na resposta da importação
+MAXIMO_ERROS_RESPOSTA = 100
+
+@geocercas_bp.route('/listar', methods=['GET'])
+def listar_geocercas():
+    """Lista as geocercas por id (filtros: categoria, ativo; paginação: limite, cursor, exportar)"""
+    try:
+        categoria = request.args.get('categoria')
+        ativo = request.args.get('ativo')
+
+        query = Geocerca.query
+
+        if categoria:
+            query = query.filter(Geocerca.categoria == categoria)
+
+        if ativo is not None:
+            query = query.filter(Geocerca.ativo == (ativo.lower() == 'true'))
+
+        return listar_consulta('geocercas', query, (Geocerca.id,), decrescente=False,
+                               extras={'categorias_local': list(categorias_disponiveis())})
+
+    except Exception as e:
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@geocercas_bp.route('/<int:geocerca_id>', methods=['GET'])
+def obter_geocerca(geocerca_id):
+    """Obtém uma geocerca"""
+    try:
+        geocerca = db.session.get(Geocerca, geocerca_id)
+        if not geocerca:
+            return jsonify({'erro': 'Geocerca não encontrada'}), 404
+
+        return jsonify(geocerca.to_dict())
+
+    except Exception as e:
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@geocercas_bp.route('/criar', methods=['POST'])
+def criar_geocerca():
+    """
+    Cria uma geocerca (vale na próxima classificação, sem reiniciar)
+    Formato esperado (círculo):
+    {
+        "nome": "Posto Graal km 410",
+        "categoria": "posto_combustivel",
+        "latitude": -20.3911,
+        "longitude": -43.5136,
+        "raio_m": 150
+    }
+    Polígono: "forma": "poligono" e "vertices": [[latitude, longitude], ...]
+    """
+    try:
+        data = request.get_json() or {}
+
+        try:
+            valores = normalizar_geocerca(data)
+        except ValueError as e:
+            return jsonify({'erro': str(e)}), 400
+
+        geocerca = Geocerca(**valores)
+        db.session.add(geocerca)
+        db.session.commit()
+
+        return jsonify({
+            'sucesso': True,
+            'geocerca': geocerca.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@geocercas_bp.route('/<int:geocerca_id>/atualizar', methods=['PUT'])
+def atualizar_geocerca(geocerca_id):
+    """Atualiza uma geocerca (os campos não informados são mantidos)"""
+    try:
+        geocerca = db.session.get(Geocerca, geocerca_id)
+        if not geocerca:
+            return jsonify({'erro': 'Geocerca não encontrada'}), 404
+
+        data = request.get_json() or {}
+        atual = geocerca.to_dict()
+        # Trocar a forma descarta a geometria anterior
+        if data.get('forma', atual['forma']) != atual['forma']:
+            atual = {campo: atual[campo] for campo in ('nome', 'categoria', 'ativo')}
+
+        try:
+            valores = normalizar_geocerca({**atual, **data})
+        except ValueError as e:
+            return jsonify({'erro': str(e)}), 400
+
+        for campo, valor in valores.items():
+            setattr(geocerca, campo, valor)
+
+        db.session.commit()
+
+        return jsonify({
+            'sucesso': True,
+            'geocerca': geocerca.to_dict()
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@geocercas_bp.route('/<int:geocerca_id>/excluir', methods=['DELETE'])
+def excluir_geocerca(geocerca_id):
+    """Exclui uma geocerca"""
+    try:
+        geocerca = db.session.get(Geocerca, geocerca_id)
+        if not geocerca:
+            return jsonify({'erro': 'Geocerca não encontrada'}), 404
+
+        db.session.delete(geocerca)
+        db.session.commit()
+
+        return jsonify({'sucesso': True})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@geocercas_bp.route('/importar', methods=['POST'])
+def importar_geocercas():
+    """
+    Importa geocercas em lote: {"geocercas": [...]} no formato de /criar, ou uma FeatureCollection
+    GeoJSON (Polygon, ou Point com properties.raio_m; nome e categoria em properties).
+    Itens inválidos são ignorados e listados em "erros"; os válidos são gravados em uma transação.
+    """
+    try:
+        data = request.get_json() or {}
+
+        if data.get('type') == 'FeatureCollection':
+            itens = geocercas_geojson(data)
+        else:
+            itens = data.get('geocercas')
+
+        if not isinstance(itens, list) or not itens:
+            return jsonify({'erro': 'Informe "geocercas" (lista) ou uma FeatureCollection GeoJSON'}), 400
+
+        linhas = []
+        erros = []
+        for indice, item in enumerate(itens):
+            try:
+                linhas.append(normalizar_geocerca(item if isinstance(item, dict) else {}))
+            except ValueError as e:
+                erros.append({'indice': indice, 'erro': str(e)})
+
+        # INSERT em lote, sem objetos ORM
+        for inicio in range(0, len(linhas), TAMANHO_LOTE_IMPORTACAO):
+            db.session.execute(insert(Geocerca), linhas[inicio:inicio + TAMANHO_LOTE_IMPORTACAO])
+        db.session.commit()
+        # O INSERT em lote não passa pelos eventos do ORM que invalidam o índice
+        indice_geocercas.invalidar()
+
+        return jsonify({
+            'sucesso': True,
+            'importadas': len(linhas),
+            'total_erros': len(erros),
+            'erros': erros[:MAXIMO_ERROS_RESPOSTA]
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@geocercas_bp.route('/localizar', methods=['GET'])
+def localizar_geocercas():
+    """Geocercas ativas que contêm o ponto (latitude, longitude), da menor para a maior"""
+    try:
+        latitude = request.args.get('latitude', type=float)
+        longitude = request.args.get('longitude', type=float)
+        if latitude is None or longitude is None:
+            return jsonify({'erro': 'Informe latitude e longitude'}), 400
+
+        geocercas = indice_geocercas.obter().localizar(latitude, longitude)
+
+        return jsonify({
+            'geocercas': [
+                {'id': geocerca.id, 'nome': geocerca.nome, 'categoria': geocerca.categoria}
+                for geocerca in geocercas
+            ],
+            'total': len(geocercas)
+        })
+
+    except Exception as e:
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
-from src.models import db, IntegracaoAbastecimento, IntegracaoChecklist, IntegracaoManutencao, EventoJornada, TipoEvento, Veiculo
+from src.models import db, IntegracaoAbastecimento, IntegracaoChecklist, IntegracaoManutencao, EventoJornada, Veiculo
+from src.models.tipo_evento import registro_tipos_evento
+from src.paginacao import listar_consulta
 
 integracoes_bp = Blueprint('integracoes', __name__)
 
@@ -105,7 +107,7 @@ def processar_abastecimentos():
                 continue
             
             # Buscar tipo de evento "Abastecimento"
-            tipo_abastecimento = TipoEvento.query.filter_by(nome='Abastecimento').first()
+            tipo_abastecimento = registro_tipos_evento.por_nome('Abastecimento')
             if not tipo_abastecimento:
                 continue
             
@@ -258,7 +260,7 @@ def processar_checklists():
                 continue
             
             # Buscar tipo de evento "Check List"
-            tipo_checklist = TipoEvento.query.filter_by(nome='Check List').first()
+            tipo_checklist = registro_tipos_evento.por_nome('Check List')
             if not tipo_checklist:
                 continue
             
@@ -397,7 +399,7 @@ def processar_manutencoes():
                 continue
             
             # Buscar tipo de evento "Manutenção"
-            tipo_manutencao = TipoEvento.query.filter_by(nome='Manutenção').first()
+            tipo_manutencao = registro_tipos_evento.por_nome('Manutenção')
             if not tipo_manutencao:
                 continue
             
@@ -456,7 +458,7 @@ def _correlacionar_abastecimento(abastecimento):
     inicio = abastecimento.data_hora - timedelta(minutes=30)
     fim = abastecimento.data_hora + timedelta(minutes=30)
     
-    tipo_abastecimento = TipoEvento.query.filter_by(nome='Abastecimento').first()
+    tipo_abastecimento = registro_tipos_evento.por_nome('Abastecimento')
     if not tipo_abastecimento:
         return False
     
@@ -484,7 +486,7 @@ def _correlacionar_checklist(checklist):
     inicio = checklist.data_hora - timedelta(minutes=15)
     fim = checklist.data_hora + timedelta(minutes=15)
     
-    tipo_checklist = TipoEvento.query.filter_by(nome='Check List').first()
+    tipo_checklist = registro_tipos_evento.por_nome('Check List')
     if not tipo_checklist:
         return False
     
@@ -513,7 +515,7 @@ def _correlacionar_manutencao(manutencao):
     inicio = manutencao.data_hora - timedelta(minutes=60)
     fim = manutencao.data_hora + timedelta(minutes=60)
     
-    tipo_manutencao = TipoEvento.query.filter_by(nome='Manutenção').first()
+    tipo_manutencao = registro_tipos_evento.por_nome('Manutenção')
     if not tipo_manutencao:
         return False
     
@@ -539,7 +541,7 @@ def _correlacionar_manutencao(manutencao):
 
 @integracoes_bp.route('/abastecimento/listar', methods=['GET'])
 def listar_abastecimentos():
-    """Lista abastecimentos com filtros"""
+    """Lista abastecimentos com filtros, do mais recente, paginados por cursor (limite, cursor, exportar)"""
     try:
         veiculo_id = request.args.get('veiculo_id', type=int)
         processado = request.args.get('processado')
@@ -563,19 +565,14 @@ def listar_abastecimentos():
             data_fim = datetime.fromisoformat(data_fim)
             query = query.filter(IntegracaoAbastecimento.data_hora <= data_fim)
         
-        abastecimentos = query.order_by(IntegracaoAbastecimento.data_hora.desc()).all()
-        
-        return jsonify({
-            'abastecimentos': [abast.to_dict() for abast in abastecimentos],
-            'total': len(abastecimentos)
-        })
+        return listar_consulta('abastecimentos', query, (IntegracaoAbastecimento.data_hora, IntegracaoAbastecimento.id))
         
     except Exception as e:
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
 
 @integracoes_bp.route('/checklist/listar', methods=['GET'])
 def listar_checklists():
-    """Lista checklists com filtros"""
+    """Lista checklists com filtros, do mais recente, paginados por cursor (limite, cursor, exportar)"""
     try:
         veiculo_id = request.args.get('veiculo_id', type=int)
         motorista_id = request.args.get('motorista_id', type=int)
@@ -593,19 +590,14 @@ def listar_checklists():
             processado = processado.lower() == 'true'
             query = query.filter(IntegracaoChecklist.processado == processado)
         
-        checklists = query.order_by(IntegracaoChecklist.data_hora.desc()).all()
-        
-        return jsonify({
-            'checklists': [check.to_dict() for check in checklists],
-            'total': len(checklists)
-        })
+        return listar_consulta('checklists', query, (IntegracaoChecklist.data_hora, IntegracaoChecklist.id))
         
     except Exception as e:
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
 
 @integracoes_bp.route('/manutencao/listar', methods=['GET'])
 def listar_manutencoes():
-    """Lista manutenções com filtros"""
+    """Lista manutenções com filtros, do mais recente, paginados por cursor (limite, cursor, exportar)"""
     try:
         veiculo_id = request.args.get('veiculo_id', type=int)
         processado = request.args.get('processado')
@@ -623,12 +615,7 @@ def listar_manutencoes():
         if tipo:
             query = query.filter(IntegracaoManutencao.tipo_manutencao == tipo)
         
-        manutencoes = query.order_by(IntegracaoManutencao.data_hora.desc()).all()
-        
-        return jsonify({
-            'manutencoes': [manut.to_dict() for manut in manutencoes],
-            'total': len(manutencoes)
-        })
+        return listar_consulta('manutencoes', query, (IntegracaoManutencao.data_hora, IntegracaoManutencao.id))
         
     except Exception as e:
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
@@ -1,11 +1,26 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from datetime import datetime, timedelta
-from src.models import db, PosicaoRastreador, Veiculo
+from src.models import db, PeriodoAberto, PosicaoRastreador, Veiculo
 from src.classificador_eventos import classificar_eventos_automaticamente, AnalisadorPadroes
+from src.previa_classificacao import previa_classificacao
+from src.fila_tarefas import fila_tarefas
+from src.classificacao_frota import classificar_frota
+from src.arquivo_posicoes import (
+    arquivar_posicoes, consultar_arquivo, mesclar_posicoes, posicoes_arquivadas, resumo_arquivo
+)
+from src.ingestao_posicoes import (
+    CONTADORES_IMPORTACAO, ImportadorPosicoes, importar_posicoes_em_lote, importar_posicoes_frota_em_lote,
+    ler_posicoes_ndjson, ler_posicoes_csv, em_lotes
+)
+from src.paginacao import decodificar_cursor, fechar_pagina, listar_paginado, ordenar_apos
+from src.resumo_posicoes import acumular_periodo
 import json
 
 posicoes_bp = Blueprint('posicoes', __name__)
 
+# Ordenação da listagem de posições (cursor)
+ORDEM_POSICOES = (PosicaoRastreador.data_hora, PosicaoRastreador.id)
+
 @posicoes_bp.route('/importar', methods=['POST'])
 def importar_posicoes():
     """
@@ -28,8 +43,13 @@ def importar_posicoes():
                 "bateria": 29
             }
         ],
-        "classificar_automaticamente": true
+        "classificar_automaticamente": true,
+        "compactar_paradas": false,
+        "assincrono": false
     }
+    Com "compactar_paradas": true, pontos parados consecutivos no mesmo local são gravados em uma linha
+    (padrão: SIGX_COMPACTAR_PARADAS)
+    Com "assincrono": true, retorna 202 com o id da tarefa (consultar em /api/jobs/<id>)
     """
     try:
         data = request.get_json()
@@ -42,46 +62,19 @@ def importar_posicoes():
         if not veiculo:
             return jsonify({'erro': f'Veículo com placa {data["veiculo_placa"]} não encontrado'}), 404
         
-        posicoes_importadas = 0
-        posicoes_duplicadas = 0
+        if data.get('assincrono', False):
+            parametros = {chave: valor for chave, valor in data.items() if chave != 'assincrono'}
+            tarefa = fila_tarefas.enfileirar('importacao', parametros)
+            return jsonify({
+                'sucesso': True,
+                'tarefa': tarefa.to_dict(),
+                'status_url': f'/api/jobs/{tarefa.id}'
+            }), 202
         
-        for posicao_data in data['posicoes']:
-            try:
-                # Converter string de data para datetime
-                data_hora = datetime.fromisoformat(posicao_data['data_hora'].replace('Z', '+00:00'))
-                
-                # Verificar se a posição já existe
-                posicao_existente = PosicaoRastreador.query.filter_by(
-                    veiculo_id=veiculo.id,
-                    data_hora=data_hora
-                ).first()
-                
-                if posicao_existente:
-                    posicoes_duplicadas += 1
-                    continue
-                
-                # Criar nova posição
-                nova_posicao = PosicaoRastreador(
-                    veiculo_id=veiculo.id,
-                    data_hora=data_hora,
-                    latitude=posicao_data.get('latitude'),
-                    longitude=posicao_data.get('longitude'),
-                    velocidade=posicao_data.get('velocidade', 0),
-                    endereco=posicao_data.get('endereco'),
-                    ponto_referencia=posicao_data.get('ponto_referencia'),
-                    km_aproximado=posicao_data.get('km_aproximado'),
-                    tempo_parado=posicao_data.get('tempo_parado', 0),
-                    tipo_mensagem=posicao_data.get('tipo_mensagem'),
-                    modo_emergencia=posicao_data.get('modo_emergencia', False),
-                    bateria=posicao_data.get('bateria')
-                )
-                
-                db.session.add(nova_posicao)
-                posicoes_importadas += 1
-                
-            except Exception as e:
-                print(f"Erro ao processar posição: {e}")
-                continue
+        # Deduplicação e inserção em lote (uma consulta e um executemany)
+        contadores = importar_posicoes_em_lote(veiculo.id, data['posicoes'], data.get('compactar_paradas'))
+        posicoes_importadas = contadores['posicoes_importadas']
+        posicoes_duplicadas = contadores['posicoes_duplicadas']
         
         db.session.commit()
         
@@ -89,6 +82,7 @@ def importar_posicoes():
             'sucesso': True,
             'posicoes_importadas': posicoes_importadas,
             'posicoes_duplicadas': posicoes_duplicadas,
+            'posicoes_compactadas': contadores['posicoes_compactadas'],
             'veiculo': veiculo.to_dict()
         }
         
@@ -107,15 +101,139 @@ def importar_posicoes():
         db.session.rollback()
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
 
+@posicoes_bp.route('/importar-frota', methods=['POST'])
+def importar_posicoes_frota():
+    """
+    Importa posições de vários veículos em uma única requisição
+    Formato esperado:
+    {
+        "posicoes": [
+            {
+                "veiculo_placa": "QXT1F69",
+                "data_hora": "2025-06-21T11:56:00",
+                "latitude": -20.3911,
+                "longitude": -45.5418,
+                "velocidade": 0,
+                ...
+            }
+        ],
+        "classificar_automaticamente": true,
+        "compactar_paradas": false
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or 'posicoes' not in data:
+            return jsonify({'erro': 'Dados inválidos. Necessário posicoes (cada uma com veiculo_placa)'}), 400
+        
+        resultado = importar_posicoes_frota_em_lote(data['posicoes'], data.get('compactar_paradas'))
+        db.session.commit()
+        
+        resultado['sucesso'] = True
+        
+        # Classificar automaticamente cada veículo que recebeu posições novas
+        if data.get('classificar_automaticamente', False):
+            resultado['eventos_classificados'] = 0
+            for placa, contadores in resultado['veiculos'].items():
+                if contadores['posicoes_importadas'] == 0:
+                    continue
+                try:
+                    eventos_classificados = classificar_eventos_automaticamente(contadores['veiculo_id'])
+                    contadores['eventos_classificados'] = len(eventos_classificados)
+                    resultado['eventos_classificados'] += len(eventos_classificados)
+                except Exception as e:
+                    db.session.rollback()
+                    contadores['erro_classificacao'] = f"Erro na classificação automática: {str(e)}"
+        
+        return jsonify(resultado)
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@posicoes_bp.route('/importar-stream', methods=['POST'])
+def importar_posicoes_stream():
+    """
+    Importa posições do rastreador lendo o corpo da requisição em fluxo
+    Parâmetros (query string):
+        veiculo_placa: placa do veículo (obrigatório)
+        formato: 'ndjson' ou 'csv' (padrão: deduzido do Content-Type, senão ndjson)
+        tamanho_lote: posições por commit (padrão: 1000, máximo: 10000)
+        classificar_automaticamente: 'true' para classificar ao final
+        compactar_paradas: 'true' ou 'false' (padrão: SIGX_COMPACTAR_PARADAS)
+    Corpo NDJSON: um objeto por linha, com os mesmos campos de exemplo_posicoes.json
+    Corpo CSV: cabeçalho com os nomes dos campos (data_hora, latitude, longitude, ...)
+    Resposta: NDJSON com uma linha de progresso por lote e uma linha final de resumo
+    """
+    try:
+        placa = request.args.get('veiculo_placa')
+        if not placa:
+            return jsonify({'erro': 'Dados inválidos. Necessário veiculo_placa'}), 400
+        
+        veiculo = Veiculo.query.filter_by(placa=placa).first()
+        if not veiculo:
+            return jsonify({'erro': f'Veículo com placa {placa} não encontrado'}), 404
+        
+        formato = request.args.get('formato')
+        if not formato:
+            formato = 'csv' if 'csv' in (request.content_type or '') else 'ndjson'
+        if formato not in ('ndjson', 'csv'):
+            return jsonify({'erro': 'Formato inválido. Use ndjson ou csv'}), 400
+        
+        tamanho_lote = min(max(request.args.get('tamanho_lote', type=int, default=1000), 1), 10000)
+        classificar = request.args.get('classificar_automaticamente', 'false').lower() == 'true'
+        compactar = request.args.get('compactar_paradas')
+        if compactar is not None:
+            compactar = compactar.lower() == 'true'
+        veiculo_id = veiculo.id
+        
+    except Exception as e:
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+    
+    def gerar_progresso():
+        leitor = ler_posicoes_csv if formato == 'csv' else ler_posicoes_ndjson
+        importador = ImportadorPosicoes(veiculo_id, compactar)
+        totais = dict.fromkeys(CONTADORES_IMPORTACAO, 0)
+        lotes_confirmados = 0
+        
+        try:
+            # Apenas um lote fica em memória por vez; cada lote é confirmado antes de ler o próximo
+            for lote in em_lotes(leitor(request.stream), tamanho_lote):
+                contadores = importador.importar(lote)
+                db.session.commit()
+                lotes_confirmados += 1
+                
+                for chave in totais:
+                    totais[chave] += contadores[chave]
+                
+                yield json.dumps({'lote': lotes_confirmados, 'linhas': len(lote), **contadores, 'acumulado': totais}) + '\n'
+            
+            resumo = {'sucesso': True, 'lotes': lotes_confirmados, **totais}
+            
+            if classificar and totais['posicoes_importadas'] > 0:
+                try:
+                    eventos_classificados = classificar_eventos_automaticamente(veiculo_id)
+                    resumo['eventos_classificados'] = len(eventos_classificados)
+                except Exception as e:
+                    resumo['erro_classificacao'] = f"Erro na classificação automática: {str(e)}"
+            
+            yield json.dumps(resumo) + '\n'
+            
+        except Exception as e:
+            db.session.rollback()
+            yield json.dumps({'erro': f'Erro interno: {str(e)}', 'lotes_confirmados': lotes_confirmados, **totais}) + '\n'
+    
+    return Response(stream_with_context(gerar_progresso()), mimetype='application/x-ndjson')
+
 @posicoes_bp.route('/veiculo/<int:veiculo_id>', methods=['GET'])
 def listar_posicoes_veiculo(veiculo_id):
-    """Lista posições de um veículo específico"""
+    """Lista posições de um veículo específico, da mais recente, paginadas por cursor (limite, cursor, exportar)"""
     try:
         # Parâmetros de filtro
         data_inicio = request.args.get('data_inicio')
         data_fim = request.args.get('data_fim')
         processado = request.args.get('processado')
-        limite = request.args.get('limite', type=int, default=1000)
         
         query = PosicaoRastreador.query.filter_by(veiculo_id=veiculo_id)
         
@@ -132,24 +250,58 @@ def listar_posicoes_veiculo(veiculo_id):
             processado = processado.lower() == 'true'
             query = query.filter(PosicaoRastreador.processado == processado)
         
-        posicoes = query.order_by(PosicaoRastreador.data_hora.desc()).limit(limite).all()
+        # Intervalo que alcança posições arquivadas
+        arquivo = consultar_arquivo(data_inicio or None, processado)
         
-        return jsonify({
-            'posicoes': [posicao.to_dict() for posicao in posicoes],
-            'total': len(posicoes)
-        })
+        def buscar_pagina(limite, cursor):
+            valores = decodificar_cursor(cursor, ORDEM_POSICOES) if cursor else None
+            posicoes = ordenar_apos(query, ORDEM_POSICOES, valores).limit(limite + 1).all()
+            if arquivo:
+                # data_hora é única por veículo: a página continua antes do horário do cursor
+                fim = data_fim or None
+                if valores:
+                    fim = min(fim or valores[0], valores[0] - timedelta(microseconds=1))
+                arquivadas = posicoes_arquivadas(veiculo_id, data_inicio or None, fim,
+                                                 decrescente=True, limite=limite + 1)
+                posicoes = mesclar_posicoes(posicoes, arquivadas, decrescente=True)
+            return fechar_pagina(posicoes, ORDEM_POSICOES, limite)
+        
+        return listar_paginado('posicoes', buscar_pagina)
         
     except Exception as e:
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
 
 @posicoes_bp.route('/classificar/<int:veiculo_id>', methods=['POST'])
 def classificar_posicoes(veiculo_id):
-    """Classifica posições não processadas de um veículo usando IA"""
+    """
+    Classifica posições não processadas de um veículo usando IA
+    O último período (parada ou movimento) fica aberto e continua na próxima classificação;
+    com "finalizar": true, ele também vira evento.
+    Com "previa": true, classifica [data_inicio, data_fim] (obrigatórios) sem gravar nada, inclusive
+    posições já processadas, e responde em NDJSON: um evento previsto por linha, com a situação em
+    relação aos eventos existentes (igual, alterado, novo ou removido), e uma linha final de resumo
+    """
     try:
         data = request.get_json() or {}
         data_inicio = data.get('data_inicio')
         data_fim = data.get('data_fim')
         
+        if data.get('previa', False):
+            return _previa_classificacao(veiculo_id, data_inicio, data_fim)
+        
+        if data.get('assincrono', False):
+            tarefa = fila_tarefas.enfileirar('classificacao', {
+                'veiculo_id': veiculo_id,
+                'data_inicio': data_inicio,
+                'data_fim': data_fim,
+                'finalizar': data.get('finalizar', False)
+            })
+            return jsonify({
+                'sucesso': True,
+                'tarefa': tarefa.to_dict(),
+                'status_url': f'/api/jobs/{tarefa.id}'
+            }), 202
+        
         # Converter datas se fornecidas
         if data_inicio:
             data_inicio = datetime.fromisoformat(data_inicio)
@@ -158,19 +310,136 @@ def classificar_posicoes(veiculo_id):
         
         # Executar classificação automática
         eventos_classificados = classificar_eventos_automaticamente(
-            veiculo_id, data_inicio, data_fim
+            veiculo_id, data_inicio, data_fim, data.get('finalizar', False)
         )
+        periodo_aberto = db.session.get(PeriodoAberto, veiculo_id)
         
         return jsonify({
             'sucesso': True,
             'eventos_classificados': len(eventos_classificados),
-            'eventos': eventos_classificados
+            'eventos': eventos_classificados,
+            'periodo_aberto': periodo_aberto.to_dict() if periodo_aberto else None
         })
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
 
+def _previa_classificacao(veiculo_id, data_inicio, data_fim):
+    """Resposta em fluxo (NDJSON) da prévia da classificação"""
+    if not data_inicio or not data_fim:
+        return jsonify({'erro': 'Na prévia, informe data_inicio e data_fim'}), 400
+    
+    veiculo = db.session.get(Veiculo, veiculo_id)
+    if not veiculo:
+        return jsonify({'erro': 'Veículo não encontrado'}), 404
+    if not veiculo.motorista_id:
+        return jsonify({'erro': 'Veículo sem motorista associado'}), 400
+    
+    data_inicio = datetime.fromisoformat(data_inicio)
+    data_fim = datetime.fromisoformat(data_fim)
+    
+    def gerar_linhas():
+        try:
+            for linha in previa_classificacao(veiculo_id, data_inicio, data_fim):
+                yield json.dumps(linha) + '\n'
+        except Exception as e:
+            yield json.dumps({'erro': f'Erro interno: {str(e)}'}) + '\n'
+    
+    return Response(stream_with_context(gerar_linhas()), mimetype='application/x-ndjson')
+
+@posicoes_bp.route('/classificar-frota', methods=['POST'])
+def classificar_posicoes_frota():
+    """
+    Classifica todos os veículos com posições pendentes em um pool de processos
+    Formato esperado (todos opcionais):
+    {
+        "processos": 4,
+        "finalizar": false,
+        "data_inicio": "2025-06-21T00:00:00",
+        "data_fim": "2025-06-21T23:59:59",
+        "assincrono": false
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        processos = data.get('processos')
+        data_inicio = data.get('data_inicio')
+        data_fim = data.get('data_fim')
+        finalizar = data.get('finalizar', False)
+        
+        if processos is not None and (not isinstance(processos, int) or processos < 1):
+            return jsonify({'erro': 'processos deve ser um inteiro maior que zero'}), 400
+        
+        if data.get('assincrono', False):
+            tarefa = fila_tarefas.enfileirar('classificacao_frota', {
+                'processos': processos,
+                'data_inicio': data_inicio,
+                'data_fim': data_fim,
+                'finalizar': finalizar
+            })
+            return jsonify({
+                'sucesso': True,
+                'tarefa': tarefa.to_dict(),
+                'status_url': f'/api/jobs/{tarefa.id}'
+            }), 202
+        
+        resultado = classificar_frota(
+            processos,
+            datetime.fromisoformat(data_inicio) if data_inicio else None,
+            datetime.fromisoformat(data_fim) if data_fim else None,
+            finalizar
+        )
+        
+        return jsonify({'sucesso': True, **resultado})
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@posicoes_bp.route('/periodo-aberto/<int:veiculo_id>', methods=['GET'])
+def obter_periodo_aberto(veiculo_id):
+    """Retorna o período ainda sem evento do veículo (continuado pela próxima classificação)"""
+    try:
+        periodo_aberto = db.session.get(PeriodoAberto, veiculo_id)
+        return jsonify({'veiculo_id': veiculo_id, 'periodo_aberto': periodo_aberto.to_dict() if periodo_aberto else None})
+    except Exception as e:
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@posicoes_bp.route('/arquivar', methods=['POST'])
+def arquivar_posicoes_antigas():
+    """Move posições processadas antigas para as partições mensais do arquivo"""
+    try:
+        data = request.get_json(silent=True) or {}
+        dias = data.get('dias')
+        
+        if data.get('assincrono', False):
+            tarefa = fila_tarefas.enfileirar('arquivamento', {'dias': dias})
+            return jsonify({
+                'sucesso': True,
+                'tarefa': tarefa.to_dict(),
+                'status_url': f'/api/jobs/{tarefa.id}'
+            }), 202
+        
+        resultado = arquivar_posicoes(int(dias) if dias is not None else None)
+        
+        return jsonify({'sucesso': True, **resultado})
+        
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@posicoes_bp.route('/arquivo', methods=['GET'])
+def situacao_arquivo():
+    """Retorna a data de corte e as partições do arquivo de posições"""
+    try:
+        return jsonify(resumo_arquivo())
+    except Exception as e:
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
 @posicoes_bp.route('/analisar-padroes/<int:motorista_id>', methods=['GET'])
 def analisar_padroes_motorista(motorista_id):
     """Analisa padrões históricos de um motorista"""
@@ -215,79 +484,26 @@ def sugestoes_melhoria_classificacao(veiculo_id):
 
 @posicoes_bp.route('/estatisticas/<int:veiculo_id>', methods=['GET'])
 def estatisticas_posicoes(veiculo_id):
-    """Retorna estatísticas das posições de um veículo"""
+    """
+    Retorna estatísticas das posições de um veículo
+    Os dias inteiros do período vêm dos resumos diários; só as pontas são lidas das posições
+    """
     try:
         data_inicio = request.args.get('data_inicio')
         data_fim = request.args.get('data_fim')
         
-        query = PosicaoRastreador.query.filter_by(veiculo_id=veiculo_id)
-        
         if data_inicio:
             data_inicio = datetime.fromisoformat(data_inicio)
-            query = query.filter(PosicaoRastreador.data_hora >= data_inicio)
         
         if data_fim:
             data_fim = datetime.fromisoformat(data_fim)
-            query = query.filter(PosicaoRastreador.data_hora <= data_fim)
         
-        posicoes = query.order_by(PosicaoRastreador.data_hora).all()
+        acumulador = acumular_periodo(veiculo_id, data_inicio or None, data_fim or None)
         
-        if not posicoes:
+        if not acumulador.total_pontos:
             return jsonify({'erro': 'Nenhuma posição encontrada'}), 404
         
-        # Calcular estatísticas
-        total_posicoes = len(posicoes)
-        posicoes_processadas = sum(1 for p in posicoes if p.processado)
-        posicoes_parado = sum(1 for p in posicoes if p.velocidade <= 5)
-        posicoes_movimento = total_posicoes - posicoes_parado
-        
-        # Calcular distância total (aproximada)
-        distancia_total = 0
-        tempo_movimento = 0
-        tempo_parado = 0
-        
-        for i in range(1, len(posicoes)):
-            # Distância
-            if posicoes[i].latitude and posicoes[i].longitude and posicoes[i-1].latitude and posicoes[i-1].longitude:
-                distancia = PosicaoRastreador.calcular_distancia(
-                    posicoes[i-1].latitude, posicoes[i-1].longitude,
-                    posicoes[i].latitude, posicoes[i].longitude
-                )
-                distancia_total += distancia
-            
-            # Tempo
-            delta_tempo = (posicoes[i].data_hora - posicoes[i-1].data_hora).total_seconds() / 60
-            if posicoes[i].velocidade > 5:
-                tempo_movimento += delta_tempo
-            else:
-                tempo_parado += delta_tempo
-        
-        # Velocidade média (apenas em movimento)
-        velocidade_media = 0
-        if tempo_movimento > 0:
-            velocidade_media = (distancia_total / 1000) / (tempo_movimento / 60)
-        
-        return jsonify({
-            'veiculo_id': veiculo_id,
-            'periodo': {
-                'inicio': posicoes[0].data_hora.isoformat(),
-                'fim': posicoes[-1].data_hora.isoformat(),
-                'duracao_horas': round((posicoes[-1].data_hora - posicoes[0].data_hora).total_seconds() / 3600, 2)
-            },
-            'estatisticas': {
-                'total_posicoes': total_posicoes,
-                'posicoes_processadas': posicoes_processadas,
-                'posicoes_pendentes': total_posicoes - posicoes_processadas,
-                'posicoes_parado': posicoes_parado,
-                'posicoes_movimento': posicoes_movimento,
-                'distancia_total_km': round(distancia_total / 1000, 2),
-                'tempo_movimento_horas': round(tempo_movimento / 60, 2),
-                'tempo_parado_horas': round(tempo_parado / 60, 2),
-                'velocidade_media_kmh': round(velocidade_media, 2),
-                'percentual_parado': round((posicoes_parado / total_posicoes) * 100, 2),
-                'percentual_movimento': round((posicoes_movimento / total_posicoes) * 100, 2)
-            }
-        })
+        return jsonify({'veiculo_id': veiculo_id, **acumulador.estatisticas()})
         
     except Exception as e:
         return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
@@ -0,0 +1,38 @@
+from flask import Blueprint, request, jsonify
+from src.models import Tarefa
+from src.paginacao import listar_consulta
+
+tarefas_bp = Blueprint('tarefas', __name__)
+
+@tarefas_bp.route('/<tarefa_id>', methods=['GET'])
+def obter_tarefa(tarefa_id):
+    """Obtém o estado, os contadores e o erro de uma tarefa assíncrona"""
+    try:
+        tarefa = Tarefa.query.get(tarefa_id)
+        if not tarefa:
+            return jsonify({'erro': 'Tarefa não encontrada'}), 404
+        
+        return jsonify(tarefa.to_dict())
+        
+    except Exception as e:
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
+
+@tarefas_bp.route('/listar', methods=['GET'])
+def listar_tarefas():
+    """Lista as tarefas mais recentes com filtros opcionais, paginadas por cursor (limite, cursor)"""
+    try:
+        estado = request.args.get('estado')
+        tipo = request.args.get('tipo')
+        
+        query = Tarefa.query
+        
+        if estado:
+            query = query.filter(Tarefa.estado == estado)
+        
+        if tipo:
+            query = query.filter(Tarefa.tipo == tipo)
+        
+        return listar_consulta('tarefas', query, (Tarefa.created_at, Tarefa.id), limite_padrao=100)
+        
+    except Exception as e:
+        return jsonify({'erro': f'Erro interno: {str(e)}'}), 500
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from src.models import db, Veiculo, Motorista
+from src.ingestao_posicoes import resolvedor_placas
 
 veiculos_bp = Blueprint('veiculos', __name__)
 
@@ -82,7 +83,8 @@ def atualizar_veiculo(veiculo_id):
         data = request.get_json()
         
         # Verificar se nova placa já existe (se foi alterada)
-        if 'placa' in data and data['placa'] != veiculo.placa:
+        placa_alterada = 'placa' in data and data['placa'] != veiculo.placa
+        if placa_alterada:
             veiculo_existente = Veiculo.query.filter_by(placa=data['placa']).first()
             if veiculo_existente:
                 return jsonify({'erro': 'Veículo com esta placa já existe'}), 400
@@ -95,6 +97,10 @@ def atualizar_veiculo(veiculo_id):
         
         db.session.commit()
         
+        # A placa antiga não pode continuar resolvendo para este veículo
+        if placa_alterada:
+            resolvedor_placas.invalidar()
+        
         return jsonify({
             'sucesso': True,
             'veiculo': veiculo.to_dict()
@@ -0,0 +1,325 @@
+"""
+Módulo de Segmentação Vetorizada
+Divide as posições de um veículo em períodos de parada e movimento com NumPy: as colunas
+vêm de um SELECT leve (sem objetos ORM), os limites dos períodos saem de diferenças
+vetorizadas e as distâncias (Haversine) são calculadas de uma vez para todas as posições.
+Produz os mesmos períodos de ClassificadorEventos._identificar_periodos.
+
+Com SIGX_DETECCAO_PARADAS=agrupamento, posições acima de 5 km/h que caem perto de uma parada
+(grade espacial dos seus pontos parados) e logo após o último ponto dela são tratadas como ruído
+de velocidade do GPS e continuam a parada, em vez de parti-la em vários períodos curtos.
+"""
+
+import json
+import math
+import os
+from sqlalchemy import select
+from src.models import db, PosicaoRastreador
+from src.models.periodo_aberto import PontoPeriodo
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy é opcional: sem ele, o classificador segmenta os objetos em Python
+    np = None
+
+# 'numpy' (padrão quando instalado) ou 'python'
+MOTOR_SEGMENTACAO = os.environ.get('SIGX_MOTOR_SEGMENTACAO', 'numpy' if np is not None else 'python').lower()
+if MOTOR_SEGMENTACAO not in ('numpy', 'python'):
+    raise ValueError(f"SIGX_MOTOR_SEGMENTACAO inválido: {MOTOR_SEGMENTACAO} (use 'numpy' ou 'python')")
+if MOTOR_SEGMENTACAO == 'numpy' and np is None:
+    raise ValueError("SIGX_MOTOR_SEGMENTACAO=numpy requer o pacote numpy (pip install numpy)")
+
+# Mesmo critério de ClassificadorEventos._identificar_periodos: movimento acima de 5 km/h
+VELOCIDADE_MOVIMENTO = 5
+RAIO_TERRA_M = 6371000
+
+# Detecção de paradas: 'velocidade' (cada posição pela sua velocidade) ou 'agrupamento'
+# (ruído de velocidade perto da parada, dentro do raio e do intervalo, continua a parada)
+DETECCAO_PARADAS = os.environ.get('SIGX_DETECCAO_PARADAS', 'velocidade').lower()
+if DETECCAO_PARADAS not in ('velocidade', 'agrupamento'):
+    raise ValueError(f"SIGX_DETECCAO_PARADAS inválido: {DETECCAO_PARADAS} (use 'velocidade' ou 'agrupamento')")
+RAIO_PARADA_M = float(os.environ.get('SIGX_RAIO_PARADA_M', 50))
+INTERVALO_PARADA_S = int(os.environ.get('SIGX_INTERVALO_PARADA_S', 300))
+
+# Colunas numéricas de todas as posições (sem datas nem textos, que só os limites dos períodos usam)
+COLUNAS_SEGMENTACAO = (
+    PosicaoRastreador.id,
+    PosicaoRastreador.velocidade,
+    PosicaoRastreador.latitude,
+    PosicaoRastreador.longitude,
+    PosicaoRastreador.data_hora_fim.isnot(None),
+    PosicaoRastreador.latitude_fim,
+    PosicaoRastreador.longitude_fim,
+    PosicaoRastreador.distancia_interna_m,
+    PosicaoRastreador.quantidade_pontos
+)
+
+# Colunas das posições que iniciam ou terminam um período
+COLUNAS_LIMITES = (
+    PosicaoRastreador.id,
+    PosicaoRastreador.data_hora,
+    PosicaoRastreador.latitude,
+    PosicaoRastreador.longitude,
+    PosicaoRastreador.data_hora_fim,
+    PosicaoRastreador.latitude_fim,
+    PosicaoRastreador.longitude_fim,
+    PosicaoRastreador.endereco_id,
+    PosicaoRastreador.ponto_referencia_id,
+    PosicaoRastreador.endereco_texto.label('endereco_texto'),
+    PosicaoRastreador.ponto_referencia_texto.label('ponto_referencia_texto')
+)
+
+# Ids por cláusula IN ao buscar os limites dos períodos
+TAMANHO_LOTE_IDS = 500
+
+
+def _coluna(valores):
+    """Coluna numérica com 0 no lugar de nulos (calcular_distancia também ignora coordenadas nulas ou zero)"""
+    return np.nan_to_num(np.array(valores, dtype=float), nan=0.0)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Distâncias em metros entre arrays de coordenadas; 0 onde alguma coordenada é zero"""
+    validos = (lat1 != 0) & (lon1 != 0) & (lat2 != 0) & (lon2 != 0)
+    lat1, lon1, lat2, lon2 = np.radians(lat1), np.radians(lon1), np.radians(lat2), np.radians(lon2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    distancias = 2 * np.arcsin(np.sqrt(a)) * RAIO_TERRA_M
+    return np.where(validos, distancias, 0.0)
+
+
+class GradeParada:
+    """
+    Células (linha, coluna) ocupadas pelos pontos parados de uma parada, em uma grade de lado
+    RAIO_PARADA_M (em graus de latitude). Um ponto está perto da parada se a sua célula ou uma
+    vizinha estiver ocupada: custo constante por ponto, sem comparar distâncias par a par.
+    Tudo até RAIO_PARADA_M × cos(latitude) de um ponto parado está perto; nada além de ~2,8 raios.
+    """
+    __slots__ = ('celulas',)
+
+    TAMANHO_CELULA = RAIO_PARADA_M / 111320
+
+    def __init__(self, celulas=()):
+        self.celulas = set(map(tuple, celulas))
+
+    @classmethod
+    def celula(cls, latitude, longitude):
+        return math.floor(latitude / cls.TAMANHO_CELULA), math.floor(longitude / cls.TAMANHO_CELULA)
+
+    def adicionar(self, latitude, longitude):
+        if latitude and longitude:
+            self.celulas.add(self.celula(latitude, longitude))
+
+    def perto(self, latitude, longitude):
+        if not (latitude and longitude and self.celulas):
+            return False
+        return self.perto_celula(*self.celula(latitude, longitude))
+
+    def perto_celula(self, linha, coluna):
+        celulas = self.celulas
+        return any(
+            (linha + delta_linha, coluna + delta_coluna) in celulas
+            for delta_linha in (-1, 0, 1) for delta_coluna in (-1, 0, 1)
+        )
+
+    def serializar(self):
+        return json.dumps(sorted(self.celulas))
+
+    @classmethod
+    def carregar(cls, texto):
+        return cls(json.loads(texto) if texto else ())
+
+
+def _celulas(latitude, longitude):
+    """Linhas e colunas da grade de paradas (mesmo arredondamento de GradeParada.celula)"""
+    return (np.floor(latitude / GradeParada.TAMANHO_CELULA).astype(np.int64),
+            np.floor(longitude / GradeParada.TAMANHO_CELULA).astype(np.int64))
+
+
+def _agrupar_paradas(movimento, latitude, longitude, latitude_final, longitude_final,
+                     data_hora, data_hora_final, grade=None, fim_anterior=None):
+    """
+    Aplica a detecção por agrupamento sobre os estados por velocidade: em cada sequência de
+    movimento logo após uma parada, as posições perto da parada e dentro do intervalo desde o
+    ponto anterior continuam a parada. grade/fim_anterior: da parada aberta (periodo_atual).
+    Retorna (estados ajustados, grade da última parada ou None).
+    """
+    movimento = movimento.copy()
+    linhas, colunas = _celulas(latitude, longitude)
+    linhas_finais, colunas_finais = _celulas(latitude_final, longitude_final)
+    validos = (latitude != 0) & (longitude != 0)
+    validos_finais = (latitude_final != 0) & (longitude_final != 0)
+
+    inicios = np.flatnonzero(np.concatenate(([True], movimento[1:] != movimento[:-1])))
+    fins = np.concatenate((inicios[1:] - 1, [len(movimento) - 1]))
+    for inicio, fim in zip(inicios.tolist(), fins.tolist()):
+        if not movimento[inicio]:
+            # Pontos parados (o primeiro e o último das linhas compactadas) ocupam as células da parada
+            if grade is None:
+                grade = GradeParada()
+            trecho = slice(inicio, fim + 1)
+            selecionados = validos[trecho]
+            grade.celulas.update(zip(linhas[trecho][selecionados].tolist(), colunas[trecho][selecionados].tolist()))
+            selecionados = validos_finais[trecho]
+            grade.celulas.update(zip(linhas_finais[trecho][selecionados].tolist(), colunas_finais[trecho][selecionados].tolist()))
+            continue
+
+        if grade is None:
+            continue
+        posicao = inicio
+        while posicao <= fim:
+            anterior = data_hora_final[posicao - 1] if posicao else fim_anterior
+            if not (validos[posicao]
+                    and (data_hora[posicao] - anterior).total_seconds() <= INTERVALO_PARADA_S
+                    and grade.perto_celula(int(linhas[posicao]), int(colunas[posicao]))):
+                break
+            movimento[posicao] = False
+            posicao += 1
+        if posicao <= fim:
+            # A parada terminou: o restante da sequência é movimento
+            grade = None
+
+    return movimento, grade
+
+
+def _ponto_inicio(linha):
+    return PontoPeriodo(linha.data_hora, linha.latitude, linha.longitude, linha.endereco_id,
+                        linha.ponto_referencia_id, linha.endereco_texto, linha.ponto_referencia_texto)
+
+
+def _ponto_fim(linha):
+    """Último ponto da linha (o último ponto absorvido, se a linha for compactada)"""
+    compactada = linha.data_hora_fim is not None
+    return PontoPeriodo(
+        linha.data_hora_fim if compactada else linha.data_hora,
+        linha.latitude_fim if compactada else linha.latitude,
+        linha.longitude_fim if compactada else linha.longitude,
+        linha.endereco_id, linha.ponto_referencia_id, linha.endereco_texto, linha.ponto_referencia_texto
+    )
+
+
+def _linhas_limites(conexao, ids):
+    """Linhas completas das posições de limite, por id"""
+    linhas = {}
+    ids = sorted(set(ids))
+    for inicio in range(0, len(ids), TAMANHO_LOTE_IDS):
+        for linha in conexao.execute(
+            select(*COLUNAS_LIMITES).where(PosicaoRastreador.id.in_(ids[inicio:inicio + TAMANHO_LOTE_IDS]))
+        ):
+            linhas[linha.id] = linha
+    return linhas
+
+
+def segmentar_posicoes(filtros, periodo_atual=None, data_fim_estado=None, deteccao=None):
+    """
+    Lê as posições que atendem aos filtros e retorna (ids lidos, períodos).
+    periodo_atual: período aberto a continuar; posições até data_fim_estado (fora de ordem)
+    entram nos ids, mas não nos períodos. deteccao: 'velocidade' ou 'agrupamento' (DETECCAO_PARADAS).
+    """
+    agrupamento = (deteccao or DETECCAO_PARADAS) == 'agrupamento'
+    colunas = list(COLUNAS_SEGMENTACAO)
+    if data_fim_estado is not None:
+        colunas.append(PosicaoRastreador.data_hora > data_fim_estado)
+    if agrupamento:
+        # Horários, para o intervalo entre uma posição e a anterior
+        colunas += [PosicaoRastreador.data_hora, PosicaoRastreador.data_hora_fim]
+
+    # Conexão da sessão (mesma transação), sem a camada de resultados do ORM
+    conexao = db.session.connection()
+    linhas = conexao.execute(select(*colunas).where(*filtros).order_by(PosicaoRastreador.data_hora)).all()
+    periodos_anteriores = [periodo_atual] if periodo_atual else []
+    if not linhas:
+        return [], periodos_anteriores
+
+    colunas = list(zip(*linhas))
+    ids = list(colunas[0])
+    indices = np.arange(len(linhas))
+    if data_fim_estado is not None:
+        indices = np.flatnonzero(np.array(colunas[9], dtype=bool))
+        if not len(indices):
+            return ids, periodos_anteriores
+
+    velocidade = np.array(colunas[1], dtype=float)[indices]
+    latitude = _coluna(colunas[2])[indices]
+    longitude = _coluna(colunas[3])[indices]
+    compactada = np.array(colunas[4], dtype=bool)[indices]
+    latitude_final = np.where(compactada, _coluna(colunas[5])[indices], latitude)
+    longitude_final = np.where(compactada, _coluna(colunas[6])[indices], longitude)
+    distancia_interna = _coluna(colunas[7])[indices]
+    pontos = np.maximum(_coluna(colunas[8])[indices], 1).astype(np.int64)
+
+    movimento = velocidade > VELOCIDADE_MOVIMENTO
+    grade = None
+    if agrupamento:
+        data_hora = [colunas[-2][indice] for indice in indices.tolist()]
+        data_hora_final = [colunas[-1][indice] or colunas[-2][indice] for indice in indices.tolist()]
+        continua_parada = periodo_atual is not None and periodo_atual['tipo'] == 'parada'
+        movimento, grade = _agrupar_paradas(
+            movimento, latitude, longitude, latitude_final, longitude_final, data_hora, data_hora_final,
+            grade=(periodo_atual.get('grade') or GradeParada()) if continua_parada else None,
+            fim_anterior=periodo_atual['fim'].data_hora_final if continua_parada else None
+        )
+
+    # Limites: início de cada sequência de posições com o mesmo estado (parada/movimento)
+    inicios = np.flatnonzero(np.concatenate(([True], movimento[1:] != movimento[:-1])))
+    fins = np.concatenate((inicios[1:] - 1, [len(indices) - 1]))
+
+    # Distância de cada posição até a anterior (do último ponto da anterior ao primeiro desta),
+    # exceto na primeira posição de cada período, mais a distância interna das compactadas
+    trechos = np.zeros(len(indices))
+    trechos[1:] = haversine(latitude_final[:-1], longitude_final[:-1], latitude[1:], longitude[1:])
+    trechos[inicios] = 0.0
+    distancias = np.add.reduceat(trechos + distancia_interna, inicios)
+    pontos_periodo = np.add.reduceat(pontos, inicios)
+
+    # Somas das coordenadas para o centro do período (compactadas: ponto médio, com peso pelos pontos)
+    com_coordenadas = (latitude != 0) & (longitude != 0) & (latitude_final != 0) & (longitude_final != 0)
+    pesos = np.where(com_coordenadas, pontos, 0)
+    somas_latitude = np.add.reduceat((latitude + latitude_final) / 2 * pesos, inicios)
+    somas_longitude = np.add.reduceat((longitude + longitude_final) / 2 * pesos, inicios)
+    pontos_coordenadas = np.add.reduceat(pesos, inicios)
+
+    ids_selecionados = np.array(ids, dtype=np.int64)[indices]
+    ids_inicio = ids_selecionados[inicios].tolist()
+    ids_fim = ids_selecionados[fins].tolist()
+    limites = _linhas_limites(conexao, ids_inicio + ids_fim)
+
+    periodos = [
+        {
+            'tipo': 'movimento' if em_movimento else 'parada',
+            'inicio': _ponto_inicio(limites[id_inicio]),
+            'fim': _ponto_fim(limites[id_fim]),
+            'distancia_m': distancia,
+            'pontos': quantidade,
+            'soma_latitude': soma_latitude,
+            'soma_longitude': soma_longitude,
+            'pontos_coordenadas': pontos_centro,
+            'grade': None
+        }
+        for em_movimento, id_inicio, id_fim, distancia, quantidade, soma_latitude, soma_longitude, pontos_centro in zip(
+            movimento[inicios].tolist(), ids_inicio, ids_fim, distancias.tolist(), pontos_periodo.tolist(),
+            somas_latitude.tolist(), somas_longitude.tolist(), pontos_coordenadas.tolist()
+        )
+    ]
+
+    # A grade da última parada continua na próxima execução (período aberto)
+    if periodos[-1]['tipo'] == 'parada':
+        periodos[-1]['grade'] = grade
+
+    if periodo_atual:
+        primeiro = periodos[0]
+        if primeiro['tipo'] != periodo_atual['tipo']:
+            return ids, [periodo_atual] + periodos
+
+        # O primeiro período continua o período aberto
+        anterior = periodo_atual['fim']
+        primeira = limites[ids_inicio[0]]
+        primeiro['distancia_m'] = periodo_atual['distancia_m'] + PosicaoRastreador.calcular_distancia(
+            anterior.latitude_final, anterior.longitude_final, primeira.latitude, primeira.longitude
+        ) + primeiro['distancia_m']
+        primeiro['inicio'] = periodo_atual['inicio']
+        primeiro['pontos'] += periodo_atual['pontos']
+        for chave in ('soma_latitude', 'soma_longitude', 'pontos_coordenadas'):
+            primeiro[chave] += periodo_atual[chave]
+
+    return ids, periodos
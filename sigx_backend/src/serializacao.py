@@ -0,0 +1,92 @@
+"""
+Módulo de Serialização
+Serializa listas de eventos de jornada com os campos pedidos (?fields=) e as relações incorporadas
+(?expand=). As relações usadas são carregadas junto com cada página (selectinload: uma consulta por
+relação, não uma por evento), os tipos de evento vêm do registro em memória e cada veículo, motorista
+ou tipo é serializado uma única vez por resposta.
+"""
+
+from datetime import datetime
+from flask import request
+from sqlalchemy.orm import selectinload
+from src.models import EventoJornada, Veiculo
+from src.models.tipo_evento import registro_tipos_evento
+
+RELACOES_EVENTO = ('tipo_evento', 'veiculo', 'motorista')
+CAMPOS_EVENTO = tuple(atributo.key for atributo in EventoJornada.__mapper__.column_attrs)
+# Coordenadas zeradas saem como null (mesmo formato de EventoJornada.to_dict)
+COORDENADAS_EVENTO = ('latitude_inicio', 'longitude_inicio', 'latitude_fim', 'longitude_fim')
+
+
+def _lista_parametro(nome):
+    """Valores separados por vírgula de um parâmetro da query (None se ausente)"""
+    valor = request.args.get(nome)
+    if valor is None:
+        return None
+    return [item.strip() for item in valor.split(',') if item.strip()]
+
+
+class SerializadorEventos:
+    """
+    Serializador de uma resposta: sem fields nem expand, produz o mesmo dicionário de to_dict().
+    fields limita as chaves (relações citadas em fields são incorporadas); expand escolhe as relações.
+    """
+
+    def __init__(self, campos=None, expandir=None):
+        desconhecidos = [
+            item for item in (campos or []) + (expandir or [])
+            if item not in CAMPOS_EVENTO and item not in RELACOES_EVENTO
+        ]
+        if desconhecidos:
+            raise ValueError(
+                f"Campo inválido: {', '.join(desconhecidos)} "
+                f"(use {', '.join(CAMPOS_EVENTO + RELACOES_EVENTO)})"
+            )
+
+        relacoes = set(expandir if expandir is not None else ([] if campos is not None else RELACOES_EVENTO))
+        if campos is not None:
+            relacoes.update(campo for campo in campos if campo in RELACOES_EVENTO)
+        self.campos = tuple(campo for campo in CAMPOS_EVENTO if campos is None or campo in campos)
+        self.expandir = tuple(relacao for relacao in RELACOES_EVENTO if relacao in relacoes)
+        # (relação, id) -> dicionário já serializado nesta resposta
+        self._serializados = {}
+
+    @classmethod
+    def da_requisicao(cls):
+        return cls(_lista_parametro('fields'), _lista_parametro('expand'))
+
+    def opcoes(self):
+        """Opções de carregamento das relações incorporadas (o tipo de evento vem do registro)"""
+        opcoes = []
+        if 'veiculo' in self.expandir:
+            opcoes.append(selectinload(EventoJornada.veiculo).selectinload(Veiculo.motorista))
+        if 'motorista' in self.expandir:
+            opcoes.append(selectinload(EventoJornada.motorista))
+        return opcoes
+
+    def _relacionado(self, relacao, objeto):
+        if objeto is None:
+            return None
+        chave = (relacao, objeto.id)
+        dados = self._serializados.get(chave)
+        if dados is None:
+            dados = self._serializados[chave] = objeto.to_dict()
+        return dados
+
+    def __call__(self, evento):
+        dados = {}
+        for campo in self.campos:
+            valor = getattr(evento, campo)
+            if isinstance(valor, datetime):
+                valor = valor.isoformat()
+            elif campo in COORDENADAS_EVENTO and not valor:
+                valor = None
+            dados[campo] = valor
+
+        for relacao in self.expandir:
+            if relacao == 'tipo_evento':
+                objeto = registro_tipos_evento.por_id(evento.tipo_evento_id)
+            else:
+                objeto = getattr(evento, relacao)
+            dados[relacao] = self._relacionado(relacao, objeto)
+        return dados
@@ -0,0 +1,197 @@
+"""
+Módulo de Trechos entre Posições
+Distância (Haversine) e tempo de cada posição desde a posição anterior do mesmo veículo, do último
+ponto da anterior (compactada: o último ponto absorvido) até o primeiro ponto desta, gravados na
+importação em distancia_anterior_m e segundos_anterior. A distância de um intervalo passa a ser uma
+soma dessas colunas (mais a distância interna das linhas compactadas), sem ler as posições vizinhas.
+
+Um lote que vem depois da última posição do veículo tem os trechos calculados antes do INSERT; uma
+inserção fora de ordem ou uma parada compactada estendida recalcula os trechos do intervalo e da
+posição seguinte. Posições arquivadas não são alteradas: quem lê só usa o trecho gravado se ele
+parte do fim da posição que antecede a atual na leitura (trecho_gravado) e calcula nos demais casos.
+"""
+
+from datetime import timedelta
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.types import TypeDecorator
+from src.models import db, PosicaoRastreador
+from src.models.posicao_rastreador import AcessoresPosicao
+from src.arquivo_posicoes import consultar_arquivo, mesclar_posicoes, posicoes_arquivadas
+
+# Posições por transação no cálculo dos trechos de um banco existente
+TAMANHO_LOTE_GERACAO = 5000
+
+
+class PosicaoImportada(AcessoresPosicao):
+    """Linha recém-inserida pela importação (dicionário de colunas), com os acessores da posição"""
+
+    __slots__ = ('data_hora', 'latitude', 'longitude', 'velocidade', 'processado', 'data_hora_fim',
+                 'quantidade_pontos', 'latitude_fim', 'longitude_fim', 'distancia_interna_m',
+                 'distancia_anterior_m', 'segundos_anterior')
+
+    def __init__(self, registro):
+        for campo in self.__slots__:
+            setattr(self, campo, registro.get(campo))
+        # Valores como voltam do banco (ex.: coordenadas arredondadas a micrograus)
+        for campo, tipo in TIPOS_CONVERTIDOS.items():
+            valor = getattr(self, campo)
+            if valor is not None:
+                setattr(self, campo, tipo.process_result_value(tipo.process_bind_param(valor, None), None))
+
+
+TIPOS_CONVERTIDOS = {
+    campo: PosicaoRastreador.__table__.c[campo].type
+    for campo in PosicaoImportada.__slots__
+    if isinstance(PosicaoRastreador.__table__.c[campo].type, TypeDecorator)
+}
+
+
+def calcular_trecho(anterior, posicao):
+    """(metros, segundos) do último ponto de anterior até o primeiro ponto de posicao; zeros sem anterior"""
+    if anterior is None:
+        return 0.0, 0.0
+    distancia = PosicaoRastreador.calcular_distancia(
+        anterior.latitude_final, anterior.longitude_final, posicao.latitude, posicao.longitude
+    )
+    return float(distancia), (posicao.data_hora - anterior.data_hora_final).total_seconds()
+
+
+def trecho_gravado(posicao, fim_anterior):
+    """
+    (metros, segundos) gravados na posição, se o trecho parte de fim_anterior (horário do último
+    ponto da posição que a antecede na leitura); None sem trecho gravado ou se ele parte de outra
+    posição (ex.: posição fora de ordem ignorada pela classificação, arquivada desatualizada)
+    """
+    segundos = posicao.segundos_anterior
+    if segundos is None or fim_anterior is None or fim_anterior + timedelta(seconds=segundos) != posicao.data_hora:
+        return None
+    return posicao.distancia_anterior_m, segundos
+
+
+def posicao_anterior(veiculo_id, data_hora):
+    """Última posição do veículo antes de data_hora, ativa ou arquivada (None se não houver)"""
+    anterior = PosicaoRastreador.query.filter(
+        PosicaoRastreador.veiculo_id == veiculo_id,
+        PosicaoRastreador.data_hora < data_hora
+    ).order_by(PosicaoRastreador.data_hora.desc()).first()
+
+    # Posições arquivadas podem ficar entre a anterior ativa (se anterior ao corte) e data_hora
+    if consultar_arquivo(anterior.data_hora if anterior else None):
+        arquivadas = posicoes_arquivadas(
+            veiculo_id, anterior.data_hora if anterior else None, data_hora - timedelta(microseconds=1),
+            decrescente=True, limite=1
+        )
+        if arquivadas and (anterior is None or arquivadas[0].data_hora > anterior.data_hora):
+            anterior = arquivadas[0]
+    return anterior
+
+
+def _com_arquivadas(veiculo_id, posicoes, inicio):
+    """Posições ativas (em ordem) mescladas às arquivadas de [inicio, última posição ativa]"""
+    if posicoes and consultar_arquivo(inicio):
+        return mesclar_posicoes(posicoes, posicoes_arquivadas(veiculo_id, inicio, posicoes[-1].data_hora))
+    return posicoes
+
+
+def preencher_trechos(veiculo_id, registros):
+    """
+    Preenche os trechos das linhas a inserir (dicionários de colunas) e retorna True quando nenhuma
+    posição do veículo vem depois da primeira linha; senão (ou se o lote alcança o arquivo) retorna
+    False sem alterá-las, e os trechos ficam para recalcular_trechos depois do INSERT
+    """
+    ordenados = sorted(registros, key=lambda registro: registro['data_hora'])
+    primeira = ordenados[0]['data_hora']
+    if consultar_arquivo(primeira):
+        return False
+    posterior = db.session.execute(
+        select(PosicaoRastreador.id).where(
+            PosicaoRastreador.veiculo_id == veiculo_id,
+            PosicaoRastreador.data_hora > primeira
+        ).limit(1)
+    ).first()
+    if posterior is not None:
+        return False
+
+    anterior = posicao_anterior(veiculo_id, primeira)
+    for registro in ordenados:
+        posicao = PosicaoImportada(registro)
+        registro['distancia_anterior_m'], registro['segundos_anterior'] = calcular_trecho(anterior, posicao)
+        anterior = posicao
+    return True
+
+
+def _gravar_trechos(anterior, posicoes):
+    """Calcula o trecho de cada posição (em ordem) desde a anterior e grava os das ativas que mudaram"""
+    alterados = []
+    for posicao in posicoes:
+        distancia, segundos = calcular_trecho(anterior, posicao)
+        # Posições arquivadas só servem de anterior
+        ativa = isinstance(posicao, PosicaoRastreador)
+        if ativa and (posicao.distancia_anterior_m != distancia or posicao.segundos_anterior != segundos):
+            alterados.append({'b_id': posicao.id, 'b_distancia': distancia, 'b_segundos': segundos})
+            # Objetos já carregados na sessão ficam com os valores gravados
+            set_committed_value(posicao, 'distancia_anterior_m', distancia)
+            set_committed_value(posicao, 'segundos_anterior', segundos)
+        anterior = posicao
+
+    if alterados:
+        tabela = PosicaoRastreador.__table__
+        db.session.execute(
+            tabela.update().where(tabela.c.id == bindparam('b_id')).values(
+                distancia_anterior_m=bindparam('b_distancia'),
+                segundos_anterior=bindparam('b_segundos')
+            ),
+            alterados
+        )
+    return len(alterados)
+
+
+def recalcular_trechos(veiculo_id, inicio, fim):
+    """
+    Recalcula os trechos das posições ativas do veículo com data_hora em [inicio, fim] e da primeira
+    posição depois de fim (inserção fora de ordem, parada estendida). Não faz commit.
+    """
+    seguinte = db.session.execute(
+        select(PosicaoRastreador.data_hora).where(
+            PosicaoRastreador.veiculo_id == veiculo_id,
+            PosicaoRastreador.data_hora > fim
+        ).order_by(PosicaoRastreador.data_hora).limit(1)
+    ).scalar()
+
+    posicoes = PosicaoRastreador.query.filter(
+        PosicaoRastreador.veiculo_id == veiculo_id,
+        PosicaoRastreador.data_hora >= inicio,
+        PosicaoRastreador.data_hora <= (seguinte or fim)
+    ).order_by(PosicaoRastreador.data_hora).all()
+    if posicoes:
+        inicio = posicoes[0].data_hora
+        _gravar_trechos(posicao_anterior(veiculo_id, inicio), _com_arquivadas(veiculo_id, posicoes, inicio))
+
+
+def gerar_trechos():
+    """Calcula os trechos de todas as posições ativas (banco anterior às colunas), em lotes por veículo"""
+    veiculos = db.session.execute(select(PosicaoRastreador.veiculo_id).distinct()).scalars().all()
+
+    alterados = 0
+    for veiculo_id in veiculos:
+        anterior = None
+        ultima = None
+        while True:
+            consulta = PosicaoRastreador.query.filter(PosicaoRastreador.veiculo_id == veiculo_id)
+            if ultima is not None:
+                consulta = consulta.filter(PosicaoRastreador.data_hora > ultima)
+            posicoes = consulta.order_by(PosicaoRastreador.data_hora).limit(TAMANHO_LOTE_GERACAO).all()
+            if not posicoes:
+                break
+            if ultima is None:
+                inicio = posicoes[0].data_hora
+                anterior = posicao_anterior(veiculo_id, inicio)
+            else:
+                inicio = ultima + timedelta(microseconds=1)
+
+            alterados += _gravar_trechos(anterior, _com_arquivadas(veiculo_id, posicoes, inicio))
+            anterior = posicoes[-1]
+            ultima = anterior.data_hora
+            db.session.commit()
+    return alterados
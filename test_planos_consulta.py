@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Testes de plano de consulta (EXPLAIN QUERY PLAN) do Sistema SIGx
+Falham se uma consulta de endpoint crítico fizer varredura completa de uma tabela volumosa
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sigx_backend'))
+
+from flask import Flask
+from src.config_banco import configurar_banco
+from src.models import (
+    db, aplicar_migracoes, inicializar_dados_padrao, EventoJornada, IntegracaoAbastecimento,
+    IntegracaoChecklist, IntegracaoManutencao, PosicaoRastreador, TipoEvento, Veiculo
+)
+from src.routes.posicoes import posicoes_bp
+from src.routes.eventos import eventos_bp
+from src.routes.integracoes import integracoes_bp
+from src.paginacao import codificar_cursor
+
+# Tabelas que crescem com o uso e nunca devem ser varridas por inteiro
+TABELAS_VOLUMOSAS = (
+    'posicoes_rastreador',
+    'eventos_jornada',
+    'integracao_abastecimento',
+    'integracao_checklist',
+    'integracao_manutencao'
+)
+
+INICIO = datetime(2025, 6, 21, 6, 0)
+# Cursor de uma página intermediária (data, id)
+CURSOR = codificar_cursor([INICIO + timedelta(hours=2), 3])
+
+
+@pytest.fixture(scope='module')
+def app():
+    app = Flask('sigx_teste')
+    app.register_blueprint(posicoes_bp, url_prefix='/api/posicoes')
+    app.register_blueprint(eventos_bp, url_prefix='/api/eventos')
+    app.register_blueprint(integracoes_bp, url_prefix='/api/integracoes')
+    configurar_banco(app, 'sqlite://')
+
+    with app.app_context():
+        db.create_all()
+        aplicar_migracoes()
+        inicializar_dados_padrao()
+        _popular_dados()
+
+    return app
+
+
+def _popular_dados():
+    """Cria posições, eventos e integrações suficientes para as consultas terem resultado"""
+    veiculo = Veiculo.query.first()
+    tipo = TipoEvento.query.filter_by(nome='Abastecimento').first()
+
+    for i in range(50):
+        db.session.add(PosicaoRastreador(
+            veiculo_id=veiculo.id,
+            data_hora=INICIO + timedelta(minutes=5 * i),
+            latitude=-20.3911,
+            longitude=-45.5418,
+            velocidade=0 if i < 25 else 60,
+            processado=i < 10
+        ))
+
+    for i in range(5):
+        data_hora = INICIO + timedelta(hours=i)
+        db.session.add(EventoJornada(
+            veiculo_id=veiculo.id,
+            motorista_id=veiculo.motorista_id,
+            tipo_evento_id=tipo.id,
+            data_inicio=data_hora,
+            data_fim=data_hora + timedelta(minutes=20),
+            duracao_minutos=20,
+            classificacao_automatica=True,
+            aprovado=i % 2 == 0
+        ))
+        db.session.add(IntegracaoAbastecimento(veiculo_id=veiculo.id, data_hora=data_hora, posto='Posto', litros=100))
+        db.session.add(IntegracaoChecklist(veiculo_id=veiculo.id, motorista_id=veiculo.motorista_id,
+                                           data_hora=data_hora, tipo_checklist='saida', status='aprovado'))
+        db.session.add(IntegracaoManutencao(veiculo_id=veiculo.id, data_hora=data_hora, tipo_manutencao='preventiva'))
+
+    db.session.commit()
+
+
+def _varreduras(app, metodo, url, **kwargs):
+    """Executa a requisição, captura o SQL emitido e retorna as linhas de plano com varredura completa"""
+    consultas = []
+
+    with app.app_context():
+        engine = db.engine
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and not statement.lstrip().upper().startswith('EXPLAIN'):
+            consultas.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        resposta = app.test_client().open(url, method=metodo, **kwargs)
+        # Respostas em fluxo só consultam o banco enquanto o corpo é lido
+        corpo = resposta.get_data(as_text=True)
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+
+    assert resposta.status_code < 500, corpo
+    assert consultas, f'Nenhuma consulta capturada para {url}'
+
+    varreduras = []
+    with engine.connect() as conn:
+        for statement, parameters in consultas:
+            plano = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+            for linha in plano:
+                detalhe = linha[-1]
+                if any(detalhe.startswith(f'SCAN {tabela}') for tabela in TABELAS_VOLUMOSAS):
+                    varreduras.append(f'{detalhe}  <=  {statement.strip()}')
+
+    return varreduras
+
+
+CONSULTAS_CRITICAS = [
+    ('GET', '/api/posicoes/veiculo/1?data_inicio=2025-06-21T06:00:00&data_fim=2025-06-21T09:00:00', {}),
+    ('GET', '/api/posicoes/veiculo/1?processado=false', {}),
+    ('GET', f'/api/posicoes/veiculo/1?limite=10&cursor={CURSOR}', {}),
+    ('GET', '/api/posicoes/estatisticas/1?data_inicio=2025-06-21T06:00:00&data_fim=2025-06-21T12:00:00', {}),
+    ('GET', '/api/posicoes/sugestoes-melhoria/1', {}),
+    ('GET', '/api/posicoes/analisar-padroes/1?dias=36500', {}),
+    ('GET', '/api/eventos/listar?veiculo_id=1&data_inicio=2025-06-21T00:00:00', {}),
+    ('GET', '/api/eventos/listar?motorista_id=1&aprovado=true', {}),
+    ('GET', f'/api/eventos/listar?veiculo_id=1&limite=2&cursor={CURSOR}', {}),
+    ('GET', f'/api/eventos/listar?motorista_id=1&aprovado=true&limite=2&cursor={CURSOR}', {}),
+    ('GET', '/api/eventos/listar?veiculo_id=1&exportar=true', {}),
+    ('GET', '/api/eventos/estatisticas?veiculo_id=1', {}),
+    ('GET', '/api/integracoes/abastecimento/listar?veiculo_id=1', {}),
+    ('GET', '/api/integracoes/checklist/listar?motorista_id=1', {}),
+    ('GET', '/api/integracoes/manutencao/listar?veiculo_id=1', {}),
+    ('GET', f'/api/integracoes/abastecimento/listar?veiculo_id=1&limite=2&cursor={CURSOR}', {}),
+    ('GET', f'/api/integracoes/checklist/listar?motorista_id=1&limite=2&cursor={CURSOR}', {}),
+    ('GET', '/api/integracoes/estatisticas?veiculo_id=1', {}),
+    ('POST', '/api/integracoes/abastecimento/importar', {'json': {'abastecimentos': [
+        {'veiculo_placa': 'QXT1F69', 'data_hora': '2025-06-21T14:30:00', 'posto': 'Posto Shell', 'litros': 150.5}
+    ]}}),
+    ('POST', '/api/integracoes/abastecimento/processar', {}),
+    ('POST', '/api/integracoes/checklist/processar', {}),
+    ('POST', '/api/integracoes/manutencao/processar', {}),
+    ('POST', '/api/posicoes/importar', {'json': {'veiculo_placa': 'QXT1F69', 'posicoes': [
+        {'data_hora': '2025-06-22T06:00:00', 'latitude': -20.3911, 'longitude': -45.5418, 'velocidade': 0}
+    ]}}),
+    ('POST', '/api/posicoes/importar', {'json': {'veiculo_placa': 'QXT1F69', 'compactar_paradas': True, 'posicoes': [
+        {'data_hora': f'2025-06-22T07:0{i}:00', 'latitude': -20.3911, 'longitude': -45.5418, 'velocidade': 0}
+        for i in range(3)
+    ]}}),
+    ('POST', '/api/posicoes/classificar/1', {'json': {}}),
+    ('POST', '/api/posicoes/classificar-frota', {'json': {'finalizar': True}}),
+]
+
+
+@pytest.mark.parametrize('metodo,url,kwargs', CONSULTAS_CRITICAS, ids=[f'{m} {u}' for m, u, _ in CONSULTAS_CRITICAS])
+def test_consulta_usa_indice(app, metodo, url, kwargs):
+    varreduras = _varreduras(app, metodo, url, **kwargs)
+    assert not varreduras, 'Varredura completa de tabela:\n' + '\n'.join(varreduras)
+
+
+def test_indices_criados_em_banco_existente(tmp_path):
+    """aplicar_migracoes() cria os índices declarados em tabelas criadas antes deles"""
+    app = Flask('sigx_teste_migracao')
+    configurar_banco(app, f"sqlite:///{tmp_path / 'antigo.db'}")
+
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            for tabela in TABELAS_VOLUMOSAS:
+                for indice in db.metadata.tables[tabela].indexes:
+                    conn.exec_driver_sql(f'DROP INDEX {indice.name}')
+
+        aplicar_migracoes()
+
+        with db.engine.connect() as conn:
+            existentes = {linha[0] for linha in conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )}
+
+        esperados = {indice.name for tabela in TABELAS_VOLUMOSAS for indice in db.metadata.tables[tabela].indexes}
+        assert esperados <= existentes